@@ -0,0 +1,17 @@
+"""
+Benchmarks for the Live-Evo experience store.
+
+- corpus: deterministic synthetic experience-DB generator
+- run:    times library operations and CLI scripts against a temporary
+          EXPERIENCE_DIR and reports latency, throughput, peak RSS and
+          bytes written as JSON
+- compare: diff two run reports (e.g. before/after a change)
+- startup: cold-start budget check for the `live-evo` CLI
+
+    python -m benchmarks.run --sizes 1k,10k,100k --output bench.json
+    python -m benchmarks.compare old.json bench.json
+"""
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "plugins" / "live-evo" / "skills" / "live-evo" / "scripts"
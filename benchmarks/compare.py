@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark reports written by benchmarks.run.
+
+Prints one row per (size, operation) present in both reports, with the
+new/old ratio of each metric (below 1.0 is an improvement).
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("p50_ms", "p99_ms", "peak_rss_kb", "bytes_written_per_op")
+
+
+def _ratio(old, new):
+    if old is None or new is None:
+        return None
+    if not old:
+        return 1.0 if not new else None
+    return new / old
+
+
+def compare(old: dict, new: dict) -> list:
+    before = {(r["size"], r["op"]): r for r in old["results"]}
+    rows = []
+    for result in new["results"]:
+        base = before.get((result["size"], result["op"]))
+        if base is None or "p50_ms" not in result:
+            continue
+        rows.append({"size": result["size"], "op": result["op"],
+                     **{m: _ratio(base.get(m), result.get(m)) for m in METRICS}})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two Live-Evo benchmark reports")
+    parser.add_argument("old", help="Baseline report")
+    parser.add_argument("new", help="Report to compare against the baseline")
+    parser.add_argument("--json", action="store_true", help="Print ratios as JSON")
+
+    args = parser.parse_args()
+
+    old = json.loads(Path(args.old).read_text())
+    new = json.loads(Path(args.new).read_text())
+    rows = compare(old, new)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}  (new / old)")
+    print(f"{'size':>9}  {'operation':<20}" + "".join(f"{m:>22}" for m in METRICS))
+    for row in rows:
+        cells = "".join(f"{'-' if row[m] is None else format(row[m], '.2f') + 'x':>22}"
+                        for m in METRICS)
+        print(f"{row['size']:>9,}  {row['op']:<20}{cells}")
+
+
+if __name__ == "__main__":
+    main()
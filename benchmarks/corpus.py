@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Synthetic experience-DB generator.
+
+Produces records shaped like real Live-Evo experiences (question, failure
+reason, improvement, optional missed information, category, evolved
+weights and counters). Words are drawn from a Zipf-distributed vocabulary,
+a core of real technical terms followed by pronounceable synthetic words,
+so posting-list lengths and query selectivity resemble a natural-language
+corpus. Output is fully determined by the seed.
+
+    python -m benchmarks.corpus --rows 100k --vocab 20000 --output db.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_CATEGORY_MIX = {
+    "coding": 0.35,
+    "debugging": 0.25,
+    "analysis": 0.15,
+    "design": 0.10,
+    "prediction": 0.05,
+    "other": 0.10,
+}
+DEFAULT_VOCAB_SIZE = 5000
+DEFAULT_ZIPF_S = 1.1
+DEFAULT_SEED = 1234
+
+_CORE_TERMS = """
+python react useeffect memory leak loop async await thread process lock deadlock race
+cache index query database sql join schema migration api endpoint request response timeout
+retry error exception stack trace test fixture mock assert build compile linker dependency
+version package import module class function method closure callback promise future queue
+worker pool socket http json yaml config env variable path file stream buffer encoding
+unicode parse regex string list dict array tensor gradient batch model training inference
+accuracy latency throughput profile benchmark allocation garbage collector pointer null
+undefined type annotation interface generic container docker kubernetes deploy rollback
+log metric alert dashboard container permission auth token session cookie cors header
+state props render hook component memo dependency effect reducer store selector router
+""".split()
+
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "shi", "pe", "da", "zu", "ri",
+              "ban", "tor", "fel", "gri", "mon", "sa", "qui", "lex")
+
+_QUESTIONS = (
+    "How to {v} {w} {w} in {w}",
+    "Why does {w} {w} fail when {w} {w}",
+    "Fix {w} {w} {w} after {w} upgrade",
+    "Debug {w} {w} in long-running {w}",
+    "Design a {w} {w} for {w} {w}",
+    "Predict {w} {w} from {w} {w} {w}",
+)
+_FAILURES = (
+    "Used {w} {w} without {w}, causing {w} {w} {w}",
+    "Assumed {w} {w} would {v} {w} but {w} {w} instead",
+    "Forgot to {v} {w} before {w} {w}, so {w} {w} broke",
+)
+_IMPROVEMENTS = (
+    "Always {v} {w} {w} with {w} and check {w} {w}",
+    "Prefer {w} {w} over {w} {w}; {v} {w} early",
+    "Measure {w} {w} first, then {v} {w} {w} {w}",
+)
+_MISSED = (
+    "Did not know {w} {w} {w}",
+    "Docs for {w} say {w} {w} must {v} {w}",
+)
+_VERBS = ("fix", "avoid", "handle", "cache", "validate", "retry", "profile", "memoize",
+          "close", "flush", "index", "batch", "stream", "release", "pin")
+
+_BASE_DATE = datetime(2026, 1, 1)
+
+
+def parse_size(text: str) -> int:
+    """Parse a row count such as 1000, 10k or 1M."""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse a category mix like "coding=0.6,debugging=0.4"."""
+    mix = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        mix[name.strip()] = float(share)
+    return mix
+
+
+class CorpusGenerator:
+    """Deterministic source of synthetic experiences and matching queries."""
+
+    def __init__(self, vocab_size: int = DEFAULT_VOCAB_SIZE,
+                 category_mix: Optional[Dict[str, float]] = None,
+                 seed: int = DEFAULT_SEED, zipf_s: float = DEFAULT_ZIPF_S):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.vocab = self._build_vocab(vocab_size, rng)
+        self._cum_ranks = list(accumulate(1.0 / (r ** zipf_s)
+                                          for r in range(1, len(self.vocab) + 1)))
+        mix = category_mix or DEFAULT_CATEGORY_MIX
+        self.categories = list(mix)
+        self._cum_categories = list(accumulate(mix.values()))
+
+    @staticmethod
+    def _build_vocab(size: int, rng: random.Random) -> List[str]:
+        vocab = list(dict.fromkeys(_CORE_TERMS))[:size]
+        seen = set(vocab)
+        while len(vocab) < size:
+            word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+            if word not in seen:
+                seen.add(word)
+                vocab.append(word)
+        return vocab
+
+    def words(self, rng: random.Random, k: int) -> List[str]:
+        return rng.choices(self.vocab, cum_weights=self._cum_ranks, k=k)
+
+    def _fill(self, template: str, rng: random.Random) -> str:
+        words = iter(self.words(rng, template.count("{w}")))
+        return template.replace("{v}", rng.choice(_VERBS)).replace(
+            "{w}", "{}").format(*words)
+
+    @staticmethod
+    def experience_id(i: int) -> str:
+        # Odd-multiplier hash is a bijection on 32 bits: ids are unique and look random
+        return format((i * 2654435761) & 0xFFFFFFFF, "08x")
+
+    def experience(self, i: int) -> Dict:
+        """The i-th synthetic experience (independent of any other row)."""
+        rng = random.Random(self.seed * 1_000_003 + i)
+        exp = {
+            "id": self.experience_id(i),
+            "question": self._fill(rng.choice(_QUESTIONS), rng),
+            "failure_reason": self._fill(rng.choice(_FAILURES), rng),
+            "improvement": self._fill(rng.choice(_IMPROVEMENTS), rng),
+            "missed_information": self._fill(rng.choice(_MISSED), rng) if rng.random() < 0.4 else "",
+            "category": rng.choices(self.categories, cum_weights=self._cum_categories)[0],
+            "weight": 1.0,
+            "created_at": (_BASE_DATE + timedelta(minutes=i)).isoformat(),
+            "use_count": 0,
+            "success_count": 0,
+        }
+        if rng.random() < 0.4:
+            # A used experience: weight drifted by verdicts
+            uses = rng.randint(1, 20)
+            successes = rng.randint(0, uses)
+            exp["weight"] = round(min(2.0, max(0.1, rng.gauss(1.0, 0.4))), 2)
+            exp["use_count"] = uses
+            exp["success_count"] = successes
+            exp["last_used"] = (_BASE_DATE + timedelta(minutes=i, days=rng.randint(1, 30))).isoformat()
+        return exp
+
+    def experiences(self, n: int, start: int = 0) -> Iterator[Dict]:
+        for i in range(start, start + n):
+            yield self.experience(i)
+
+    def query(self, rng: random.Random, n_words: int = 6) -> str:
+        """A task description drawn from the same word distribution."""
+        return " ".join(self.words(rng, n_words))
+
+    def write(self, path: Path, n: int) -> int:
+        """Write n experiences as JSONL to `path`; returns bytes written."""
+        written = 0
+        with open(path, 'w') as f:
+            for exp in self.experiences(n):
+                line = json.dumps(exp) + "\n"
+                f.write(line)
+                written += len(line)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Live-Evo experience DB")
+    parser.add_argument("--rows", "-n", default="10k", help="Number of experiences (e.g. 1k, 10k, 1M)")
+    parser.add_argument("--vocab", type=int, default=DEFAULT_VOCAB_SIZE, help="Vocabulary size")
+    parser.add_argument("--zipf", type=float, default=DEFAULT_ZIPF_S, help="Zipf exponent of word frequencies")
+    parser.add_argument("--categories", help="Category mix, e.g. coding=0.6,debugging=0.4")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--output", "-o", help="Output JSONL file (default: stdout)")
+
+    args = parser.parse_args()
+
+    gen = CorpusGenerator(args.vocab, parse_mix(args.categories) if args.categories else None,
+                          args.seed, args.zipf)
+    rows = parse_size(args.rows)
+    if args.output:
+        gen.write(Path(args.output), rows)
+    else:
+        for exp in gen.experiences(rows):
+            sys.stdout.write(json.dumps(exp) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Run the Live-Evo benchmark suite.
+
+For every corpus size a synthetic store is generated in a temporary
+directory (exported to the code under test as LIVE_EVO_HOME), then each
+operation runs in its own process: library calls through benchmarks.worker,
+CLI scripts as one fresh interpreter per iteration. Operations run in the
+order given and see each other's writes, like a real session would.
+
+Each result reports p50/p99/mean/max latency, the first (cold) call,
+throughput, peak RSS of the process and mean bytes written per operation.
+The JSON report carries the git commit so runs can be compared with
+benchmarks.compare.
+
+    python -m benchmarks.run --sizes 1k,10k,100k --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks import REPO_ROOT, SCRIPTS_DIR
+from benchmarks.corpus import DEFAULT_SEED, DEFAULT_VOCAB_SIZE, CorpusGenerator, parse_mix, parse_size
+from benchmarks.worker import CLI_OPS, OPS, cli_argv
+
+DEFAULT_SIZES = "1k,10k,100k"
+DEFAULT_OPS = ("index_build", "retrieve", "retrieve_bm25", "list", "stats", "update", "add",
+               "cli_retrieve", "cli_list", "cli_stats", "cli_add")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in [0, 100])."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies: List[float], written: List[Optional[int]], peak_rss_kb: int) -> Dict:
+    known = [w for w in written if w is not None]
+    return {
+        "iterations": len(latencies),
+        "first_ms": round(latencies[0], 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "max_ms": round(max(latencies), 3),
+        "throughput_ops_s": round(len(latencies) / (sum(latencies) / 1000), 2) if sum(latencies) else None,
+        "peak_rss_kb": peak_rss_kb,
+        "bytes_written_per_op": round(sum(known) / len(known)) if known else None,
+    }
+
+
+def run_library_op(op: str, env: Dict, args, rows: int) -> Dict:
+    cmd = [sys.executable, "-m", "benchmarks.worker", op, "--rows", str(rows),
+           "--iterations", str(1 if op == "index_build" else args.iterations),
+           "--vocab", str(args.vocab), "--seed", str(args.seed)]
+    if args.categories:
+        cmd += ["--categories", args.categories]
+    proc = subprocess.run(cmd, env=env, cwd=REPO_ROOT, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"benchmark worker {op} failed:\n{proc.stderr}")
+    raw = json.loads(proc.stdout.splitlines()[-1])
+    return summarize(raw["latencies_ms"], raw["bytes_written"], raw["peak_rss_kb"])
+
+
+def run_cli_op(op: str, env: Dict, args, rows: int, gen: CorpusGenerator) -> Dict:
+    rng = random.Random(args.seed)
+    latencies, written, peak_rss = [], [], 0
+    # One untimed run first so bytecode caching is not counted
+    for i in range(args.cli_iterations + 1):
+        start = time.perf_counter()
+        proc = subprocess.Popen(cli_argv(op, gen, rows, rng), env=env, cwd=SCRIPTS_DIR,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = (time.perf_counter() - start) * 1000
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode:
+            raise RuntimeError(f"{op} exited with {proc.returncode}:\n{stderr.decode()}")
+        if i == 0:
+            continue
+        latencies.append(elapsed)
+        written.append(json.loads(stderr.splitlines()[-1])["bytes_written"])
+        peak_rss = max(peak_rss, usage.ru_maxrss)
+    return summarize(latencies, written, peak_rss)
+
+
+def run_size(rows: int, args) -> List[Dict]:
+    gen = CorpusGenerator(args.vocab, parse_mix(args.categories) if args.categories else None,
+                          args.seed)
+    home = Path(tempfile.mkdtemp(prefix=f"live-evo-bench-{rows}-"))
+    env = dict(os.environ, LIVE_EVO_HOME=str(home), PYTHONPATH=str(REPO_ROOT))
+    if args.backend:
+        env["LIVE_EVO_BACKEND"] = args.backend
+    results = []
+    try:
+        start = time.perf_counter()
+        db_bytes = gen.write(home / "experience_db.jsonl", rows)
+        setup = {"size": rows, "op": "generate", "seconds": round(time.perf_counter() - start, 3),
+                 "db_bytes": db_bytes}
+        if args.backend == "sqlite":
+            subprocess.run([sys.executable, str(SCRIPTS_DIR / "migrate.py")], env=env,
+                           check=True, stdout=subprocess.DEVNULL)
+        results.append(setup)
+        for op in args.ops:
+            if op in CLI_OPS:
+                summary = run_cli_op(op, env, args, rows, gen)
+            else:
+                summary = run_library_op(op, env, args, rows)
+            results.append({"size": rows, "op": op, **summary})
+            print(f"  {rows:>9,} {op:<20} p50 {summary['p50_ms']:>10.2f} ms  "
+                  f"p99 {summary['p99_ms']:>10.2f} ms  rss {summary['peak_rss_kb'] / 1024:>8.1f} MiB",
+                  file=sys.stderr)
+    finally:
+        if args.keep:
+            print(f"  kept store at {home}", file=sys.stderr)
+        else:
+            shutil.rmtree(home, ignore_errors=True)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ("-dirty" if dirty else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Live-Evo operations on synthetic stores")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated row counts (e.g. 1k,10k,1M)")
+    parser.add_argument("--ops", default=",".join(DEFAULT_OPS),
+                       help=f"Comma-separated operations from: {', '.join(sorted({**OPS, **CLI_OPS}))}")
+    parser.add_argument("--iterations", "-n", type=int, default=50, help="Iterations per library operation")
+    parser.add_argument("--cli-iterations", type=int, default=10, help="Iterations per CLI operation")
+    parser.add_argument("--vocab", type=int, default=DEFAULT_VOCAB_SIZE, help="Corpus vocabulary size")
+    parser.add_argument("--categories", help="Corpus category mix, e.g. coding=0.6,debugging=0.4")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--backend", choices=["jsonl", "sqlite"], help="Storage backend (default: auto)")
+    parser.add_argument("--output", "-o", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary stores")
+
+    args = parser.parse_args()
+    args.ops = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = [op for op in args.ops if op not in OPS and op not in CLI_OPS]
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "commit": git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fsync": os.environ.get("LIVE_EVO_FSYNC", "1") != "0",
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "keep")},
+        },
+        "results": [],
+    }
+    for rows in (parse_size(s) for s in args.sizes.split(",")):
+        report["results"].extend(run_size(rows, args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the `live-evo` CLI.
+
+On a small synthetic store, where interpreter and import overhead dominate,
+every command runs as a fresh process and its median wall time is compared
+with that of a bare `python -c pass`. The check fails (exit status 1) when
+a command's overhead over the bare interpreter exceeds the budget, or when
+it imports a module that should only load on demand (see LAZY_MODULES).
+It also reports how much a chained run (`retrieve + update + stats` in one
+process) saves over the same three commands as separate processes.
+
+    python -m benchmarks.startup                      # default budget
+    python -m benchmarks.startup --budget-ms 80 --rows 500 --output startup.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+from benchmarks import REPO_ROOT, SCRIPTS_DIR
+from benchmarks.corpus import DEFAULT_SEED, CorpusGenerator
+from benchmarks.run import percentile
+
+DEFAULT_BUDGET_MS = 120.0
+DEFAULT_ROWS = 200
+
+# Modules the common commands must not import at start-up: storage backends,
+# daemon server/launcher, process pools, compression and the optional indexes
+LAZY_MODULES = {
+    "sqlite3", "sqlite_backend", "socketserver", "subprocess", "multiprocessing",
+    "concurrent.futures", "gzip", "embeddings", "minhash", "delta_sync",
+}
+# Not even the storage layer is needed to print the command list
+HELP_LAZY_MODULES = LAZY_MODULES | {"experience_manager", "daemon", "argparse"}
+
+
+def live_evo(*args: str) -> List[str]:
+    return [sys.executable, str(SCRIPTS_DIR / "live_evo.py"), *args]
+
+
+def time_runs(cmd: List[str], env: Dict, iterations: int) -> List[float]:
+    """Wall time (ms) of each of `iterations` fresh runs of `cmd`."""
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, env=env, cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+        if proc.returncode:
+            raise RuntimeError(f"{' '.join(cmd)} failed:\n{proc.stderr}")
+    return times
+
+
+def imported_modules(cmd: List[str], env: Dict) -> Set[str]:
+    """Names of all modules a run imports (from -X importtime)."""
+    proc = subprocess.run([cmd[0], "-X", "importtime", *cmd[1:]], env=env, cwd=REPO_ROOT,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    names = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            names.add(line.rsplit("|", 1)[1].strip())
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the live-evo CLI against a cold-start budget")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                       help="Largest allowed median overhead over a bare interpreter, per command")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Experiences in the store")
+    parser.add_argument("--iterations", "-n", type=int, default=10, help="Runs per command")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--output", "-o", help="Also write the JSON report here")
+
+    args = parser.parse_args()
+
+    gen = CorpusGenerator(seed=args.seed)
+    query = gen.query(random.Random(args.seed))
+    home = Path(tempfile.mkdtemp(prefix="live-evo-startup-"))
+    env = dict(os.environ, LIVE_EVO_HOME=str(home), LIVE_EVO_RESULT_CACHE="0")
+    env.pop("LIVE_EVO_METRICS", None)
+    # Let the warm-up runs cache bytecode, as an installed skill's first run does
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    ids = ",".join(gen.experience_id(i) for i in range(3))
+    commands = {
+        "help": live_evo("--help"),
+        "retrieve": live_evo("retrieve", "-q", query),
+        "update": live_evo("update", "-t", "t", "-a", "a", "-b", "b", "-c", "b", "-e", ids),
+        # Plain adds skip the near-duplicate check, so minhash must stay unloaded
+        "add": live_evo("add", "-q", query, "-f", "failure", "-i", "lesson"),
+        "list": live_evo("list"),
+        "stats": live_evo("stats"),
+    }
+    chained = live_evo("retrieve", "-q", query, "+", "update", "-t", "t", "-a", "a", "-b", "b",
+                       "-c", "b", "-e", "@ids", "+", "stats")
+
+    failures = []
+    report = {"budget_ms": args.budget_ms, "rows": args.rows, "commands": {}}
+    try:
+        gen.write(home / "experience_db.jsonl", args.rows)
+        # Build the on-disk indexes and summary once: the budget is about process start-up
+        for cmd in commands.values():
+            time_runs(cmd, env, 1)
+
+        baseline = percentile(time_runs([sys.executable, "-c", "pass"], env, args.iterations), 50)
+        report["interpreter_ms"] = round(baseline, 3)
+        print(f"{'bare interpreter':<18} {baseline:8.1f} ms")
+        for name, cmd in commands.items():
+            median = percentile(time_runs(cmd, env, args.iterations), 50)
+            overhead = median - baseline
+            lazy = HELP_LAZY_MODULES if name == "help" else LAZY_MODULES
+            eager = sorted(imported_modules(cmd, env) & lazy)
+            report["commands"][name] = {"p50_ms": round(median, 3), "overhead_ms": round(overhead, 3),
+                                        "eager_imports": eager}
+            over = overhead > args.budget_ms
+            print(f"{name:<18} {median:8.1f} ms  (+{overhead:.1f} ms)"
+                  + ("  OVER BUDGET" if over else "") + (f"  imports {', '.join(eager)}" if eager else ""))
+            if over:
+                failures.append(f"{name}: {overhead:.1f} ms over the interpreter (budget {args.budget_ms:g} ms)")
+            if eager:
+                failures.append(f"{name}: imports {', '.join(eager)} at start-up")
+
+        separate = sum(report["commands"][name]["p50_ms"] for name in ("retrieve", "update", "stats"))
+        chain = percentile(time_runs(chained, env, args.iterations), 50)
+        report["chain"] = {"p50_ms": round(chain, 3), "separate_ms": round(separate, 3)}
+        print(f"{'retrieve+update+stats':<18} {chain:8.1f} ms  in one process "
+              f"(separately {separate:.1f} ms)")
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    report["failures"] = failures
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if failures:
+        print("\nCold-start budget check failed:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+    print(f"\nAll commands within {args.budget_ms:g} ms of a bare interpreter")
+
+
+if __name__ == "__main__":
+    main()
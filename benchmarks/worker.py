@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark worker: runs one operation repeatedly in a fresh process.
+
+Started by benchmarks.run with LIVE_EVO_HOME pointing at a temporary store,
+so each operation gets its own peak RSS and a cold first call. Prints one
+JSON object with per-iteration latencies and bytes written.
+
+Library operations call experience_manager directly. CLI operations are
+described by argv builders; the runner starts a new interpreter per
+iteration through CLI_BOOTSTRAP.
+"""
+import argparse
+import itertools
+import json
+import random
+import resource
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import SCRIPTS_DIR
+from benchmarks.corpus import DEFAULT_SEED, DEFAULT_VOCAB_SIZE, CorpusGenerator, parse_mix
+
+# Runs a CLI script with stdout captured in memory, then reports the bytes the
+# script wrote (wchar from /proc/self/io) on stderr for the runner to collect
+CLI_BOOTSTRAP = """
+import io, json, os, runpy, sys
+def wchar():
+    try:
+        with open('/proc/self/io') as f:
+            return int(next(l for l in f if l.startswith('wchar:')).split()[1])
+    except (OSError, StopIteration):
+        return None
+script, sys.argv = sys.argv[1], sys.argv[1:]
+sys.path.insert(0, os.path.dirname(script))
+before = wchar()
+sys.stdout = io.StringIO()
+try:
+    runpy.run_path(script, run_name='__main__')
+except SystemExit:
+    pass
+finally:
+    after = wchar()
+    os.write(2, ('\\n' + json.dumps({'bytes_written': None if before is None else after - before})).encode())
+"""
+
+
+def bytes_written_so_far() -> Optional[int]:
+    """Bytes this process has passed to write() so far (Linux only)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# --- library operations ------------------------------------------------------
+# Each factory gets (em, generator, rows, rng) and returns a zero-argument callable
+
+
+def _op_index_build(em, gen, rows, rng):
+    return lambda: em.count_experiences()
+
+
+def _retrieve(scorer):
+    def factory(em, gen, rows, rng):
+        return lambda: em.find_relevant_experiences(gen.query(rng), scorer=scorer)
+    return factory
+
+
+def _op_add(em, gen, rows, rng):
+    counter = itertools.count(rows)
+
+    def add():
+        exp = gen.experience(next(counter))
+        em.add_experience(exp["question"], exp["failure_reason"], exp["improvement"],
+                          exp["missed_information"], exp["category"])
+    return add
+
+
+def _op_update(em, gen, rows, rng):
+    def update():
+        ids = [gen.experience_id(rng.randrange(rows)) for _ in range(rng.randint(1, 5))]
+        em.update_weights(ids, rng.random() < 0.5)
+    return update
+
+
+def _op_stats(em, gen, rows, rng):
+    return lambda: em.get_statistics()
+
+
+def _op_list(em, gen, rows, rng):
+    return lambda: em.query_experiences(sort="weight", limit=20)
+
+
+OPS: Dict[str, Callable] = {
+    "index_build": _op_index_build,
+    "retrieve": _retrieve("jaccard"),
+    "retrieve_bm25": _retrieve("bm25"),
+    "retrieve_embedding": _retrieve("embedding"),
+    "add": _op_add,
+    "update": _op_update,
+    "stats": _op_stats,
+    "list": _op_list,
+}
+
+
+# --- CLI operations ----------------------------------------------------------
+# Each builder gets (generator, rows, rng) and returns the script argv
+
+
+def _cli_add(gen, rows, rng):
+    exp = gen.experience(rows + rng.randrange(1_000_000))
+    return ["add_experience.py", "--question", exp["question"],
+            "--failure-reason", exp["failure_reason"], "--improvement", exp["improvement"],
+            "--category", exp["category"] if exp["category"] in
+            ("coding", "analysis", "prediction", "debugging", "design") else "other"]
+
+
+CLI_OPS: Dict[str, Callable] = {
+    "cli_retrieve": lambda gen, rows, rng: ["retrieve.py", "--query", gen.query(rng)],
+    "cli_list": lambda gen, rows, rng: ["list_experiences.py", "--limit", "20"],
+    "cli_stats": lambda gen, rows, rng: ["stats.py"],
+    "cli_add": _cli_add,
+}
+
+
+def cli_argv(op: str, gen: CorpusGenerator, rows: int, rng: random.Random) -> List[str]:
+    """Full interpreter argv for one iteration of a CLI operation."""
+    script, *args = CLI_OPS[op](gen, rows, rng)
+    return [sys.executable, "-c", CLI_BOOTSTRAP, str(SCRIPTS_DIR / script)] + args
+
+
+def run_op(op: str, gen: CorpusGenerator, rows: int, iterations: int, seed: int) -> Dict:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    import experience_manager as em
+
+    rng = random.Random(seed)
+    fn = OPS[op](em, gen, rows, rng)
+    latencies, written = [], []
+    for _ in range(iterations):
+        before = bytes_written_so_far()
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+        after = bytes_written_so_far()
+        written.append(None if before is None else after - before)
+    return {
+        "latencies_ms": latencies,
+        "bytes_written": written,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one benchmark operation (used by benchmarks.run)")
+    parser.add_argument("op", choices=sorted(OPS))
+    parser.add_argument("--rows", type=int, required=True, help="Rows in the generated store")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--vocab", type=int, default=DEFAULT_VOCAB_SIZE)
+    parser.add_argument("--categories", help="Category mix used to generate the store")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+
+    args = parser.parse_args()
+
+    gen = CorpusGenerator(args.vocab, parse_mix(args.categories) if args.categories else None,
+                          args.seed)
+    result = run_op(args.op, gen, args.rows, args.iterations, args.seed)
+    sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,12 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from experience_manager import add_experience
+from daemon import call
+from experience_manager import DUPLICATE_ACTIONS, DUPLICATE_THRESHOLD
+from profiling import add_profile_argument, profile_cli
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Add a new experience to the database")
+def add_arguments(parser):
     parser.add_argument("--question", "-q", required=True, help="The original task/question")
     parser.add_argument("--failure-reason", "-f", required=True, help="What went wrong")
     parser.add_argument("--improvement", "-i", required=True, help="Key lesson learned")
@@ -19,23 +20,58 @@ def main():
     parser.add_argument("--category", "-c", default="other",
                        choices=["coding", "analysis", "prediction", "debugging", "design", "other"],
                        help="Category of the experience")
+    parser.add_argument("--on-duplicate", default="store", choices=DUPLICATE_ACTIONS,
+                       help="What to do if a near-duplicate is already stored (store, the default: "
+                            "add anyway; reject: report it, store nothing and exit with status 1; "
+                            "merge: confirm the stored one instead)")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                       help="Similarity (0-1) at which an experience counts as a near-duplicate")
 
-    args = parser.parse_args()
 
-    exp = add_experience(
+def run(parser, args):
+    exp = call(
+        "add",
         question=args.question,
         failure_reason=args.failure_reason,
         improvement=args.improvement,
         missed_information=args.missed_info,
-        category=args.category
+        category=args.category,
+        on_duplicate=args.on_duplicate,
+        threshold=args.threshold
     )
 
+    duplicate = exp.pop("duplicate", None)
+    if duplicate:
+        print(f"Near-duplicate of an existing experience (similarity {duplicate['similarity']:.2f}); "
+              f"{duplicate['action']}.")
+        print(f"  ID: {exp['id']}")
+        print(f"  Question: {exp['question'][:60]}...")
+        print(f"  Lesson: {exp.get('improvement', '')[:60]}...")
+        print(f"  Weight: {exp['weight']:.2f}")
+        if duplicate["action"] == "rejected":
+            sys.stdout.flush()
+            sys.exit("The new experience was NOT stored. If it adds something the stored one lacks, "
+                     "re-run with --on-duplicate store (keep both) or --on-duplicate merge "
+                     "(confirm the stored one).")
+        return [exp["id"]]
+
     print(f"Experience added successfully!")
     print(f"  ID: {exp['id']}")
     print(f"  Question: {exp['question'][:60]}...")
     print(f"  Category: {exp['category']}")
     print(f"  Initial weight: {exp['weight']}")
     print(f"\nThis experience will be retrieved when similar tasks are encountered.")
+    return [exp["id"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add a new experience to the database")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("add_experience", args.profile)
+    run(parser, args)
 
 
 if __name__ == "__main__":
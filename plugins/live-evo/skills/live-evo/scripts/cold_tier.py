@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Cold tier: an archive for experiences demoted out of the main (hot) store.
+
+Experiences that fell out of the hot store's capacity bound, or that a
+demotion rule selects, are moved to experience_archive.jsonl, which has
+its own inverted index (experience_archive_index.json). Retrieval searches
+it through that index when the hot results are few or weak, and merges
+what it finds into the ranking without moving anything. Records move back
+to the hot store when a verdict is recorded for them or `tiers.py promote`
+asks for them.
+
+Which records are demoted is decided by a TierPolicy, persisted in
+tier_policy.json:
+
+- capacity: most records the hot store keeps (unbounded unless set);
+  when it is exceeded, records are evicted down to low_water * capacity
+  (so the rewrite is amortized over many additions), least recently used
+  first ("lru") or least used first ("lfu"). This is the only rule applied
+  automatically, when an addition or promotion takes the hot store over
+  capacity,
+- min_weight: records at or below this weight are demoted (off unless set),
+- stale_days: records not used (or created / promoted) for this long are
+  demoted (off unless set),
+- grace_days: records created or promoted within this many days are
+  never demoted, so a promoted record is not sent straight back.
+
+`tiers.py demote` applies every rule the policy sets.
+
+Promotion does not rewrite the archive: it appends a tombstone line per
+record (see inverted_index.TOMBSTONE_KEY) and drops the record from the
+archive's index. The bytes of retracted and superseded lines are counted,
+and the archive is compacted once they make up most of it.
+
+A small sidecar (experience_archive.json) holds the record count and the
+dead bytes, so statistics do not need to read the archive's index.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import profiling
+from inverted_index import DOC_LENGTH, DOC_OFFSET, TOMBSTONE_KEY, InvertedIndex
+from locking import atomic_write
+from record_filter import RecordFilter, scan_jsonl
+
+EVICTION_ORDERS = ("lru", "lfu")
+
+# Weights within this of min_weight count as at the floor
+_WEIGHT_EPSILON = 1e-9
+
+# Compact the archive once retracted/superseded lines exceed both of these
+COMPACT_MIN_BYTES = 256 * 1024
+COMPACT_RATIO = 0.5
+
+
+class TierPolicy:
+    """Demotion policy for the hot store (see module docstring)."""
+
+    FIELDS = ("capacity", "low_water", "min_weight", "stale_days", "grace_days", "evict")
+
+    def __init__(self, capacity: Optional[int] = None, low_water: float = 0.9,
+                 min_weight: Optional[float] = None, stale_days: Optional[float] = None,
+                 grace_days: float = 7, evict: str = "lru"):
+        if evict not in EVICTION_ORDERS:
+            raise ValueError(f"Unknown eviction order {evict!r}; choose from {EVICTION_ORDERS}")
+        self.capacity = capacity
+        self.low_water = low_water
+        self.min_weight = min_weight
+        self.stale_days = stale_days
+        self.grace_days = grace_days
+        self.evict = evict
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def load(cls, path: Path) -> "TierPolicy":
+        """The saved policy, with defaults for anything missing or unreadable."""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict):
+            return cls()
+        return cls(**{k: v for k, v in data.items() if k in cls.FIELDS})
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def over_capacity(self, hot_count: int) -> bool:
+        return self.capacity is not None and hot_count > self.capacity
+
+
+def _parse_time(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def last_touched(exp: Dict) -> datetime:
+    """When an experience was last used, created or promoted (for staleness and LRU)."""
+    times = [_parse_time(exp.get(f)) for f in ("last_used", "created_at", "promoted_at")]
+    return max((t for t in times if t is not None), default=datetime.min)
+
+
+def select_demotions(experiences: List[Dict], policy: TierPolicy,
+                     now: Optional[datetime] = None, capacity_only: bool = False) -> Dict[str, str]:
+    """
+    {id: reason} for the hot-store experiences the policy demotes. Reasons
+    are "weight", "stale" and "capacity"; the capacity rule evicts only as
+    many as the other rules leave above the bound. With `capacity_only`
+    (demotion triggered by the bound) the other rules are not applied.
+    """
+    now = now or datetime.now()
+    grace = now - timedelta(days=policy.grace_days)
+    stale = now - timedelta(days=policy.stale_days) if policy.stale_days is not None else None
+    min_weight = policy.min_weight
+    if capacity_only:
+        stale = min_weight = None
+
+    reasons: Dict[str, str] = {}
+    eligible = []
+    for exp in experiences:
+        touched = last_touched(exp)
+        created = max((t for t in (_parse_time(exp.get("created_at")),
+                                   _parse_time(exp.get("promoted_at"))) if t), default=datetime.min)
+        if created >= grace:
+            continue
+        if min_weight is not None and exp.get("weight", 1.0) <= min_weight + _WEIGHT_EPSILON:
+            reasons[exp["id"]] = "weight"
+        elif stale is not None and touched < stale:
+            reasons[exp["id"]] = "stale"
+        else:
+            eligible.append((exp, touched))
+
+    if policy.over_capacity(len(experiences) - len(reasons)):
+        excess = len(experiences) - len(reasons) - int(policy.capacity * policy.low_water)
+        if policy.evict == "lfu":
+            key = lambda item: (item[0].get("use_count", 0), item[1])
+        else:
+            key = lambda item: item[1]
+        for exp, _ in sorted(eligible, key=key)[:max(0, excess)]:
+            reasons[exp["id"]] = "capacity"
+    return reasons
+
+
+class ColdArchive:
+    """Append-mostly JSONL archive of demoted experiences with its own inverted index."""
+
+    def __init__(self, path: Path, index_path: Path, meta_path: Path, durable: bool = True):
+        self.path = path
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.durable = durable
+        self._index: Optional[InvertedIndex] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def index(self) -> InvertedIndex:
+        """The archive's index, caught up with appended lines or rebuilt."""
+        if self._index is None:
+            index = InvertedIndex.load(self.index_path)
+            changed = index.catch_up(self.path) if index is not None else None
+            if changed is None:
+                index = InvertedIndex.build(self.path)
+                changed = True
+            if changed:
+                index.save(self.index_path)
+            self._index = index
+        return self._index
+
+    def _meta(self) -> Dict:
+        """The sidecar if it describes the archive as it is now, else {}."""
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            if isinstance(meta, dict) and meta.get("db_size") == self.path.stat().st_size:
+                return meta
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def count(self) -> int:
+        """Number of archived experiences (from the sidecar when it is current)."""
+        if not self.path.exists():
+            return 0
+        records = self._meta().get("records")
+        return records if isinstance(records, int) else len(self.index())
+
+    def ids(self) -> Set[str]:
+        return set(self.index().docs) if self.path.exists() else set()
+
+    def get_many(self, ids: Iterable[str]) -> List[Dict]:
+        """Archived records for the given ids (unknown ids are left out), in archive order."""
+        if not self.path.exists():
+            return []
+        docs = self.index().docs
+        locations = sorted((docs[i][DOC_OFFSET], docs[i][DOC_LENGTH], i) for i in set(ids) if i in docs)
+        records = []
+        with open(self.path, 'rb') as f:
+            for offset, length, exp_id in locations:
+                f.seek(offset)
+                exp = json.loads(f.read(length))
+                if isinstance(exp, dict) and exp.get("id") == exp_id:
+                    records.append(exp)
+        profiling.count("records_read", len(records))
+        return records
+
+    def iter_records(self, where: RecordFilter) -> Iterator[Dict]:
+        """Archived records matching `where`, streamed in archive order (retracted and superseded lines skipped)."""
+        if not self.path.exists():
+            return
+        docs = self.index().docs
+        with open(self.path, 'rb') as f:
+            for offset, exp in scan_jsonl(f, where):
+                doc = docs.get(exp.get("id"))
+                if doc is not None and doc[DOC_OFFSET] == offset:
+                    yield exp
+
+    def candidates(self, tokens: Iterable[str], category: Optional[str] = None) -> Set[str]:
+        if not self.path.exists():
+            return set()
+        return self.index().candidates(tokens, category)
+
+    def phrase_candidates(self, query: str, category: Optional[str] = None) -> Set[str]:
+        """Records sharing no query token that the phrase boost could still reach."""
+        if not self.path.exists():
+            return set()
+        return set(self.index().phrase_overlap(query, category))
+
+    def append(self, experiences: List[Dict]):
+        """
+        Add records (the caller holds the writer lock). A record already
+        archived is superseded; its old line is dropped by the next compaction.
+        """
+        if not experiences:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        index = self.index()
+        dead = self._dead_bytes()
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            for exp in experiences:
+                line = (json.dumps(exp, default=str) + "\n").encode()
+                f.write(line)
+                old = index.docs.get(exp.get("id"))
+                if old is not None:
+                    dead += old[DOC_LENGTH]
+                index.add(exp, offset, len(line))
+                offset += len(line)
+            if self.durable:
+                # Demotion removes the records from the hot store next
+                f.flush()
+                os.fsync(f.fileno())
+        index.mark_synced(self.path, offset)
+        index.save(self.index_path)
+        self._save_meta(dead)
+
+    def remove(self, ids: Iterable[str]):
+        """
+        Retract records (the caller holds the writer lock): a tombstone line
+        per record is appended, and the archive is compacted only once most
+        of it is dead.
+        """
+        if not self.path.exists():
+            return
+        index = self.index()
+        ids = [i for i in set(ids) if i in index.docs]
+        if not ids:
+            return
+        dead = self._dead_bytes()
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            for exp_id in ids:
+                line = (json.dumps({"id": exp_id, TOMBSTONE_KEY: True}) + "\n").encode()
+                f.write(line)
+                dead += index.docs[exp_id][DOC_LENGTH] + len(line)
+                index.remove(exp_id)
+                offset += len(line)
+            # No fsync: a lost tombstone leaves the record in both tiers, and the hot copy wins
+        index.mark_synced(self.path, offset)
+        if dead > COMPACT_MIN_BYTES and dead > offset * COMPACT_RATIO:
+            self.compact()
+        else:
+            index.save(self.index_path)
+            self._save_meta(dead)
+
+    def compact(self):
+        """Rewrite the archive with only its live records (the caller holds the writer lock)."""
+        if not self.path.exists():
+            return
+        index = self.index()
+        keep = sorted((doc[DOC_OFFSET], doc[DOC_LENGTH], exp_id) for exp_id, doc in index.docs.items())
+        offset = 0
+        with open(self.path, 'rb') as src, atomic_write(self.path, 'wb', self.durable) as out:
+            for old_offset, length, exp_id in keep:
+                src.seek(old_offset)
+                out.write(src.read(length))
+                index.docs[exp_id][DOC_OFFSET] = offset
+                offset += length
+        index.mark_synced(self.path, offset)
+        index.save(self.index_path, compact=True)
+        self._save_meta(0)
+
+    def _dead_bytes(self) -> int:
+        """Bytes of retracted and superseded lines (0 if the sidecar is stale)."""
+        dead = self._meta().get("dead_bytes", 0)
+        return dead if isinstance(dead, int) else 0
+
+    def _save_meta(self, dead_bytes: int):
+        with atomic_write(self.meta_path, durable=False) as f:
+            json.dump({"records": len(self._index), "db_size": self.path.stat().st_size,
+                       "dead_bytes": dead_bytes}, f)
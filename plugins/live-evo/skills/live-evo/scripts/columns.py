@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Compact columnar view of the experience store.
+
+Listing, sorting and statistics only need a handful of scalar fields, so
+instead of materializing every record as a dict they run on columns:
+array-backed weight / use_count / success_count, interned category codes,
+created_at, the id and each record's storage position. Text fields are not
+held at all; `records()` reads the few full records a caller asks for
+through a loader supplied by the backend (line offsets for JSONL, rowids
+for SQLite).
+
+At a million experiences the columns take tens of megabytes where the list
+of dicts took gigabytes.
+
+The columns can be saved as a binary snapshot and mmap-loaded by a fresh
+process instead of parsing every line of the store. Layout, after a fixed
+header (magic, byte order, row count, the source stamp and section sizes):
+
+    positions   int64[rows]    storage position of each record
+    lengths     int64[rows]    record length in bytes
+    weight      float64[rows]
+    use_count   int64[rows]
+    success_count int64[rows]
+    categories  uint16[rows]   codes into the category table (padded to 8 bytes)
+    text        utf-8          ids then created_at values, newline-separated
+    table       JSON           category table
+
+Record text is not copied: the offsets table points into the store. The
+source stamp is opaque here; the backend uses it to tell whether the
+snapshot still describes the store.
+"""
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from locking import atomic_write
+
+# Scalar fields held as columns; sort keys (see query_experiences) must be among them
+NUMERIC_FIELDS = ("weight", "use_count", "success_count")
+SORT_FIELDS = ("weight", "created_at", "use_count")
+
+_SNAPSHOT_MAGIC = b"LEC1"
+# magic, little-endian flag, rows, source stamp (3 x int64), text bytes, table bytes
+_SNAPSHOT_HEADER = struct.Struct("<4sB3xQqqqQQ")
+# Array sections in file order
+_SNAPSHOT_ARRAYS = ("positions", "lengths", "weight", "use_count", "success_count",
+                    "category_codes")
+
+
+def _padded(size: int) -> int:
+    return -(-size // 8) * 8
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ExperienceColumns:
+    """Scalar fields of every experience, one column per field, in storage order."""
+
+    def __init__(self, loader: Optional[Callable[["ExperienceColumns", List[int]], List[Dict]]] = None):
+        self.ids: List[Optional[str]] = []
+        # Storage position of each row (DB offset / rowid); ascending
+        self.positions = array('q')
+        # Byte length of each row's record where the store has one (JSONL lines)
+        self.lengths = array('q')
+        self.weight = array('d')
+        self.use_count = array('q')
+        self.success_count = array('q')
+        self.created_at: List[str] = []
+        self.category_codes = array('H')
+        self.categories: List[Optional[str]] = []
+        self._category_code: Dict[Optional[str], int] = {}
+        # (columns, rows) -> full records (same order), supplied by the backend
+        self.loader = loader
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _code(self, category: Optional[str]) -> int:
+        code = self._category_code.get(category)
+        if code is None:
+            code = self._category_code[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def append(self, exp: Dict, position: int, length: int = 0, default_weight: float = 1.0):
+        """Add one record's scalar fields (the record itself is not kept)."""
+        self.ids.append(exp.get("id"))
+        self.positions.append(position)
+        self.lengths.append(length)
+        self.weight.append(float(exp.get("weight", default_weight)))
+        self.use_count.append(_as_int(exp.get("use_count", 0)))
+        self.success_count.append(_as_int(exp.get("success_count", 0)))
+        self.created_at.append(exp.get("created_at", ""))
+        self.category_codes.append(self._code(exp.get("category")))
+
+    def set_fields(self, row: int, fields: Dict):
+        """Overwrite a row's numeric fields (used to apply weight deltas)."""
+        if "weight" in fields:
+            self.weight[row] = float(fields["weight"])
+        if "use_count" in fields:
+            self.use_count[row] = _as_int(fields["use_count"])
+        if "success_count" in fields:
+            self.success_count[row] = _as_int(fields["success_count"])
+
+    def category(self, row: int) -> Optional[str]:
+        return self.categories[self.category_codes[row]]
+
+    def column(self, field: str):
+        return self.created_at if field == "created_at" else getattr(self, field)
+
+    # --- queries -----------------------------------------------------------
+
+    def rows(self, where=None) -> Iterable[int]:
+        """Row numbers, optionally only those matching a RecordFilter."""
+        rows = range(len(self))
+        if not where:
+            return rows
+        if where.category is not None:
+            code = self._category_code.get(where.category)
+            if code is None:
+                return []
+            codes = self.category_codes
+            rows = [r for r in rows if codes[r] == code]
+        if where.min_weight is not None or where.max_weight is not None:
+            weight = self.weight
+            rows = [r for r in rows if where.weight_ok(weight[r])]
+        if where.created_since is not None or where.created_before is not None:
+            created = self.created_at
+            rows = [r for r in rows if where.created_ok(created[r])]
+        return rows
+
+    def order(self, sort: str, where=None, limit: Optional[int] = None) -> List[int]:
+        """
+        Rows matching `where`, sorted by `sort` descending, ties in storage
+        order (a stable reverse sort of the records, without building them).
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort!r}")
+        key = self.column(sort).__getitem__
+        rows = self.rows(where)
+        if limit is not None:
+            # nlargest keeps the first of equal keys, like the stable sort
+            return heapq.nlargest(limit, rows, key=key)
+        return sorted(rows, key=key, reverse=True)
+
+    def records(self, rows: List[int]) -> List[Dict]:
+        """Full records for the given rows, in that order (text is read only now)."""
+        return self.loader(self, rows) if rows else []
+
+    # --- snapshot ----------------------------------------------------------
+
+    def save_snapshot(self, path: Path, source: Tuple[int, int, int]) -> bool:
+        """
+        Write the columns as a binary snapshot tagged with `source`. Returns
+        False (and writes nothing) if a text column cannot be stored losslessly.
+        """
+        values = self.ids + self.created_at
+        if not all(isinstance(v, str) and "\n" not in v for v in values):
+            return False
+        text = "\n".join(values).encode()
+        table = json.dumps(self.categories).encode()
+        header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, sys.byteorder == "little", len(self),
+                                       *source, len(text), len(table))
+        with atomic_write(path, 'wb', durable=False) as f:
+            f.write(header)
+            for name in _SNAPSHOT_ARRAYS:
+                data = getattr(self, name).tobytes()
+                f.write(data + bytes(_padded(len(data)) - len(data)))
+            f.write(text)
+            f.write(table)
+        return True
+
+    @classmethod
+    def load_snapshot(cls, path: Path, loader=None
+                      ) -> Optional[Tuple["ExperienceColumns", Tuple[int, int, int]]]:
+        """(columns, source stamp) from a snapshot, or None if missing or unreadable."""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _SNAPSHOT_HEADER.size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, little, rows, *rest = _SNAPSHOT_HEADER.unpack_from(mm)
+                source, text_bytes, table_bytes = tuple(rest[:3]), rest[3], rest[4]
+                if magic != _SNAPSHOT_MAGIC or bool(little) != (sys.byteorder == "little"):
+                    return None
+                cols = cls(loader)
+                pos = _SNAPSHOT_HEADER.size
+                sections = [_padded(rows * getattr(cols, n).itemsize) for n in _SNAPSHOT_ARRAYS]
+                if size != pos + sum(sections) + text_bytes + table_bytes:
+                    return None
+                with memoryview(mm) as view:
+                    for name, length in zip(_SNAPSHOT_ARRAYS, sections):
+                        column = getattr(cols, name)
+                        column.frombytes(view[pos:pos + rows * column.itemsize])
+                        pos += length
+                    text = bytes(view[pos:pos + text_bytes]).decode()
+                    table = json.loads(bytes(view[pos + text_bytes:pos + text_bytes + table_bytes]))
+        values = text.split("\n") if rows else []
+        if len(values) != 2 * rows:
+            return None
+        cols.ids, cols.created_at = values[:rows], values[rows:]
+        for category in table:
+            cols._code(category)
+        return cols, source
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Optional resident Live-Evo server.
+
+`python daemon.py start` launches a long-lived process that keeps the storage
+backend (index, delta log, records already read) in memory and answers
+requests over a Unix socket in ~/.live-evo/. The CLI scripts talk to it via
+call(), which falls back to running the same operation in-process when no
+daemon is listening, so output is identical either way.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"op": "retrieve", "args": {...}}
+    response: {"ok": true, "result": ...} or {"ok": false, "error": "..."}
+
+A request with "profile": true is profiled in the daemon and its response
+carries the breakdown under "profile" (see profiling.py); the client folds
+it into its own report under "daemon/".
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import experience_manager as em
+import profiling
+from profiling import span
+
+SOCKET_PATH = em.EXPERIENCE_DIR / "live-evo.sock"
+PID_PATH = em.EXPERIENCE_DIR / "live-evo.pid"
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 60.0
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on SOCKET_PATH."""
+
+
+def _op_retrieve(query, top_k=5, threshold=0.1, category=None, scorer=em.DEFAULT_SCORER):
+    return em.retrieve_experiences(query, top_k=top_k, threshold=threshold,
+                                   category=category, scorer=scorer)
+
+
+def _op_add(**kwargs):
+    return em.add_experience(**kwargs)
+
+
+def _op_update(experience_ids, helped):
+    return em.update_weights(experience_ids, helped)
+
+
+def _op_update_many(verdicts):
+    return em.update_weights_many([(ids, helped) for ids, helped in verdicts])
+
+
+def _op_stats(top_n=3, rebuild=False):
+    return em.get_statistics(top_n, rebuild)
+
+
+def _op_history(experience_id):
+    return em.get_experience_history(experience_id)
+
+
+def _op_query(category=None, sort="weight", limit=None, **filters):
+    return em.query_experiences(category, sort, limit, **filters)
+
+
+def _op_count():
+    return em.count_experiences()
+
+
+def _op_ping():
+    return {"pid": os.getpid(), "backend": em.get_backend().name}
+
+
+# Operations served by the daemon; call() runs the same functions in-process
+OPS = {
+    "retrieve": _op_retrieve,
+    "add": _op_add,
+    "update": _op_update,
+    "update_many": _op_update_many,
+    "stats": _op_stats,
+    "history": _op_history,
+    "query": _op_query,
+    "count": _op_count,
+    "ping": _op_ping,
+}
+
+
+def request(op: str, **args):
+    """Send one request to the daemon. Raises DaemonUnavailable if none is running."""
+    if not SOCKET_PATH.exists():
+        raise DaemonUnavailable(str(SOCKET_PATH))
+    # Imported here: with no daemon running, clients never need it
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(SOCKET_PATH))
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+        sock.settimeout(REQUEST_TIMEOUT)
+        message = {"op": op, "args": args}
+        if profiling.enabled():
+            message["profile"] = True
+        sock.sendall(json.dumps(message, default=str).encode() + b"\n")
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise DaemonUnavailable("daemon closed the connection")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise RuntimeError(f"live-evo daemon error: {response.get('error')}")
+    if "profile" in response:
+        profiling.merge(response["profile"], "daemon")
+    return response["result"]
+
+
+def call(op: str, **args):
+    """Run an operation through the daemon if it is running, else in-process."""
+    with span(op):
+        try:
+            return request(op, **args)
+        except DaemonUnavailable:
+            return json.loads(json.dumps(OPS[op](**args), default=str))
+
+
+def _server_classes():
+    """The request handler and server classes (socketserver is only imported to serve)."""
+    import socketserver
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    req = json.loads(line)
+                    op = req.get("op")
+                    if req.get("profile"):
+                        profiling.enable()
+                    if op == "shutdown":
+                        result = {"pid": os.getpid()}
+                        self.server.shutdown_requested = True
+                    elif op in OPS:
+                        result = OPS[op](**req.get("args", {}))
+                    else:
+                        raise ValueError(f"unknown op {op!r}")
+                    response = {"ok": True, "result": result}
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                if profiling.enabled():
+                    response["profile"] = profiling.report()
+                    profiling.disable()
+                self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+                self.wfile.flush()
+                self.server.last_activity = time.monotonic()
+
+    class _Server(socketserver.UnixStreamServer):
+        # Requests are handled one at a time, so backend state needs no locking
+        timeout = 0.5
+        shutdown_requested = False
+        last_activity = 0.0
+
+    return _Handler, _Server
+
+
+def serve(idle_timeout: float = 0.0):
+    """Run the daemon in the foreground until shut down (or idle for idle_timeout s)."""
+    em.ensure_dirs()
+    if SOCKET_PATH.exists():
+        try:
+            request("ping")
+        except DaemonUnavailable:
+            SOCKET_PATH.unlink()
+        else:
+            raise SystemExit(f"live-evo daemon already running on {SOCKET_PATH}")
+
+    # Warm the backend (index, delta log) before accepting requests
+    em.count_experiences()
+
+    handler, server_class = _server_classes()
+    with server_class(str(SOCKET_PATH), handler) as server:
+        PID_PATH.write_text(str(os.getpid()))
+        server.last_activity = time.monotonic()
+        try:
+            while not server.shutdown_requested:
+                server.handle_request()
+                if idle_timeout > 0 and time.monotonic() - server.last_activity > idle_timeout:
+                    break
+        finally:
+            for path in (SOCKET_PATH, PID_PATH):
+                if path.exists():
+                    path.unlink()
+
+
+def add_arguments(parser):
+    parser.add_argument("command", choices=["start", "serve", "stop", "status"],
+                       help="start: launch in background; serve: run in foreground")
+    parser.add_argument("--idle-timeout", type=float, default=0.0,
+                       help="Exit after this many idle seconds (0 = never)")
+
+
+def run(parser, args):
+    if args.command == "serve":
+        serve(args.idle_timeout)
+    elif args.command == "start":
+        try:
+            info = request("ping")
+            print(f"live-evo daemon already running (pid {info['pid']})")
+            return
+        except DaemonUnavailable:
+            pass
+        import subprocess
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "serve",
+                          "--idle-timeout", str(args.idle_timeout)],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+        print(f"live-evo daemon starting on {SOCKET_PATH}")
+    elif args.command == "stop":
+        try:
+            info = request("shutdown")
+            print(f"live-evo daemon stopped (pid {info['pid']})")
+        except DaemonUnavailable:
+            print("live-evo daemon is not running")
+    else:
+        try:
+            info = request("ping")
+            print(f"live-evo daemon running (pid {info['pid']}, backend {info['backend']})")
+        except DaemonUnavailable:
+            print("live-evo daemon is not running")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resident Live-Evo server over a Unix socket")
+    add_arguments(parser)
+    run(parser, parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Merge near-duplicate experiences already in the database.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from experience_manager import DUPLICATE_THRESHOLD, dedup_experiences
+from profiling import add_profile_argument, profile_cli
+
+
+def add_arguments(parser):
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                       help="Similarity (0-1) at which two experiences count as duplicates")
+    parser.add_argument("--dry-run", "-n", action="store_true",
+                       help="Report duplicate groups without changing the database")
+    parser.add_argument("--verbose", "-v", action="store_true", help="List every duplicate group")
+
+
+def run(parser, args):
+    result = dedup_experiences(args.threshold, dry_run=args.dry_run)
+
+    if args.verbose:
+        for kept, merged in result["groups"].items():
+            print(f"{kept} <- {', '.join(merged)}")
+        if result["groups"]:
+            print()
+
+    verb = "Would merge" if args.dry_run else "Merged"
+    print(f"Scanned {result['scanned']} experiences")
+    print(f"{verb} {result['removed']} near-duplicates into {len(result['groups'])} experiences")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge near-duplicate experiences")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("dedup", args.profile)
+    run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Delta bundles and sync state for sharing experiences between hosts.
+
+Every host has a random host id. What it shares is what originated on it:
+
+- records it created (records received from a peer carry an "origin"
+  field naming the host that created them), and
+- verdicts, i.e. the weight-history entries update_weights writes, and
+  merge confirmations (see weight_history.CONFIRM_KIND), which travel and
+  replay the same way but add no success. A verdict is identified by
+  (origin host, seq), where seq numbers a host's own entries in history
+  order; received verdicts are appended to the history with their origin
+  and seq.
+
+A bundle is a gzip-compressed JSON-lines file: a header line, then one
+line per record and one per verdict. Per peer, the exporter keeps a
+watermark (the last record row and verdict seq it sent), so a bundle
+carries only what changed since the previous one.
+
+Merging is deterministic. Records are a union by id. An experience's
+weight, use_count and success_count are recomputed from its base values
+(those it had before its first verdict) by replaying every known verdict
+in (timestamp, origin, seq) order, so hosts that have seen the same
+verdicts agree regardless of the order bundles arrived in, and the counts
+are the base plus the number of (helpful) verdicts: a commutative merge.
+
+Peers are plain directories used as mailboxes: `push` drops this host's
+next bundle there as <host>.<number>.bundle.gz and `pull` imports the
+bundles other hosts left. Several hosts sharing one directory converge.
+
+The bundle format and merge rules come first; export_changes,
+import_bundles, push_changes and pull_changes below apply them to the
+store under experience_manager's write lock.
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import experience_manager as em
+from locking import atomic_write
+from weight_history import CONFIRM_KIND, is_confirm, is_success
+
+BUNDLE_FORMAT = "live-evo-delta"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".bundle.gz"
+
+# Fields of a verdict as shipped in a bundle, plus "kind" for a merge confirmation
+EVENT_FIELDS = ("origin", "seq", "timestamp", "experience_id", "helped")
+
+
+def ship_event(event: Dict) -> Dict:
+    """A history event as it travels in a bundle."""
+    shipped = {f: event[f] for f in EVENT_FIELDS}
+    if is_confirm(event):
+        shipped["kind"] = CONFIRM_KIND
+    return shipped
+
+
+def bundle_name(origin: str, number: int) -> str:
+    return f"{origin}.{number:06d}{BUNDLE_SUFFIX}"
+
+
+def parse_bundle_name(name: str) -> Optional[Tuple[str, int]]:
+    """(origin, number) of a bundle file name, or None for other files."""
+    if not name.endswith(BUNDLE_SUFFIX):
+        return None
+    origin, _, number = name[:-len(BUNDLE_SUFFIX)].rpartition(".")
+    if not origin or not number.isdigit():
+        return None
+    return origin, int(number)
+
+
+def write_bundle(path: Path, origin: str, number: int, records: List[Dict],
+                 events: List[Dict]) -> int:
+    """Write a bundle atomically; returns its size in bytes."""
+    header = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "origin": origin,
+              "number": number, "records": len(records), "events": len(events)}
+    with atomic_write(path, 'wb') as out:
+        with gzip.GzipFile(fileobj=out, mode='wb', mtime=0) as gz:
+            gz.write((json.dumps(header) + "\n").encode())
+            for exp in records:
+                gz.write((json.dumps({"record": exp}, separators=(",", ":"), default=str)
+                          + "\n").encode())
+            for event in events:
+                gz.write((json.dumps({"event": event}, separators=(",", ":")) + "\n").encode())
+    return path.stat().st_size
+
+
+def read_bundle(path: Path) -> Tuple[Dict, List[Dict], List[Dict]]:
+    """(header, records, events) of a bundle. Raises ValueError if it is not one."""
+    records, events = [], []
+    with gzip.open(path, 'rb') as f:
+        header = json.loads(f.readline() or b"null")
+        if (not isinstance(header, dict) or header.get("format") != BUNDLE_FORMAT
+                or header.get("version") != BUNDLE_VERSION):
+            raise ValueError(f"{path} is not a live-evo delta bundle")
+        for line in f:
+            item = json.loads(line)
+            if "record" in item:
+                records.append(item["record"])
+            elif "event" in item:
+                events.append(item["event"])
+    if len(records) != header["records"] or len(events) != header["events"]:
+        raise ValueError(f"{path} is truncated")
+    return header, records, events
+
+
+def event_key(event: Dict) -> tuple:
+    """Replay order of verdicts; the same on every host."""
+    return event["timestamp"], event["origin"], event["seq"]
+
+
+def replay(base_weight: float, events: Iterable[Dict],
+           step: Callable[[float, bool], float]) -> Tuple[float, List[Tuple[Dict, float, float]]]:
+    """Apply verdicts in replay order: (final weight, [(event, old, new), ...])."""
+    weight = base_weight
+    steps = []
+    for event in sorted(events, key=event_key):
+        old, weight = weight, step(weight, bool(event["helped"]))
+        steps.append((event, old, weight))
+    return weight, steps
+
+
+def seq_seen(ranges: List[List[int]], seq: int) -> bool:
+    return any(lo <= seq <= hi for lo, hi in ranges)
+
+
+def add_seqs(ranges: List[List[int]], seqs: Iterable[int]) -> List[List[int]]:
+    """Merge seqs into sorted, disjoint [lo, hi] ranges."""
+    points = sorted(set(seqs))
+    merged = sorted([list(r) for r in ranges] + [[s, s] for s in points])
+    out: List[List[int]] = []
+    for lo, hi in merged:
+        if out and lo <= out[-1][1] + 1:
+            out[-1][1] = max(out[-1][1], hi)
+        else:
+            out.append([lo, hi])
+    return out
+
+
+def _empty_state() -> Dict:
+    return {
+        "version": 1,
+        "host": os.urandom(8).hex(),
+        # peer -> export watermark: last record row id and own verdict seq sent, bundles written
+        "peers": {},
+        # origin -> verdict seqs received, as [lo, hi] ranges
+        "received": {},
+        # peer directory -> {origin: last bundle number pulled}
+        "pulled": {},
+        # Received verdicts for experiences whose record has not arrived yet
+        "pending": [],
+    }
+
+
+class SyncState:
+    """This host's id, per-peer watermarks and received-verdict positions (one JSON file)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data = _empty_state()
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncState":
+        state = cls(path)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == 1:
+            state.data.update(data)
+        return state
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump(self.data, f, indent=1)
+
+    @property
+    def host(self) -> str:
+        return self.data["host"]
+
+    def watermark(self, peer: str) -> Dict:
+        return self.data["peers"].setdefault(peer, {"after": None, "seq": -1, "bundles": 0})
+
+
+# --- the store side: export, import, push and pull ---------------------------
+
+def _history_events(host: str, ids: Optional[Set[str]] = None) -> Iterable[Dict]:
+    """
+    Weight-history entries as verdicts with their (origin, seq) identity,
+    optionally only for `ids`. Entries written here carry no origin: they
+    are this host's, numbered in history order.
+    """
+    local_seq = 0
+    for entry in em.iter_weight_history():
+        if "origin" in entry:
+            origin, seq = entry["origin"], entry["seq"]
+        else:
+            origin, seq = host, local_seq
+            local_seq += 1
+        if ids is None or entry.get("experience_id") in ids:
+            event = dict(entry, origin=origin, seq=seq)
+            event.setdefault("helped", False)
+            yield event
+
+
+def _base_values(exp: Dict, events: List[Dict]) -> Dict:
+    """
+    An experience's fields before its recorded verdicts (`events`, in
+    history order): the first entry's old weight, and counts less one use
+    per verdict and one success per helpful verdict.
+    """
+    first_weight = events[0].get("old_weight") if events else None
+    return {
+        "weight": exp.get("weight", em.INITIAL_WEIGHT) if first_weight is None else first_weight,
+        "use_count": max(0, exp.get("use_count", 0) - len(events)),
+        "success_count": max(0, exp.get("success_count", 0) - sum(1 for e in events if is_success(e))),
+    }
+
+
+def get_sync_state():
+    return SyncState.load(em.SYNC_STATE_PATH)
+
+
+def export_changes(peer: str, path: Path) -> Dict:
+    """
+    Write a delta bundle of what originated on this host since `peer`'s
+    watermark, then advance the watermark.
+
+    Records are shipped with their base values; the verdicts since the
+    watermark travel alongside, and every host replays them. If `path` is
+    a directory the bundle is dropped there under its canonical name, and
+    nothing is written when there is nothing new.
+
+    Returns {"path", "number", "records", "events", "bytes"}.
+    """
+    with em.write_lock():
+        state = get_sync_state()
+        host = state.host
+        mark = state.watermark(peer)
+        backend = em.get_backend()
+        cols = backend.columns()
+
+        start = 0
+        if mark["after"] is not None:
+            try:
+                start = cols.ids.index(mark["after"]) + 1
+            except ValueError:
+                # The last row sent is gone (merged away): resend, importers skip known ids
+                start = 0
+        records = cols.records(list(range(start, len(cols))))
+        if records is None:
+            raise RuntimeError("experience DB changed while it was being exported")
+        records = [exp for exp in records if "origin" not in exp]
+
+        wanted = {exp["id"] for exp in records}
+        events, history = [], {}
+        last_seq = mark["seq"]
+        for event in _history_events(host):
+            if event["origin"] == host:
+                if event["seq"] > mark["seq"]:
+                    events.append(ship_event(event))
+                last_seq = max(last_seq, event["seq"])
+            if event["experience_id"] in wanted:
+                history.setdefault(event["experience_id"], []).append(event)
+
+        for exp in records:
+            past = history.get(exp["id"], [])
+            exp.update(_base_values(exp, past), origin=host)
+            if past:
+                # Receivers derive it from the verdicts
+                exp.pop("last_used", None)
+
+        number = mark["bundles"] + 1
+        if path.is_dir():
+            if not records and not events:
+                return {"path": None, "number": mark["bundles"], "records": 0, "events": 0, "bytes": 0}
+            path = path / bundle_name(host, number)
+        size = write_bundle(path, host, number, records, events)
+        mark.update(after=cols.ids[-1] if len(cols) else mark["after"], seq=last_seq, bundles=number)
+        state.save()
+
+    return {"path": str(path), "number": number, "records": len(records),
+            "events": len(events), "bytes": size}
+
+
+def import_bundles(paths: Iterable[Path], peer: Optional[str] = None) -> Dict:
+    """
+    Merge delta bundles from other hosts into the store.
+
+    New records are added (a union by id), verdicts not seen before are
+    appended to the weight history, and every experience they touch has
+    its weight and counts recomputed by replaying all of its verdicts from
+    its base values, so the result does not depend on import order.
+    Verdicts for records that have not arrived yet wait in the sync state.
+    With `peer`, the bundle numbers pulled from it are recorded.
+
+    Returns {"bundles", "records", "events", "pending"}.
+    """
+    with em.write_lock():
+        state = get_sync_state()
+        host = state.host
+        backend = em.get_backend()
+        bundles = [read_bundle(Path(p)) for p in paths]
+        bundles.sort(key=lambda b: (b[0]["origin"], b[0]["number"]))
+
+        incoming: Dict[str, Dict] = {}
+        events = state.data["pending"]
+        received = state.data["received"]
+        pulled = state.data["pulled"].setdefault(peer, {}) if peer else {}
+        for header, records, bundle_events in bundles:
+            origin = header["origin"]
+            if origin == host:
+                continue
+            for exp in records:
+                incoming.setdefault(exp["id"], dict(exp, origin=exp.get("origin", origin)))
+            ranges = received.get(origin, [])
+            fresh = [e for e in bundle_events
+                     if e.get("origin") == origin and not seq_seen(ranges, e["seq"])]
+            events.extend(fresh)
+            received[origin] = add_seqs(ranges, (e["seq"] for e in fresh))
+            pulled[origin] = max(pulled.get(origin, 0), header["number"])
+
+        known = set(backend.positions(set(incoming) | {e["experience_id"] for e in events}))
+        # Records this host archived are known too; their verdicts wait until they are promoted
+        archived = em.get_archive().ids() & set(incoming) if incoming else set()
+        new_records = [exp for exp_id, exp in incoming.items()
+                       if exp_id not in known and exp_id not in archived]
+        for exp in new_records:
+            backend.append(exp)
+        known.update(exp["id"] for exp in new_records)
+        state.data["pending"] = [e for e in events if e["experience_id"] not in known]
+        ready = [e for e in events if e["experience_id"] in known]
+
+        if ready:
+            _replay_verdicts(backend, host, ready)
+        state.save()
+        if new_records or ready:
+            em.rebuild_statistics()
+    if new_records:
+        em._enforce_capacity()
+
+    return {"bundles": len(bundles), "records": len(new_records), "events": len(ready),
+            "pending": len(state.data["pending"])}
+
+
+def _replay_verdicts(backend, host: str, new_events: List[Dict]):
+    """Append received verdicts to the history and recompute the experiences they touch."""
+    by_id: Dict[str, List[Dict]] = {}
+    for event in new_events:
+        by_id.setdefault(event["experience_id"], []).append(event)
+    history: Dict[str, List[Dict]] = {}
+    for event in _history_events(host, set(by_id)):
+        history.setdefault(event["experience_id"], []).append(event)
+
+    changes, lines = [], []
+    for exp in backend.get_many(by_id):
+        exp_id = exp["id"]
+        past, new = history.get(exp_id, []), by_id[exp_id]
+        base = _base_values(exp, past)
+        every = past + new
+        weight, steps = replay(base["weight"], every, em._weight_step)
+        fresh = {id(e) for e in new}
+        for event, old_weight, new_weight in steps:
+            if id(event) in fresh:
+                line = {
+                    "timestamp": event["timestamp"],
+                    "experience_id": exp_id,
+                    "old_weight": old_weight,
+                    "new_weight": new_weight,
+                    "helped": bool(event["helped"]),
+                    "origin": event["origin"],
+                    "seq": event["seq"],
+                }
+                if is_confirm(event):
+                    line["kind"] = CONFIRM_KIND
+                lines.append(json.dumps(line) + "\n")
+        changes.append({
+            "id": exp_id,
+            "weight": weight,
+            "use_count": base["use_count"] + len(every),
+            "success_count": base["success_count"] + sum(1 for e in every if is_success(e)),
+            "last_used": max(e["timestamp"] for e in every),
+        })
+
+    if changes:
+        backend.update_fields(changes)
+        em._append_lines(em.WEIGHT_HISTORY_PATH, lines, durable=False)
+        em.get_weight_history().maybe_rotate()
+
+
+def push_changes(directory: Path) -> Dict:
+    """Drop this host's next delta bundle into a peer directory (see export_changes)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    return export_changes(str(directory.resolve()), directory)
+
+
+def pull_changes(directory: Path) -> Dict:
+    """Import the bundles other hosts left in a peer directory since the last pull."""
+    peer = str(directory.resolve())
+    state = get_sync_state()
+    pulled = state.data["pulled"].get(peer, {})
+    paths = []
+    for path in sorted(directory.glob("*" + BUNDLE_SUFFIX)):
+        name = parse_bundle_name(path.name)
+        if name and name[0] != state.host and name[1] > pulled.get(name[0], 0):
+            paths.append(path)
+    return import_bundles(paths, peer)
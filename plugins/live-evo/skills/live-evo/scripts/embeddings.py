@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Offline embedding retrieval for Live-Evo.
+
+Experiences are embedded with a local, dependency-free encoder: tokens and
+their character trigrams are feature-hashed, and each hashed feature is sent
+through a fixed sparse random projection (a few signed output coordinates per
+feature), giving an L2-normalized float32 vector.
+
+Vectors live in a memory-mapped matrix under ~/.live-evo/, row-aligned with a
+plain-text id file, so a query only embeds itself and reads rows from the
+mmap. Once the store is large enough an IVF layer (coarse centroids over a
+prefix of the dimensions plus per-centroid row lists) restricts scoring to
+the rows of the closest few centroids.
+"""
+import hashlib
+import math
+import mmap
+import operator
+import os
+import random
+import struct
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+EMBED_DIM = 256
+# Output coordinates each hashed feature is projected onto
+_PROJECTIONS_PER_FEATURE = 2
+
+# IVF parameters
+IVF_MIN_ROWS = 4096
+IVF_COARSE_DIM = 32
+IVF_NPROBE = 8
+IVF_TRAIN_ITERATIONS = 4
+# Rebuild the IVF once this fraction of rows is not covered by it
+IVF_MAX_TAIL_FRACTION = 0.25
+# Rebuild the whole store once this fraction of rows belongs to deleted experiences
+MAX_DEAD_FRACTION = 0.25
+
+_VECTORS_MAGIC = b"LEV1"
+_IVF_MAGIC = b"LEI1"
+_VECTORS_HEADER = struct.Struct("<4sII")  # magic, dim, rows
+_IVF_HEADER = struct.Struct("<4sIII")     # magic, nlist, coarse dim, rows covered
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str) -> tuple:
+    """Projected (coordinate, value) contributions of one token and its trigrams."""
+    padded = f" {token} "
+    trigrams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    features = [(token, 1.0)] + [("#" + g, 1.0 / len(trigrams)) for g in trigrams]
+
+    contributions = []
+    for feature, value in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=4 * _PROJECTIONS_PER_FEATURE).digest()
+        for j in range(_PROJECTIONS_PER_FEATURE):
+            h = int.from_bytes(digest[4 * j:4 * j + 4], "little")
+            sign = 1.0 if h & 1 else -1.0
+            contributions.append(((h >> 1) % EMBED_DIM, sign * value))
+    return tuple(contributions)
+
+
+def embed(text: str) -> array:
+    """Embed text as an L2-normalized float32 vector of EMBED_DIM values."""
+    vec = [0.0] * EMBED_DIM
+    for token in text.lower().split():
+        for coord, value in _token_features(token):
+            vec[coord] += value
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm:
+        vec = [v / norm for v in vec]
+    return array('f', vec)
+
+
+def _dot(a, b) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+class VectorStore:
+    """Row-aligned (experience id, float32 vector) store backed by mmap."""
+
+    def __init__(self, directory: Path):
+        self.vectors_path = directory / "embeddings.f32"
+        self.ids_path = directory / "embeddings.ids"
+        self.ivf_path = directory / "embeddings.ivf"
+        self.ids: List[str] = []
+        self.rows = 0
+        self._ids_on_disk = 0
+        self._mm = None
+        self._view = None
+        self._ivf = None
+
+    # --- opening -----------------------------------------------------------
+
+    @classmethod
+    def open(cls, directory: Path) -> "VectorStore":
+        store = cls(directory)
+        store._open()
+        return store
+
+    def _open(self):
+        self.close()
+        self.ids, self.rows, self._ids_on_disk = [], 0, 0
+        if not (self.vectors_path.exists() and self.ids_path.exists()):
+            return
+        with open(self.vectors_path, 'rb') as f:
+            header = f.read(_VECTORS_HEADER.size)
+            if len(header) < _VECTORS_HEADER.size:
+                return
+            magic, dim, rows = _VECTORS_HEADER.unpack(header)
+            if magic != _VECTORS_MAGIC or dim != EMBED_DIM:
+                return
+            if rows:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.ids_path, 'r') as f:
+            ids = f.read().split()
+        self._ids_on_disk = len(ids)
+        # A crash between the two appends leaves them uneven; trust the shorter
+        rows = min(rows, len(ids), self._row_capacity())
+        self.ids, self.rows = ids[:rows], rows
+        if self._mm is not None:
+            self._view = memoryview(self._mm)[_VECTORS_HEADER.size:
+                                              _VECTORS_HEADER.size + rows * EMBED_DIM * 4].cast('f')
+        self._ivf = self._load_ivf()
+
+    def _row_capacity(self) -> int:
+        if self._mm is None:
+            return 0
+        return (len(self._mm) - _VECTORS_HEADER.size) // (EMBED_DIM * 4)
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def row(self, i: int):
+        return self._view[i * EMBED_DIM:(i + 1) * EMBED_DIM]
+
+    # --- writing -----------------------------------------------------------
+
+    def rebuild(self, items: Iterable):
+        """Rewrite the store from (id, text) pairs."""
+        self.close()
+        for path in (self.vectors_path, self.ids_path, self.ivf_path):
+            if path.exists():
+                path.unlink()
+        self.ids, self.rows, self._ids_on_disk, self._ivf = [], 0, 0, None
+        self.append(items)
+
+    def append(self, items: Iterable):
+        """Embed and append (id, text) pairs."""
+        ids, buf = [], array('f')
+        for exp_id, text in items:
+            ids.append(exp_id)
+            buf.extend(embed(text))
+        if not ids:
+            return
+        self.close()
+        rows = self.rows + len(ids)
+        mode = 'r+b' if self.vectors_path.exists() else 'w+b'
+        with open(self.vectors_path, mode) as f:
+            f.seek(_VECTORS_HEADER.size + self.rows * EMBED_DIM * 4)
+            buf.tofile(f)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(_VECTORS_HEADER.pack(_VECTORS_MAGIC, EMBED_DIM, rows))
+        if self._ids_on_disk == self.rows:
+            with open(self.ids_path, 'a') as f:
+                f.write("".join(i + "\n" for i in ids))
+        else:
+            with open(self.ids_path, 'w') as f:
+                f.write("".join(i + "\n" for i in self.ids + ids))
+        self._open()
+
+    def needs_sync(self, live_ids: Iterable[str]) -> bool:
+        """Whether sync() would change anything for `live_ids`."""
+        live = set(live_ids)
+        stored = set(self.ids)
+        if not live <= stored:
+            return True
+        dead = sum(1 for i in self.ids if i not in live)
+        if self.rows and dead > self.rows * MAX_DEAD_FRACTION:
+            return True
+        return self.rows >= IVF_MIN_ROWS and self._ivf_needs_rebuild()
+
+    def sync(self, live_ids: Iterable[str], fetch_texts: Callable[[List[str]], Dict[str, str]]):
+        """
+        Make the store cover exactly `live_ids`.
+
+        Missing experiences are embedded and appended; rows of deleted
+        experiences are skipped at query time until they make up
+        MAX_DEAD_FRACTION of the store, which triggers a full rebuild.
+        """
+        live = set(live_ids)
+        stored = set(self.ids)
+        missing = sorted(i for i in live if i not in stored)
+        dead = sum(1 for i in self.ids if i not in live)
+        if self.rows and dead > self.rows * MAX_DEAD_FRACTION:
+            texts = fetch_texts(sorted(live))
+            self.rebuild(texts.items())
+        elif missing:
+            texts = fetch_texts(missing)
+            self.append((i, texts[i]) for i in missing if i in texts)
+        if self.rows >= IVF_MIN_ROWS and self._ivf_needs_rebuild():
+            self.build_ivf()
+
+    # --- IVF ---------------------------------------------------------------
+
+    def _load_ivf(self):
+        if self._mm is None or not self.ivf_path.exists():
+            return None
+        with open(self.ivf_path, 'rb') as f:
+            data = f.read()
+        if len(data) < _IVF_HEADER.size:
+            return None
+        magic, nlist, coarse_dim, covered = _IVF_HEADER.unpack_from(data)
+        if magic != _IVF_MAGIC or coarse_dim != IVF_COARSE_DIM or covered > self.rows:
+            return None
+        pos = _IVF_HEADER.size
+        centroids = array('f')
+        centroids.frombytes(data[pos:pos + nlist * coarse_dim * 4])
+        pos += nlist * coarse_dim * 4
+        offsets = array('I')
+        offsets.frombytes(data[pos:pos + (nlist + 1) * 4])
+        pos += (nlist + 1) * 4
+        members = array('I')
+        members.frombytes(data[pos:pos + covered * 4])
+        if len(members) != covered:
+            return None
+        return {
+            "centroids": [centroids[c * coarse_dim:(c + 1) * coarse_dim] for c in range(nlist)],
+            "offsets": offsets,
+            "members": members,
+            "covered": covered,
+        }
+
+    def _ivf_needs_rebuild(self) -> bool:
+        if self._ivf is None:
+            return True
+        return self.rows - self._ivf["covered"] > self.rows * IVF_MAX_TAIL_FRACTION
+
+    def _coarse(self, i: int):
+        return self._view[i * EMBED_DIM:i * EMBED_DIM + IVF_COARSE_DIM]
+
+    def _nearest(self, vec, centroids) -> int:
+        best, best_sim = 0, -2.0
+        for c, centroid in enumerate(centroids):
+            sim = _dot(vec, centroid)
+            if sim > best_sim:
+                best, best_sim = c, sim
+        return best
+
+    def build_ivf(self):
+        """
+        Train coarse centroids (k-means on a sample, over the first
+        IVF_COARSE_DIM projected dimensions) and bucket every row.
+        """
+        rows = self.rows
+        nlist = max(1, min(1024, int(math.sqrt(rows))))
+        rng = random.Random(rows)
+        sample = rng.sample(range(rows), min(rows, nlist * 32))
+        centroids = [list(self._coarse(i)) for i in sample[:nlist]]
+
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            sums = [[0.0] * IVF_COARSE_DIM for _ in range(nlist)]
+            counts = [0] * nlist
+            for i in sample:
+                vec = self._coarse(i)
+                c = self._nearest(vec, centroids)
+                counts[c] += 1
+                acc = sums[c]
+                for d in range(IVF_COARSE_DIM):
+                    acc[d] += vec[d]
+            for c in range(nlist):
+                if counts[c]:
+                    norm = math.sqrt(sum(v * v for v in sums[c])) or 1.0
+                    centroids[c] = [v / norm for v in sums[c]]
+
+        lists: List[List[int]] = [[] for _ in range(nlist)]
+        for i in range(rows):
+            lists[self._nearest(self._coarse(i), centroids)].append(i)
+
+        offsets, members = array('I', [0]), array('I')
+        for bucket in lists:
+            members.extend(bucket)
+            offsets.append(len(members))
+        flat = array('f')
+        for centroid in centroids:
+            flat.extend(centroid)
+
+        tmp_path = self.ivf_path.with_name(self.ivf_path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(_IVF_HEADER.pack(_IVF_MAGIC, nlist, IVF_COARSE_DIM, rows))
+            flat.tofile(f)
+            offsets.tofile(f)
+            members.tofile(f)
+        os.replace(tmp_path, self.ivf_path)
+        self._ivf = self._load_ivf()
+
+    def _probe_rows(self, query, nprobe: int) -> Iterable[int]:
+        ivf = self._ivf
+        coarse_query = query[:IVF_COARSE_DIM]
+        ranked = sorted(range(len(ivf["centroids"])),
+                        key=lambda c: _dot(coarse_query, ivf["centroids"][c]), reverse=True)
+        offsets, members = ivf["offsets"], ivf["members"]
+        for c in ranked[:nprobe]:
+            yield from members[offsets[c]:offsets[c + 1]]
+        # Rows appended after the IVF was trained are scanned directly
+        yield from range(ivf["covered"], self.rows)
+
+    # --- search ------------------------------------------------------------
+
+    def search(self, text: str, allow: Optional[Callable[[str], bool]] = None,
+               nprobe: int = IVF_NPROBE) -> Dict[str, float]:
+        """
+        Cosine similarity (clipped to [0, 1]) of `text` against stored rows.
+
+        Uses the IVF when present, otherwise scans every row. `allow`
+        filters experience ids (e.g. live ids in a category).
+        """
+        if not self.rows:
+            return {}
+        query = embed(text)
+        rows = self._probe_rows(query, nprobe) if self._ivf else range(self.rows)
+        scores = {}
+        ids = self.ids
+        for i in rows:
+            exp_id = ids[i]
+            if allow is not None and not allow(exp_id):
+                continue
+            sim = _dot(query, self.row(i))
+            if sim > 0.0:
+                scores[exp_id] = min(1.0, sim)
+        return scores
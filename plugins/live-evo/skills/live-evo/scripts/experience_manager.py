@@ -5,16 +5,49 @@ Simplified version for Claude Code environment.
 """
 import os
 import json
-import hashlib
-from datetime import datetime
+import heapq
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from inverted_index import (DOC_CATEGORY, DOC_LENGTH, DOC_OFFSET, DOC_WEIGHT, InvertedIndex,
+                            searchable_text, tail_crc, tokenize)
+from locking import atomic_write, file_lock, group_commit
+import profiling
+from profiling import span
+from phrase_match import PhraseMatcher
+from columns import ExperienceColumns
+from cold_tier import ColdArchive, TierPolicy, select_demotions
+from record_filter import RecordFilter, scan_jsonl
+from stats_summary import TOP_CAPACITY, StatsSummary
+from weight_history import CONFIRM_KIND, WeightHistory
 
 # Experience storage directory — always in ~/.live-evo/ for persistence
-# This works regardless of whether live-evo is installed as a personal skill or plugin
-EXPERIENCE_DIR = Path.home() / ".live-evo"
+# This works regardless of whether live-evo is installed as a personal skill or plugin.
+# LIVE_EVO_HOME points it elsewhere (benchmarks, scratch stores).
+EXPERIENCE_DIR = Path(os.environ.get("LIVE_EVO_HOME") or Path.home() / ".live-evo")
 DB_PATH = EXPERIENCE_DIR / "experience_db.jsonl"
+# Active weight-history segment; rotated segments and their rollup sit next to it
 WEIGHT_HISTORY_PATH = EXPERIENCE_DIR / "weight_history.jsonl"
+HISTORY_SEGMENT_DIR = EXPERIENCE_DIR / "weight_history"
+HISTORY_ROLLUP_PATH = EXPERIENCE_DIR / "weight_history_rollup.json"
+INDEX_PATH = EXPERIENCE_DIR / "experience_index.json"
+DELTA_LOG_PATH = EXPERIENCE_DIR / "weight_deltas.jsonl"
+SQLITE_PATH = EXPERIENCE_DIR / "experience_db.sqlite3"
+STATS_PATH = EXPERIENCE_DIR / "experience_stats.json"
+# Host id and per-peer watermarks for delta sync (see delta_sync.py)
+SYNC_STATE_PATH = EXPERIENCE_DIR / "sync_state.json"
+# Cold tier: demoted experiences, their index and record count, and the demotion policy (see cold_tier.py)
+ARCHIVE_PATH = EXPERIENCE_DIR / "experience_archive.jsonl"
+ARCHIVE_INDEX_PATH = EXPERIENCE_DIR / "experience_archive_index.json"
+ARCHIVE_META_PATH = EXPERIENCE_DIR / "experience_archive.json"
+TIER_POLICY_PATH = EXPERIENCE_DIR / "tier_policy.json"
+# Binary snapshot of the columnar view (see columns.py); a cache, the JSONL stays authoritative
+SNAPSHOT_PATH = EXPERIENCE_DIR / "experience_db.snapshot"
+# Writers serialize on LOCK_PATH; SYNC_LOCK_PATH queues group-commit fsyncs
+LOCK_PATH = EXPERIENCE_DIR / "experience_db.lock"
+SYNC_LOCK_PATH = EXPERIENCE_DIR / "experience_db.sync.lock"
 
 # Seed data bundled with the skill (for first-run initialization)
 _SCRIPT_DIR = Path(__file__).parent
@@ -27,50 +60,707 @@ MAX_WEIGHT = 2.0
 WEIGHT_INCREASE_RATE = 0.3
 WEIGHT_DECREASE_RATE = 0.2
 
+# Fields update_weights changes; recorded in the delta log instead of rewriting the DB
+DELTA_FIELDS = ("weight", "use_count", "success_count", "last_used")
+# Fold the delta log into the DB once it exceeds both of these
+DELTA_COMPACT_MIN_BYTES = 256 * 1024
+DELTA_COMPACT_RATIO = 0.25
+
+# Rotate the active weight-history segment at this size or once its oldest entry is this old
+HISTORY_SEGMENT_BYTES = 1024 * 1024
+HISTORY_SEGMENT_MAX_AGE = timedelta(days=7)
+
+# fsync appends (group-committed) and rewrites; LIVE_EVO_FSYNC=0 trades durability for speed
+DURABLE_WRITES = os.environ.get("LIVE_EVO_FSYNC", "1") != "0"
+
+# (Re)write the snapshot once this many DB bytes are not covered by it; LIVE_EVO_SNAPSHOT=0 disables it
+SNAPSHOT_REFRESH_BYTES = 256 * 1024
+SNAPSHOTS = os.environ.get("LIVE_EVO_SNAPSHOT", "1") != "0"
+
+# What add_experience does with a near-duplicate of a stored experience, and the
+# similarity (Jaccard over word tokens + bigrams of the text fields) that makes one
+DUPLICATE_ACTIONS = ("store", "reject", "merge")
+DUPLICATE_THRESHOLD = 0.7
+
+# Demote by the tier policy once the hot store outgrows its capacity (if the policy sets
+# one), and search the cold tier too when the hot results are few or weak;
+# LIVE_EVO_TIERS=0 keeps everything hot
+TIERING = os.environ.get("LIVE_EVO_TIERS", "1") != "0"
+# The cold tier is searched when the hot top_k is not full or its last score is below this
+COLD_SEARCH_SCORE = 0.5
+
+# On-disk LRU cache of retrieval results (see result_cache.py); LIVE_EVO_RESULT_CACHE=0 disables it
+RESULT_CACHE_DIR = EXPERIENCE_DIR / "retrieval_cache"
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+RESULT_CACHE = os.environ.get("LIVE_EVO_RESULT_CACHE", "1") != "0"
+
+# Append-only CLI timing log (LIVE_EVO_METRICS=1; see profiling.py)
+METRICS_PATH = EXPERIENCE_DIR / "metrics.jsonl"
+profiling.METRICS_PATH = METRICS_PATH
+
+# Sortable fields (see query_experiences) and the value used when a record lacks one
+SORT_DEFAULTS = {"weight": INITIAL_WEIGHT, "created_at": "", "use_count": 0}
+
+
+# Directories ensure_dirs() has already set up in this process
+_dirs_ready: Set[Path] = set()
+
 
 def ensure_dirs():
-    """Ensure experience directories exist. Copy seed data on first run."""
+    """
+    Ensure experience directories exist. Copy seed data on first run.
+    Done once per process: every store operation calls this.
+    """
+    if EXPERIENCE_DIR in _dirs_ready:
+        return
     EXPERIENCE_DIR.mkdir(parents=True, exist_ok=True)
     # On first run, copy bundled seed experiences if DB doesn't exist yet
     if not DB_PATH.exists() and _BUNDLED_SEED.exists():
         import shutil
         shutil.copy2(_BUNDLED_SEED, DB_PATH)
+    _dirs_ready.add(EXPERIENCE_DIR)
 
 
 def generate_id(text: str) -> str:
     """Generate a short unique ID from text."""
+    import hashlib
     return hashlib.md5(text.encode()).hexdigest()[:8]
 
 
-def load_experiences() -> List[Dict]:
-    """Load all experiences from the database."""
+# Appended files awaiting fsync: path -> end offset to make durable
+_pending_syncs: Dict[Path, int] = {}
+_write_depth = 0
+
+
+@contextmanager
+def write_lock():
+    """
+    Exclusive writer section over the experience store (reentrant).
+
+    Appends made inside are fsynced after the outermost section releases
+    the lock, through group_commit, so concurrent writers share fsyncs.
+    """
+    global _write_depth
     ensure_dirs()
-    experiences = []
-    if DB_PATH.exists():
-        with open(DB_PATH, 'r') as f:
+    with file_lock(LOCK_PATH):
+        _write_depth += 1
+        try:
+            yield
+        finally:
+            _write_depth -= 1
+    if _write_depth == 0 and _pending_syncs:
+        pending = dict(_pending_syncs)
+        _pending_syncs.clear()
+        with span("fsync"):
+            for path, end in pending.items():
+                group_commit(path, end, SYNC_LOCK_PATH)
+
+
+def _append_lines(path: Path, lines: List[str], durable: bool = True) -> int:
+    """Append whole lines in one write under the writer lock; returns the new end offset."""
+    data = "".join(lines).encode()
+    with write_lock():
+        with open(path, 'ab') as f:
+            f.write(data)
+            end = f.tell()
+        if durable and DURABLE_WRITES:
+            _pending_syncs[path] = max(end, _pending_syncs.get(path, 0))
+    return end
+
+
+def _load_deltas() -> Dict[str, Dict]:
+    """
+    Read the weight-delta log into {id: latest field values}.
+
+    Delta records hold absolute values, so folding is last-write-wins and
+    replaying a record twice is harmless.
+    """
+    deltas: Dict[str, Dict] = {}
+    if DELTA_LOG_PATH.exists():
+        with open(DELTA_LOG_PATH, 'r') as f:
             for line in f:
                 if line.strip():
                     try:
-                        exp = json.loads(line)
-                        if 'weight' not in exp:
-                            exp['weight'] = INITIAL_WEIGHT
-                        experiences.append(exp)
+                        delta = json.loads(line)
                     except json.JSONDecodeError:
-                        pass
+                        continue
+                    exp_id = delta.pop("id", None)
+                    if exp_id:
+                        deltas.setdefault(exp_id, {}).update(delta)
+    return deltas
+
+
+def _load_jsonl() -> List[Dict]:
+    """
+    Parse experience_db.jsonl with pending weight deltas applied.
+
+    Reads are lock-free: if a compaction replaces the DB while the delta log
+    and DB are being read, the pair may not match, so the read is retried.
+    """
+    for _ in range(5):
+        stamp = _file_stamp(DB_PATH)
+        deltas = _load_deltas()
+        experiences = []
+        if DB_PATH.exists():
+            with span("load_all"), open(DB_PATH, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            exp = json.loads(line)
+                            if 'weight' not in exp:
+                                exp['weight'] = INITIAL_WEIGHT
+                            if exp.get("id") in deltas:
+                                exp.update(deltas[exp["id"]])
+                            experiences.append(exp)
+                        except json.JSONDecodeError:
+                            pass
+        profiling.count("records_parsed", len(experiences))
+        if _file_stamp(DB_PATH) == stamp:
+            break
     return experiences
 
 
+def _save_jsonl(experiences: List[Dict]):
+    """
+    Rewrite experience_db.jsonl atomically (temp file + os.replace).
+
+    The rewritten file is the new base, so the weight-delta log is cleared.
+    """
+    with write_lock():
+        _save_jsonl_locked(experiences)
+
+
+def _save_jsonl_locked(experiences: List[Dict]):
+    index = _load_index()
+    offsets = {}
+    offset = 0
+    with span("rewrite"), atomic_write(DB_PATH, durable=DURABLE_WRITES) as f:
+        for exp in experiences:
+            line = json.dumps(exp, default=str) + "\n"
+            f.write(line)
+            length = len(line.encode())
+            offsets[exp.get("id")] = (offset, length)
+            offset += length
+    if DELTA_LOG_PATH.exists():
+        DELTA_LOG_PATH.unlink()
+
+    # Offsets moved, so patch them (and weights) into the index in one pass
+    if index is not None:
+        for exp in experiences:
+            exp_id = exp.get("id")
+            doc = index.docs.get(exp_id)
+            if doc is None:
+                index.add(exp, *offsets[exp_id])
+            else:
+                doc[DOC_OFFSET], doc[DOC_LENGTH] = offsets[exp_id]
+                index.set_weight(exp_id, exp.get("weight", INITIAL_WEIGHT))
+        for exp_id in set(index.docs) - set(offsets):
+            index.remove(exp_id)
+        index.mark_synced(DB_PATH)
+        index.save(INDEX_PATH, compact=True)
+
+
+def _load_index() -> Optional[InvertedIndex]:
+    """Load the persisted index if it still matches the DB (appends are caught up)."""
+    with span("index_load"):
+        index = InvertedIndex.load(INDEX_PATH)
+    if index is None:
+        return None
+    with span("index_catch_up"):
+        changed = index.catch_up(DB_PATH)
+    if changed is None:
+        return None
+    if changed:
+        with write_lock():
+            index.save(INDEX_PATH)
+    return index
+
+
+def get_index() -> InvertedIndex:
+    """Return an up-to-date inverted index, rebuilding it if missing or stale."""
+    ensure_dirs()
+    index = _load_index()
+    if index is None:
+        with span("index_build"):
+            index = InvertedIndex.build(DB_PATH)
+        with write_lock():
+            index.save(INDEX_PATH)
+    return index
+
+
+def _index_stamp():
+    """Changes whenever the persisted index does: its base files or its delta log."""
+    return _file_stamp(INDEX_PATH), _file_stamp(InvertedIndex.delta_path(INDEX_PATH))
+
+
+def _read_records(index: InvertedIndex, ids,
+                  deltas: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    Read only the given experiences from the DB using the index offsets.
+    Records whose line no longer holds the expected id (the DB was
+    rewritten since the index was loaded) are left out.
+    """
+    if deltas is None:
+        deltas = _load_deltas()
+    locations = sorted((index.docs[i][DOC_OFFSET], index.docs[i][DOC_LENGTH], i)
+                       for i in ids if i in index.docs)
+    experiences = []
+    with open(DB_PATH, 'rb') as f:
+        for offset, length, exp_id in locations:
+            f.seek(offset)
+            try:
+                exp = json.loads(f.read(length))
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(exp, dict) or exp.get("id") != exp_id:
+                continue
+            if 'weight' not in exp:
+                exp['weight'] = INITIAL_WEIGHT
+            if exp.get("id") in deltas:
+                exp.update(deltas[exp["id"]])
+            experiences.append(exp)
+    profiling.count("records_read", len(experiences))
+    return experiences
+
+
+def _delta_log_needs_compaction() -> bool:
+    log_size = DELTA_LOG_PATH.stat().st_size if DELTA_LOG_PATH.exists() else 0
+    db_size = DB_PATH.stat().st_size if DB_PATH.exists() else 0
+    return log_size > DELTA_COMPACT_MIN_BYTES and log_size > db_size * DELTA_COMPACT_RATIO
+
+
+def _file_stamp(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class JsonlBackend:
+    """
+    Default storage: experience_db.jsonl plus its inverted index and
+    weight-delta log. The index, the delta log and every record read are
+    kept per backend instance and only re-read when their files change, so
+    a long-lived process (see daemon.py) serves repeat requests from memory.
+    """
+
+    name = "jsonl"
+
+    def __init__(self):
+        self._index: Optional[InvertedIndex] = None
+        self._index_stamp = None
+        self._deltas: Dict[str, Dict] = {}
+        self._deltas_stamp = None
+        # id -> (offset in DB, record as stored, before deltas); valid for one DB inode
+        self._records: Dict[str, Tuple[int, Dict]] = {}
+        self._records_inode = None
+        # Columnar view, the DB prefix it covers (inode, bytes, tail checksum) and the deltas applied
+        self._columns: Optional[ExperienceColumns] = None
+        self._columns_db = None
+        self._columns_deltas = None
+        # DB bytes covered by the snapshot on disk (as far as this instance knows)
+        self._snapshot_size = 0
+
+    def index(self) -> InvertedIndex:
+        stamp = _index_stamp()
+        if self._index is not None and stamp == self._index_stamp:
+            with span("index_catch_up"):
+                changed = self._index.catch_up(DB_PATH)
+            if changed is not None:
+                if changed:
+                    with write_lock():
+                        self._index.save(INDEX_PATH)
+                    self._index_stamp = _index_stamp()
+                return self._index
+        self._index = get_index()
+        self._index_stamp = _index_stamp()
+        return self._index
+
+    def deltas(self) -> Dict[str, Dict]:
+        stamp = _file_stamp(DELTA_LOG_PATH)
+        if stamp != self._deltas_stamp:
+            with span("deltas"):
+                self._deltas = _load_deltas()
+            self._deltas_stamp = stamp
+        return self._deltas
+
+    def load_all(self) -> List[Dict]:
+        return _load_jsonl()
+
+    def iter_records(self, where: RecordFilter) -> Iterator[Dict]:
+        """
+        Stream the records matching `where`, deltas applied, in storage
+        order: one pass over the DB, one line in memory at a time.
+        """
+        for _ in range(5):
+            try:
+                f = open(DB_PATH, 'rb')
+            except FileNotFoundError:
+                return
+            deltas = self.deltas()
+            # A compaction between the two reads would pair the old DB with a cleared delta log
+            if os.fstat(f.fileno()).st_ino == (_file_stamp(DB_PATH) or (None,))[0]:
+                break
+            f.close()
+        else:
+            raise RuntimeError("experience DB kept changing while it was being read")
+        with f, span("scan"):
+            for _, exp in scan_jsonl(f, where, deltas, INITIAL_WEIGHT):
+                yield exp
+
+    def save_all(self, experiences: List[Dict]):
+        _save_jsonl(experiences)
+        self._index = None
+
+    def append(self, exp: Dict) -> int:
+        """Append one experience; returns its offset in the DB (storage position)."""
+        # The index picks up appended lines incrementally on its next load
+        line = json.dumps(exp, default=str) + "\n"
+        return _append_lines(DB_PATH, [line]) - len(line.encode())
+
+    def count(self) -> int:
+        return len(self.columns())
+
+    def get_many(self, ids: Iterable[str]) -> List[Dict]:
+        ids = set(ids)
+        inode = (_file_stamp(DB_PATH) or (None,))[0]
+        if inode != self._records_inode:
+            # Rewritten (compacted) DB: a record can keep its offset but not its content
+            self._records.clear()
+            self._records_inode = inode
+        for attempt in range(2):
+            docs = self.index().docs
+            wanted = sorted((docs[i][DOC_OFFSET], i) for i in ids if i in docs)
+            stale = [i for offset, i in wanted
+                     if i not in self._records or self._records[i][0] != offset]
+            fetched = _read_records(self._index, stale, deltas={})
+            for exp in fetched:
+                self._records[exp["id"]] = (docs[exp["id"]][DOC_OFFSET], exp)
+            if len(fetched) == len(stale):
+                break
+            # The DB was rewritten under us: reload the index and retry
+            self._index = None
+
+        deltas = self.deltas()
+
+        experiences = []
+        for offset, exp_id in wanted:
+            cached = self._records.get(exp_id)
+            if cached is None or cached[0] != offset:
+                continue
+            exp = dict(cached[1])
+            if exp_id in deltas:
+                exp.update(deltas[exp_id])
+            experiences.append(exp)
+        return experiences
+
+    def update_fields(self, changes: List[Dict]):
+        """Append the changed field values to the delta log (compacting when large)."""
+        with write_lock():
+            _append_lines(DELTA_LOG_PATH, [json.dumps(change, default=str) + "\n"
+                                           for change in changes])
+            if _delta_log_needs_compaction():
+                self.compact()
+
+    def positions(self, ids: Iterable[str]) -> Dict[str, int]:
+        """Storage order keys (DB offsets) of the given experiences."""
+        docs = self.index().docs
+        return {i: docs[i][DOC_OFFSET] for i in ids if i in docs}
+
+    def stamp(self) -> list:
+        """Changes whenever the DB or the delta log is written."""
+        return [self.name] + [list(_file_stamp(p) or ()) for p in (DB_PATH, DELTA_LOG_PATH)]
+
+    def weights(self, ids: Iterable[str]) -> Dict[str, float]:
+        docs = self.index().docs
+        deltas = self.deltas()
+        weights = {}
+        for exp_id in ids:
+            delta = deltas.get(exp_id)
+            if delta and "weight" in delta:
+                weights[exp_id] = delta["weight"]
+            elif exp_id in docs:
+                weights[exp_id] = docs[exp_id][DOC_WEIGHT]
+        return weights
+
+    def live_ids(self, category: Optional[str] = None) -> Set[str]:
+        docs = self.index().docs
+        if category:
+            return {i for i, doc in docs.items() if doc[DOC_CATEGORY] == category}
+        return set(docs)
+
+    def candidates(self, tokens: Iterable[str], category: Optional[str] = None) -> Set[str]:
+        return self.index().candidates(tokens, category)
+
+    def term_overlap(self, tokens: Iterable[str], category: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        return self.index().term_overlap(tokens, category)
+
+    def phrase_overlap(self, query: str, category: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        return self.index().phrase_overlap(query, category)
+
+    def bm25(self, tokens: Iterable[str], category: Optional[str] = None) -> Dict[str, float]:
+        return self.index().bm25(tokens, category)
+
+    def columns(self) -> ExperienceColumns:
+        """
+        Columnar view of the DB with deltas applied. Appended lines are parsed
+        incrementally and new deltas patched in place; a rewritten DB (the
+        parsed prefix no longer matches) is parsed again. A fresh process
+        starts from the binary snapshot when it still matches a prefix of
+        the DB, and refreshes it once enough of the DB is left uncovered.
+        """
+        stamp = _file_stamp(DB_PATH)
+        inode = stamp[0] if stamp else None
+        if self._columns is None or not self._covers_prefix(self._columns_db, stamp):
+            self._columns, self._columns_db = ExperienceColumns(self._read_rows), (inode, 0, 0)
+            self._columns_deltas = None
+            self._snapshot_size = 0
+            with span("snapshot_load"):
+                loaded = ExperienceColumns.load_snapshot(SNAPSHOT_PATH, self._read_rows) if SNAPSHOTS else None
+            if loaded and loaded[1][1] and self._covers_prefix(loaded[1], stamp):
+                self._columns, self._columns_db = loaded
+                self._snapshot_size = self._columns_db[1]
+        cols = self._columns
+        deltas = self.deltas()
+
+        parsed = self._columns_db[1]
+        if stamp and stamp[2] > parsed:
+            first_new = len(cols)
+            with span("columns_parse"), open(DB_PATH, 'rb') as f:
+                f.seek(parsed)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        exp = json.loads(raw)
+                    except json.JSONDecodeError:
+                        exp = None
+                    if isinstance(exp, dict):
+                        cols.append(exp, parsed, len(raw), INITIAL_WEIGHT)
+                        if exp.get("id") in deltas:
+                            cols.set_fields(len(cols) - 1, deltas[exp["id"]])
+                    parsed += len(raw)
+            profiling.count("records_parsed", len(cols) - first_new)
+            self._columns_db = (inode, parsed, tail_crc(DB_PATH, parsed))
+            if first_new and self._columns_deltas != self._deltas_stamp:
+                self._apply_deltas(cols, deltas, range(first_new))
+        elif self._columns_deltas != self._deltas_stamp:
+            self._apply_deltas(cols, deltas, range(len(cols)))
+        self._columns_deltas = self._deltas_stamp
+
+        # Deltas hold absolute values, so saving them applied is harmless: they are re-applied on load.
+        # Columns that cannot be saved are not retried until another batch of bytes arrives.
+        if SNAPSHOTS and self._columns_db[1] - self._snapshot_size >= SNAPSHOT_REFRESH_BYTES:
+            with span("snapshot_save"):
+                cols.save_snapshot(SNAPSHOT_PATH, self._columns_db)
+            self._snapshot_size = self._columns_db[1]
+        return cols
+
+    @staticmethod
+    def _covers_prefix(db_state, stamp) -> bool:
+        """Whether (inode, size, tail checksum) still describes a prefix of the DB."""
+        if stamp is None:
+            return db_state[0] is None
+        return (db_state[0] == stamp[0] and db_state[1] <= stamp[2]
+                and tail_crc(DB_PATH, db_state[1]) == db_state[2])
+
+    @staticmethod
+    def _apply_deltas(cols: ExperienceColumns, deltas: Dict[str, Dict], rows: Iterable[int]):
+        if deltas:
+            ids = cols.ids
+            for row in rows:
+                if ids[row] in deltas:
+                    cols.set_fields(row, deltas[ids[row]])
+
+    def _read_rows(self, cols: ExperienceColumns, rows: List[int]) -> Optional[List[Dict]]:
+        """Full records for column rows, or None if the DB was rewritten meanwhile."""
+        deltas = self.deltas()
+        experiences = []
+        with open(DB_PATH, 'rb') as f:
+            if cols is not self._columns or os.fstat(f.fileno()).st_ino != self._columns_db[0]:
+                return None
+            for row in rows:
+                f.seek(cols.positions[row])
+                exp = json.loads(f.read(cols.lengths[row]))
+                if 'weight' not in exp:
+                    exp['weight'] = INITIAL_WEIGHT
+                if exp.get("id") in deltas:
+                    exp.update(deltas[exp["id"]])
+                experiences.append(exp)
+        profiling.count("records_read", len(experiences))
+        return experiences
+
+    def query(self, where: RecordFilter, sort: str = "weight",
+              limit: Optional[int] = None) -> List[Dict]:
+        # Sorts and filters the columns; only the returned records are read
+        for _ in range(5):
+            cols = self.columns()
+            experiences = cols.records(cols.order(sort, where, limit))
+            if experiences is not None:
+                return experiences
+            self._columns = None
+        raise RuntimeError("experience DB kept changing while it was being read")
+
+    def compact(self):
+        """Fold the weight-delta log into experience_db.jsonl and clear the log."""
+        with write_lock(), span("compact"):
+            self.save_all(self.load_all())
+
+
+_backends: Dict[tuple, object] = {}
+
+
+def get_backend():
+    """
+    Return the storage backend for this process.
+
+    LIVE_EVO_BACKEND=sqlite|jsonl forces a backend; otherwise SQLite is used
+    once experience_db.sqlite3 exists (see migrate_to_sqlite) and JSONL before.
+    Choosing SQLite with no database yet migrates the JSONL/seed data first.
+    """
+    ensure_dirs()
+    name = backend_name()
+    key = (name, str(EXPERIENCE_DIR))
+    if key not in _backends:
+        if name == "sqlite":
+            if not SQLITE_PATH.exists():
+                migrate_to_sqlite()
+            from sqlite_backend import SqliteBackend
+            _backends[key] = SqliteBackend(SQLITE_PATH)
+        else:
+            _backends[key] = JsonlBackend()
+    return _backends[key]
+
+
+def backend_name() -> str:
+    """The backend get_backend() uses: 'sqlite' or 'jsonl'."""
+    name = os.environ.get("LIVE_EVO_BACKEND") or ("sqlite" if SQLITE_PATH.exists() else "jsonl")
+    if name not in ("jsonl", "sqlite"):
+        raise ValueError(f"Unknown LIVE_EVO_BACKEND {name!r}; use 'jsonl' or 'sqlite'")
+    return name
+
+
+def _last_modified(*paths: Path) -> float:
+    return max((p.stat().st_mtime for p in paths if p.exists()), default=0.0)
+
+
+def migrate_to_sqlite() -> int:
+    """
+    Import the active backend into experience_db.sqlite3.
+
+    With no SQLite database yet (or LIVE_EVO_BACKEND=jsonl) this reads
+    experience_db.jsonl (deltas folded in) or, if there is none, the bundled
+    seed file, and leaves the JSONL file untouched. Once SQLite is active,
+    the JSONL file is stale, so the database is rebuilt in place from its own
+    records instead. Re-importing a JSONL file older than an existing
+    database would drop the writes made since, so that raises RuntimeError.
+    The whole read, import and swap holds write_lock, so no write is lost.
+    Returns the number of experiences imported.
+    """
+    from sqlite_backend import SqliteBackend
+
+    with write_lock():
+        if SQLITE_PATH.exists() and backend_name() == "sqlite":
+            backend = get_backend()
+            experiences = backend.load_all()
+            backend.save_all(experiences)
+            backend.compact()
+            return len(experiences)
+
+        sqlite_files = (SQLITE_PATH, Path(str(SQLITE_PATH) + "-wal"))
+        if SQLITE_PATH.exists() and _last_modified(DB_PATH, DELTA_LOG_PATH) < _last_modified(*sqlite_files):
+            raise RuntimeError(f"{DB_PATH} is older than {SQLITE_PATH}; re-importing it would "
+                               "lose the writes made to the SQLite database since")
+        experiences = _load_jsonl()
+        if not experiences and _BUNDLED_SEED.exists():
+            with open(_BUNDLED_SEED, 'r') as f:
+                experiences = [json.loads(line) for line in f if line.strip()]
+
+        tmp_path = SQLITE_PATH.with_name(SQLITE_PATH.name + ".tmp")
+        for path in (tmp_path, Path(str(tmp_path) + "-wal"), Path(str(tmp_path) + "-shm")):
+            if path.exists():
+                path.unlink()
+        backend = SqliteBackend(tmp_path)
+        backend.save_all(experiences)
+        backend.compact()
+        backend.conn.execute("PRAGMA journal_mode=DELETE")
+        backend.close()
+
+        # Never pair the new file with the old database's WAL
+        stale = _backends.pop(("sqlite", str(EXPERIENCE_DIR)), None)
+        if stale is not None:
+            stale.close()
+        for path in (Path(str(SQLITE_PATH) + "-wal"), Path(str(SQLITE_PATH) + "-shm")):
+            if path.exists():
+                path.unlink()
+        os.replace(tmp_path, SQLITE_PATH)
+    return len(experiences)
+
+
+def load_experiences() -> List[Dict]:
+    """Load all experiences from the database (iter_experiences streams them instead)."""
+    return get_backend().load_all()
+
+
+def iter_experiences(category: Optional[str] = None, min_weight: Optional[float] = None,
+                     max_weight: Optional[float] = None, created_since: Optional[str] = None,
+                     created_before: Optional[str] = None,
+                     include_archive: bool = False) -> Iterator[Dict]:
+    """
+    Stream the experiences matching the filters (see record_filter.py) in
+    storage order, in one pass and constant memory: records are parsed one
+    at a time and JSONL lines the filters rule out are not parsed at all.
+    With include_archive, matching cold-tier records follow the hot ones.
+    """
+    where = RecordFilter(category, min_weight, max_weight, created_since, created_before)
+    yield from get_backend().iter_records(where)
+    if include_archive:
+        yield from get_archive().iter_records(where)
+
+
 def save_experiences(experiences: List[Dict]):
     """Save all experiences to the database."""
-    ensure_dirs()
-    with open(DB_PATH, 'w') as f:
-        for exp in experiences:
-            f.write(json.dumps(exp, default=str) + "\n")
+    get_backend().save_all(experiences)
+
+
+def count_experiences() -> int:
+    """Number of experiences in the database, answered without loading them."""
+    return get_backend().count()
+
+
+def query_experiences(category: Optional[str] = None, sort: str = "weight",
+                      limit: Optional[int] = None, min_weight: Optional[float] = None,
+                      max_weight: Optional[float] = None, created_since: Optional[str] = None,
+                      created_before: Optional[str] = None) -> List[Dict]:
+    """
+    Experiences matching the filters (see record_filter.py), sorted
+    descending by `sort` (one of SORT_DEFAULTS) and truncated to `limit`.
+    The backend filters and selects the top `limit` without building the
+    other records.
+    """
+    if sort not in SORT_DEFAULTS:
+        raise ValueError(f"Cannot sort by {sort!r}; choose from {sorted(SORT_DEFAULTS)}")
+    where = RecordFilter(category, min_weight, max_weight, created_since, created_before)
+    return get_backend().query(where, sort, limit)
 
 
 def add_experience(question: str, failure_reason: str, improvement: str,
-                   missed_information: str = "", category: str = "other") -> Dict:
-    """Add a new experience to the database."""
+                   missed_information: str = "", category: str = "other",
+                   on_duplicate: str = "store", threshold: float = DUPLICATE_THRESHOLD) -> Dict:
+    """
+    Add a new experience to the database.
+
+    If a stored experience is a near-duplicate (similarity >= `threshold`,
+    see find_duplicate), `on_duplicate` decides: "store" adds the new one
+    anyway, "reject" leaves the store unchanged, and "merge" counts the
+    re-learned lesson as a confirmation of the stored one (see
+    _confirm_locked). For "reject" and "merge" the stored experience is
+    returned, with a "duplicate" entry describing the match.
+    """
+    if on_duplicate not in DUPLICATE_ACTIONS:
+        raise ValueError(f"Unknown duplicate action {on_duplicate!r}; choose from {DUPLICATE_ACTIONS}")
     ensure_dirs()
 
     exp = {
@@ -86,71 +776,403 @@ def add_experience(question: str, failure_reason: str, improvement: str,
         "success_count": 0,
     }
 
-    with open(DB_PATH, 'a') as f:
-        f.write(json.dumps(exp, default=str) + "\n")
+    with _stats_update() as summary:
+        backend = get_backend()
+        # Plain stores skip the index; its next sync picks the new experience up
+        index = get_minhash_index(backend) if on_duplicate != "store" else None
+        duplicate = index and find_duplicate(exp, backend, threshold, index)
+        if duplicate:
+            existing, similarity = duplicate
+            if on_duplicate == "merge":
+                existing = _confirm_locked(existing, summary)
+            existing["duplicate"] = {"similarity": similarity,
+                                     "action": "merged" if on_duplicate == "merge" else "rejected"}
+            return existing
+
+        position = backend.append(exp)
+        if index is not None:
+            index.append([(exp["id"], searchable_text(exp))])
+        if summary is not None:
+            summary.add(exp, position)
+        hot_count = summary.total if summary is not None else None
 
+    _enforce_capacity(hot_count)
     return exp
 
 
-def simple_similarity(query: str, text: str) -> float:
+def _confirm_locked(exp: Dict, summary: Optional[StatsSummary] = None) -> Dict:
+    """
+    Count a re-learned lesson as a confirmation of the stored `exp`: its
+    weight takes a helpful step and its use count goes up. The change is
+    logged as a "confirm" history entry, which sync replays like a verdict,
+    but it is not one: helped/hurt totals and success_count are unchanged.
+    """
+    backend = get_backend()
+    old_weight = exp.get("weight", INITIAL_WEIGHT)
+    now = datetime.now().isoformat()
+    exp["weight"] = _weight_step(old_weight, True)
+    exp["use_count"] = exp.get("use_count", 0) + 1
+    exp["last_used"] = now
+    change = {"id": exp["id"]}
+    change.update((field, exp.get(field)) for field in DELTA_FIELDS)
+    backend.update_fields([change])
+    _append_lines(WEIGHT_HISTORY_PATH, [json.dumps({
+        "timestamp": now,
+        "experience_id": exp["id"],
+        "old_weight": old_weight,
+        "new_weight": exp["weight"],
+        "helped": True,
+        "kind": CONFIRM_KIND,
+    }) + "\n"], durable=False)
+    get_weight_history().maybe_rotate()
+    if summary is not None:
+        # update_fields may have compacted (moved) records, so refresh positions
+        positions = backend.positions(summary.tracked_ids() + [exp["id"]])
+        summary.reposition(positions)
+        summary.update(exp, old_weight, positions[exp["id"]])
+    return exp
+
+
+def get_minhash_index(backend=None):
+    """Open the near-duplicate (MinHash/LSH) index, syncing it with the backend first."""
+    from minhash import MinHashIndex
+
+    backend = backend or get_backend()
+    index = MinHashIndex.open(EXPERIENCE_DIR)
+    live_ids = backend.live_ids()
+    if index.needs_sync(live_ids):
+        with write_lock():
+            index = MinHashIndex.open(EXPERIENCE_DIR)
+            index.sync(live_ids, lambda ids: {exp["id"]: searchable_text(exp)
+                                              for exp in backend.get_many(ids)})
+    return index
+
+
+def find_duplicate(exp: Dict, backend=None, threshold: float = DUPLICATE_THRESHOLD,
+                   index=None) -> Optional[Tuple[Dict, float]]:
+    """
+    The stored experience most similar to `exp`, with its similarity, if
+    that reaches `threshold`. LSH narrows the store down to a few
+    candidates, which are compared exactly.
+    """
+    from minhash import jaccard, shingles
+
+    backend = backend or get_backend()
+    index = index or get_minhash_index(backend)
+    text = searchable_text(exp)
+    candidates = index.candidates(text) - {exp.get("id")}
+    if not candidates:
+        return None
+    wanted = shingles(text)
+    best = None
+    for other in backend.get_many(candidates):
+        similarity = jaccard(wanted, shingles(searchable_text(other)))
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (other, similarity)
+    return best
+
+
+# Added by simple_similarity when query and text contain one another
+PHRASE_BOOST = 0.3
+# Candidates read per round by the pruned Jaccard top-k search
+PRUNE_READ_BATCH = 32
+
+
+def simple_similarity(query, text: str) -> float:
     """
     Simple keyword-based similarity score.
-    In production, use embeddings for better results.
+    For fuzzier matching use the "embedding" scorer (see embeddings.py).
+
+    `query` may be a PhraseMatcher compiled from the query string, which
+    saves re-processing the query when scoring many texts against it.
     """
-    query_words = set(query.lower().split())
-    text_words = set(text.lower().split())
+    matcher = query if isinstance(query, PhraseMatcher) else PhraseMatcher(query)
+    # Jaccard similarity, plus a boost for exact phrase matches
+    jaccard, phrase = matcher.score(text)
+    return min(1.0, jaccard + (PHRASE_BOOST if phrase else 0.0))
+
+
+def _score_jaccard(query: str, backend, category: Optional[str]) -> Dict[str, float]:
+    """Jaccard + phrase-boost similarity (simple_similarity) for each candidate."""
+    candidate_ids = backend.candidates(query.lower().split(), category)
+    profiling.count("candidates_scored", len(candidate_ids))
+    matcher = PhraseMatcher(query)
+    return {exp["id"]: simple_similarity(matcher, searchable_text(exp))
+            for exp in backend.get_many(candidate_ids)}
 
-    if not query_words or not text_words:
-        return 0.0
 
-    intersection = query_words & text_words
-    union = query_words | text_words
+def _score_bm25(query: str, backend, category: Optional[str]) -> Dict[str, float]:
+    """Normalized BM25 from the backend's term index (no record reads)."""
+    return backend.bm25(query.lower().split(), category)
 
-    # Jaccard similarity
-    jaccard = len(intersection) / len(union) if union else 0.0
 
-    # Boost for exact phrase matches
-    query_lower = query.lower()
-    text_lower = text.lower()
-    phrase_boost = 0.3 if query_lower in text_lower or text_lower in query_lower else 0.0
+def get_vector_store(backend=None):
+    """Open the memory-mapped embedding store, syncing it with the backend first."""
+    from embeddings import VectorStore
 
-    return min(1.0, jaccard + phrase_boost)
+    backend = backend or get_backend()
+    store = VectorStore.open(EXPERIENCE_DIR)
+    live_ids = backend.live_ids()
+    if store.needs_sync(live_ids):
+        with write_lock():
+            store = VectorStore.open(EXPERIENCE_DIR)
+            store.sync(live_ids, lambda ids: {exp["id"]: searchable_text(exp)
+                                              for exp in backend.get_many(ids)})
+    return store
+
+
+def _score_embedding(query: str, backend, category: Optional[str]) -> Dict[str, float]:
+    """Cosine similarity of local hashed embeddings (IVF-accelerated when large)."""
+    store = get_vector_store(backend)
+    allowed = backend.live_ids(category)
+    return store.search(query, allowed.__contains__)
+
+
+# Similarity scorers selectable by name: (query, backend, category) -> {id: similarity}
+SCORERS = {
+    "jaccard": _score_jaccard,
+    "bm25": _score_bm25,
+    "embedding": _score_embedding,
+}
+DEFAULT_SCORER = "jaccard"
 
 
 def find_relevant_experiences(query: str, top_k: int = 5,
                               threshold: float = 0.1,
-                              category: Optional[str] = None) -> List[Tuple[Dict, float]]:
+                              category: Optional[str] = None,
+                              scorer: str = DEFAULT_SCORER) -> List[Tuple[Dict, float]]:
     """
     Find relevant experiences using simple keyword matching.
     Returns list of (experience, weighted_score) tuples.
-    """
-    experiences = load_experiences()
 
-    if category:
-        experiences = [e for e in experiences if e.get("category") == category]
+    Only experiences sharing at least one token with the query are scored;
+    the backend's term index supplies the candidates and their weights, and
+    only the final top_k records are read. `scorer` picks the similarity
+    function from SCORERS.
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer {scorer!r}; choose from {sorted(SCORERS)}")
 
-    if not experiences:
+    backend = get_backend()
+    if top_k <= 0:
         return []
+    if scorer == "jaccard":
+        with span("score"):
+            found = _top_jaccard(query, top_k, threshold, category, backend)
+    else:
+        found = _top_scored(query, top_k, threshold, category, scorer, backend)
+
+    if TIERING and (len(found) < top_k or found[-1][1] < COLD_SEARCH_SCORE):
+        with span("cold_search"):
+            cold = _search_cold(query, top_k, threshold, category)
+        if cold:
+            # Hot records first among equal scores
+            found = heapq.nlargest(top_k, found + cold, key=lambda x: x[1])
+    return found
 
-    results = []
-    for exp in experiences:
-        # Combine searchable fields
-        search_text = " ".join([
-            exp.get("question", ""),
-            exp.get("failure_reason", ""),
-            exp.get("improvement", ""),
-            exp.get("missed_information", ""),
-        ])
-
-        sim_score = simple_similarity(query, search_text)
-        weight = exp.get("weight", INITIAL_WEIGHT)
-        weighted_score = sim_score * weight
 
+def _top_scored(query: str, top_k: int, threshold: float, category: Optional[str],
+                scorer: str, backend) -> List[Tuple[Dict, float]]:
+    """Top-k by the SCORERS similarity * weight over the hot store."""
+    with span("score"):
+        similarities = SCORERS[scorer](query, backend, category)
+        profiling.count("candidates_scored", len(similarities))
+    weights = backend.weights(similarities)
+
+    results = []
+    for exp_id, sim_score in similarities.items():
+        weighted_score = sim_score * weights.get(exp_id, INITIAL_WEIGHT)
         if weighted_score >= threshold:
-            results.append((exp, weighted_score))
+            results.append((exp_id, weighted_score))
+
+    # Bounded heap; nlargest keeps the first of equal scores, like a stable sort
+    results = heapq.nlargest(top_k, results, key=lambda x: x[1])
+
+    records = {exp["id"]: exp for exp in backend.get_many([i for i, _ in results])}
+    return [(records[exp_id], score) for exp_id, score in results if exp_id in records]
+
+
+def _search_cold(query: str, top_k: int, threshold: float,
+                 category: Optional[str]) -> List[Tuple[Dict, float]]:
+    """
+    Top-k of the cold tier by Jaccard + phrase boost * weight, for merging
+    with the hot results. Read-only: matches stay archived until a verdict
+    (update_weights) or `tiers.py promote` moves them back.
+    """
+    archive = get_archive()
+    if not archive.exists():
+        return []
+    candidates = archive.candidates(query.lower().split(), category)
+    candidates |= archive.phrase_candidates(query, category)
+    if not candidates:
+        return []
+    profiling.count("cold_candidates_scored", len(candidates))
+    matcher = PhraseMatcher(query)
+    matches = []
+    for exp in archive.get_many(candidates):
+        score = simple_similarity(matcher, searchable_text(exp)) * exp.get("weight", INITIAL_WEIGHT)
+        if score >= threshold:
+            matches.append((exp, score))
+    return heapq.nlargest(top_k, matches, key=lambda x: x[1])
+
+
+def _top_jaccard(query: str, top_k: int, threshold: float, category: Optional[str],
+                 backend) -> List[Tuple[Dict, float]]:
+    """
+    Top-k by simple_similarity * weight, reading as few records as possible.
+
+    The term index gives each candidate's exact Jaccard term without reading
+    it, plus enough to rule out most phrase boosts, so jaccard (+ boost where
+    still possible) * weight bounds its final score. Candidates are the
+    records sharing a query token plus those the boost alone could reach.
+    Candidates below the threshold by that bound are never read; the rest
+    are read in descending order of the bound, a bounded heap keeps the best
+    k, and the search stops once no remaining bound can reach the k-th score.
+    Equal scores rank by storage order, as the full sort did.
+    """
+    tokens = query.lower().split()
+    n_query = len(set(tokens))
+    # The query can only sit inside a text containing all its inner tokens
+    n_inner = len(set(tokens[1:-1]))
+    overlap = backend.term_overlap(tokens, category)
+    # Substring matches sharing no whole token can still earn the phrase boost
+    overlap.update(backend.phrase_overlap(query, category))
+    weights = backend.weights(overlap)
+    profiling.count("candidates", len(overlap))
+
+    bounds = {}
+    for exp_id, counts in overlap.items():
+        if counts is None:
+            bound = 1.0
+        else:
+            matched, distinct = counts
+            bound = matched / (n_query + distinct - matched)
+            # Boost needs query-in-text (all inner query tokens present) or
+            # text-in-query (all but the text's first/last token are query tokens)
+            if matched >= n_inner or distinct <= matched + 2:
+                bound = min(1.0, bound + PHRASE_BOOST)
+        bound *= weights.get(exp_id, INITIAL_WEIGHT)
+        if bound >= threshold:
+            bounds[exp_id] = bound
+    if not bounds:
+        return []
+
+    positions = backend.positions(bounds)
+    matcher = PhraseMatcher(query)
+    pending = [(-bound, exp_id) for exp_id, bound in bounds.items()]
+    heapq.heapify(pending)
+    best: List[Tuple[float, int, str]] = []   # min-heap of (score, -position, id)
+    records: Dict[str, Dict] = {}
 
-    results.sort(key=lambda x: x[1], reverse=True)
-    return results[:top_k]
+    while pending:
+        floor = best[0][0] if len(best) == top_k else threshold
+        batch = []
+        while pending and -pending[0][0] >= floor and len(batch) < max(PRUNE_READ_BATCH, top_k):
+            batch.append(heapq.heappop(pending)[1])
+        if not batch:
+            break
+        profiling.count("candidates_scored", len(batch))
+        for exp in backend.get_many(batch):
+            exp_id = exp["id"]
+            score = simple_similarity(matcher, searchable_text(exp)) * weights.get(exp_id, INITIAL_WEIGHT)
+            if score < threshold:
+                continue
+            item = (score, -positions.get(exp_id, 0), exp_id)
+            if len(best) < top_k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+            else:
+                continue
+            records[exp_id] = exp
+
+    return [(records[exp_id], score) for score, _, exp_id in sorted(best, reverse=True)]
+
+
+# Batches at least this large are spread over a process pool by default
+BATCH_POOL_MIN_QUERIES = 64
+
+
+def _batch_job(item, top_k: int, threshold: float, category: Optional[str],
+               scorer: str) -> tuple:
+    """Normalize a batch entry (query string or dict with overrides) to call args."""
+    if isinstance(item, str):
+        item = {"query": item}
+    return (item["query"], item.get("top_k", top_k), item.get("threshold", threshold),
+            item.get("category", category), scorer)
+
+
+def _retrieve_job(job: tuple) -> List[Tuple[Dict, float]]:
+    return find_relevant_experiences(*job)
+
+
+def _init_batch_worker():
+    # Forked workers keep the parent's warmed JSONL backend, but an SQLite
+    # connection must not be shared across fork, so those reconnect.
+    for key in [k for k, b in _backends.items() if b.name == "sqlite"]:
+        del _backends[key]
+
+
+def find_relevant_experiences_batch(queries: Iterable, top_k: int = 5,
+                                    threshold: float = 0.1,
+                                    category: Optional[str] = None,
+                                    scorer: str = DEFAULT_SCORER,
+                                    processes: Optional[int] = None):
+    """
+    Run find_relevant_experiences for many queries against one loaded store.
+
+    Each entry is a query string or a dict with "query" and optional
+    "top_k"/"threshold"/"category" overrides. Yields one result list per
+    entry, in input order. The backend (index, records) is loaded once,
+    identical queries are scored once, and batches of
+    BATCH_POOL_MIN_QUERIES or more fan out over a forked process pool
+    (`processes` overrides the worker count; 1 disables the pool).
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer {scorer!r}; choose from {sorted(SCORERS)}")
+    jobs = [_batch_job(item, top_k, threshold, category, scorer) for item in queries]
+    unique = list(dict.fromkeys(jobs))
+
+    # Load and index the store once, before any worker is forked: the workers
+    # inherit it. Postings are read lazily, so touch them now; SQLite workers
+    # reconnect (see _init_batch_worker) and use SQLite's own indexes.
+    backend = get_backend()
+    if scorer == "embedding":
+        get_vector_store(backend)
+    if backend.name == "jsonl":
+        backend.index().postings
+        backend.deltas()
+
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(unique) >= BATCH_POOL_MIN_QUERIES else 1
+
+    if processes > 1 and len(unique) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = None
+        chunksize = max(1, len(unique) // (processes * 4))
+        with ProcessPoolExecutor(processes, mp_context=context,
+                                 initializer=_init_batch_worker) as pool:
+            results = pool.map(_retrieve_job, unique, chunksize=chunksize)
+            yield from _expand_batch(jobs, unique, results)
+    else:
+        yield from _expand_batch(jobs, unique, map(_retrieve_job, unique))
+
+
+def _expand_batch(jobs: List[tuple], unique: List[tuple], results: Iterable):
+    """Yield results for every job in order, from results for the unique jobs."""
+    position = {job: i for i, job in enumerate(unique)}
+    done: Dict[int, List] = {}
+    results = iter(results)
+    for job in jobs:
+        i = position[job]
+        while i not in done:
+            done[len(done)] = next(results)
+        yield done[i]
 
 
 def generate_guideline(task_title: str, experiences: List[Dict]) -> str:
@@ -179,6 +1201,52 @@ def generate_guideline(task_title: str, experiences: List[Dict]) -> str:
     return "\n".join(lines)
 
 
+def get_result_cache():
+    from result_cache import ResultCache
+    return ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES)
+
+
+def _normalize_query(query: str, scorer: str) -> str:
+    # Every scorer ignores case; all but jaccard (whose phrase boost is a substring test) ignore spacing
+    return query.lower() if scorer == "jaccard" else " ".join(tokenize(query))
+
+
+def retrieve_experiences(query: str, top_k: int = 5, threshold: float = 0.1,
+                         category: Optional[str] = None, scorer: str = DEFAULT_SCORER) -> Dict:
+    """
+    find_relevant_experiences() with the store's size and the guideline
+    for the results: {"total", "results", "guideline"}.
+
+    Answers come from the result cache when the same normalized query
+    (with the same top_k, threshold, category and scorer) was answered
+    since the store last changed; the backend's change stamp is the
+    generation, so a hit only stats the store's files. An answer is only
+    stored if the stamp is unchanged once it is computed.
+    """
+    backend = get_backend()
+    cache = get_result_cache() if RESULT_CACHE else None
+    generation = backend.stamp()
+    key = [_normalize_query(query, scorer), top_k, threshold, category, scorer]
+    with span("cache_lookup"):
+        response = cache.get(generation, key) if cache else None
+    profiling.count("cache_hits" if response is not None else "cache_misses")
+    if response is None:
+        with span("search"):
+            results = find_relevant_experiences(query, top_k=top_k, threshold=threshold,
+                                                category=category, scorer=scorer)
+        with span("count"):
+            total = count_experiences()
+        with span("guideline"):
+            guideline = generate_guideline(query, [exp for exp, _ in results])
+        response = {"total": total, "results": results, "guideline": guideline}
+        # A write during the search (or a cold-tier promotion by it) makes the answer
+        # stale, and storing it would evict the newer generation's entries
+        if cache and backend.stamp() == generation:
+            with span("cache_store"):
+                cache.put(generation, key, response)
+    return response
+
+
 def update_weights(experience_ids: List[str], helped: bool) -> Dict:
     """
     Update experience weights based on whether they helped or hurt.
@@ -189,26 +1257,80 @@ def update_weights(experience_ids: List[str], helped: bool) -> Dict:
 
     Returns:
         Summary of weight updates
+
+    Only the touched records are read and only their changed fields are
+    written: a point UPDATE on SQLite, a weight-delta log append on JSONL
+    (folded into the DB once it grows past the compaction threshold).
+    The read-modify-write runs under the writer lock so concurrent sessions
+    cannot lose each other's updates.
+    """
+    with _stats_update() as summary:
+        return _update_weights_locked(experience_ids, helped, summary)
+
+
+def update_weights_many(verdicts: Iterable[Tuple[List[str], bool]]) -> List[Dict]:
+    """
+    Apply many (experience_ids, helped) verdicts as one batch.
+
+    Verdicts are applied in order, exactly as that many update_weights()
+    calls would (an experience named by several verdicts moves once per
+    verdict), but the touched records are read once, their final field
+    values go out in one write and the history entries in one append.
+    Returns one update_weights()-style summary per verdict.
     """
-    experiences = load_experiences()
-    updates = []
+    with _stats_update() as summary:
+        return _apply_verdicts_locked(list(verdicts), summary)
 
-    for exp in experiences:
-        if exp.get("id") in experience_ids:
+
+def _weight_step(weight: float, helped: bool) -> float:
+    if helped:
+        return min(weight + WEIGHT_INCREASE_RATE, MAX_WEIGHT)
+    return max(weight - WEIGHT_DECREASE_RATE, MIN_WEIGHT)
+
+
+def _update_weights_locked(experience_ids: List[str], helped: bool,
+                           summary: Optional[StatsSummary] = None) -> Dict:
+    return _apply_verdicts_locked([(experience_ids, helped)], summary)[0]
+
+
+def _apply_verdicts_locked(verdicts: List[Tuple[List[str], bool]],
+                           summary: Optional[StatsSummary] = None) -> List[Dict]:
+    backend = get_backend()
+    wanted = set()
+    for experience_ids, _ in verdicts:
+        wanted.update(experience_ids)
+    with span("read"):
+        found = backend.get_many(wanted)
+    missing = wanted - {exp["id"] for exp in found}
+    if missing and TIERING and _promote_locked(missing, summary):
+        # Verdicts on archived experiences are explicit lookups: bring them back first
+        found = backend.get_many(wanted)
+    # Storage order, the order update_weights reports a verdict's updates in
+    order = {exp["id"]: i for i, exp in enumerate(found)}
+    records = {exp["id"]: exp for exp in found}
+    first_weights: Dict[str, float] = {}
+    results = []
+    history_lines = []
+    verdict_counts = {True: 0, False: 0}
+    now = datetime.now().isoformat()
+
+    for experience_ids, helped in verdicts:
+        updates = []
+        for exp_id in sorted(set(experience_ids) & records.keys(), key=order.__getitem__):
+            exp = records[exp_id]
             old_weight = exp.get("weight", INITIAL_WEIGHT)
+            first_weights.setdefault(exp_id, old_weight)
 
+            new_weight = _weight_step(old_weight, helped)
             if helped:
-                new_weight = min(old_weight + WEIGHT_INCREASE_RATE, MAX_WEIGHT)
                 exp["success_count"] = exp.get("success_count", 0) + 1
-            else:
-                new_weight = max(old_weight - WEIGHT_DECREASE_RATE, MIN_WEIGHT)
 
             exp["weight"] = new_weight
             exp["use_count"] = exp.get("use_count", 0) + 1
-            exp["last_used"] = datetime.now().isoformat()
+            exp["last_used"] = now
 
             updates.append({
-                "id": exp["id"],
+                "id": exp_id,
                 "old_weight": old_weight,
                 "new_weight": new_weight,
                 "change": "increased" if helped else "decreased"
@@ -216,43 +1338,321 @@ def update_weights(experience_ids: List[str], helped: bool) -> Dict:
 
             # Log weight change
             log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "experience_id": exp["id"],
+                "timestamp": now,
+                "experience_id": exp_id,
                 "old_weight": old_weight,
                 "new_weight": new_weight,
                 "helped": helped,
             }
-            with open(WEIGHT_HISTORY_PATH, 'a') as f:
-                f.write(json.dumps(log_entry) + "\n")
+            history_lines.append(json.dumps(log_entry) + "\n")
+        verdict_counts[bool(helped)] += len(updates)
+        results.append({"updates": updates, "total_updated": len(updates)})
 
-    save_experiences(experiences)
-    return {"updates": updates, "total_updated": len(updates)}
+    if first_weights:
+        # Only each experience's final values are written
+        changes = []
+        for exp_id in first_weights:
+            change = {"id": exp_id}
+            change.update((field, records[exp_id].get(field)) for field in DELTA_FIELDS)
+            changes.append(change)
+        with span("write"):
+            backend.update_fields(changes)
+        with span("history"):
+            _append_lines(WEIGHT_HISTORY_PATH, history_lines, durable=False)
+            get_weight_history().maybe_rotate()
+        if summary is not None:
+            # update_fields may have compacted (moved) records, so refresh positions
+            positions = backend.positions(summary.tracked_ids() + list(first_weights))
+            summary.reposition(positions)
+            for exp_id, old_weight in first_weights.items():
+                summary.update(records[exp_id], old_weight, positions[exp_id])
+            for helped, count in verdict_counts.items():
+                if count:
+                    summary.record_verdicts(helped, count)
 
+    return results
 
-def get_statistics() -> Dict:
-    """Get statistics about the experience database."""
-    experiences = load_experiences()
 
-    if not experiences:
-        return {"total": 0, "message": "No experiences yet"}
-
-    categories = {}
-    weights = []
-
-    for exp in experiences:
-        cat = exp.get("category", "other")
-        categories[cat] = categories.get(cat, 0) + 1
-        weights.append(exp.get("weight", INITIAL_WEIGHT))
-
-    return {
-        "total_experiences": len(experiences),
-        "categories": categories,
-        "average_weight": sum(weights) / len(weights),
-        "min_weight": min(weights),
-        "max_weight": max(weights),
-        "high_quality_count": len([w for w in weights if w >= 1.5]),
-        "low_quality_count": len([w for w in weights if w <= 0.5]),
-    }
+def compact_experiences():
+    """Fold pending writes into the main store (JSONL delta log / SQLite WAL)."""
+    with _stats_update() as summary:
+        backend = get_backend()
+        backend.compact()
+        if summary is not None:
+            summary.reposition(backend.positions(summary.tracked_ids()))
+
+
+def dedup_experiences(threshold: float = DUPLICATE_THRESHOLD, dry_run: bool = False) -> Dict:
+    """
+    Merge near-duplicate experiences across the whole store.
+
+    Experiences are visited in storage order, and each one that is a
+    near-duplicate of an earlier kept experience (found through in-memory
+    LSH buckets, confirmed exactly) is folded into it: use and success
+    counts add up, the higher weight and the latest use win. The store is
+    then rewritten once. With `dry_run` nothing is written.
+
+    Returns {"scanned", "removed", "groups": {kept id: [merged ids]}}.
+    """
+    from minhash import LSH_BANDS, band_keys, jaccard, shingles, signature
+
+    with write_lock():
+        backend = get_backend()
+        experiences = backend.load_all()
+        kept: List[Dict] = []
+        buckets: List[Dict[int, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        groups: Dict[str, List[str]] = {}
+
+        for exp in experiences:
+            wanted = shingles(searchable_text(exp))
+            keys = band_keys(signature(wanted)) if wanted else None
+            best, best_similarity = None, 0.0
+            seen = set()
+            for band, key in enumerate(keys or ()):
+                for i in buckets[band].get(key, ()):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    similarity = jaccard(wanted, shingles(searchable_text(kept[i])))
+                    if similarity >= threshold and (best is None or similarity > best_similarity):
+                        best, best_similarity = i, similarity
+            if best is not None:
+                _merge_duplicate(kept[best], exp)
+                groups.setdefault(kept[best]["id"], []).append(exp["id"])
+                continue
+            for band, key in enumerate(keys or ()):
+                buckets[band].setdefault(key, []).append(len(kept))
+            kept.append(exp)
+
+        if groups and not dry_run:
+            backend.save_all(kept)
+            rebuild_statistics()
+
+    return {"scanned": len(experiences), "removed": len(experiences) - len(kept), "groups": groups}
+
+
+def _merge_duplicate(target: Dict, duplicate: Dict):
+    target["use_count"] = target.get("use_count", 0) + duplicate.get("use_count", 0)
+    target["success_count"] = target.get("success_count", 0) + duplicate.get("success_count", 0)
+    target["weight"] = max(target.get("weight", INITIAL_WEIGHT), duplicate.get("weight", INITIAL_WEIGHT))
+    last_used = [e["last_used"] for e in (target, duplicate) if e.get("last_used")]
+    if last_used:
+        target["last_used"] = max(last_used)
+
+
+def get_tier_policy() -> TierPolicy:
+    """The hot-store demotion policy (see cold_tier.py)."""
+    return TierPolicy.load(TIER_POLICY_PATH)
+
+
+def set_tier_policy(**settings) -> TierPolicy:
+    """Change and save policy settings; the others keep their current values."""
+    with write_lock():
+        values = get_tier_policy().to_dict()
+        values.update(settings)
+        policy = TierPolicy(**values)
+        policy.save(TIER_POLICY_PATH)
+    return policy
+
+
+def get_archive() -> ColdArchive:
+    """The cold tier holding demoted experiences."""
+    return ColdArchive(ARCHIVE_PATH, ARCHIVE_INDEX_PATH, ARCHIVE_META_PATH, DURABLE_WRITES)
+
+
+def demote_experiences(policy: Optional[TierPolicy] = None, dry_run: bool = False,
+                       capacity_only: bool = False) -> Dict:
+    """
+    Move the experiences `policy` (default: the saved one) selects from the
+    hot store to the cold tier, rewriting the hot store once. Archived
+    records carry "demoted_at" and "demoted_for" (the rule that chose
+    them). With `capacity_only` just the capacity bound is enforced (down
+    to its low-water mark); with `dry_run` nothing is written.
+
+    Returns {"scanned", "demoted", "reasons": {reason: count}, "hot", "cold"}.
+    """
+    policy = policy or get_tier_policy()
+    with write_lock():
+        backend = get_backend()
+        archive = get_archive()
+        experiences = backend.load_all()
+        reasons = select_demotions(experiences, policy, capacity_only=capacity_only)
+        counts: Dict[str, int] = {}
+        for reason in reasons.values():
+            counts[reason] = counts.get(reason, 0) + 1
+
+        if reasons and not dry_run:
+            now = datetime.now().isoformat()
+            demoted = [dict(exp, demoted_at=now, demoted_for=reasons[exp["id"]])
+                       for exp in experiences if exp["id"] in reasons]
+            # Archived first: a crash in between leaves a record in both tiers, never in neither
+            with span("archive"):
+                archive.append(demoted)
+            backend.save_all([exp for exp in experiences if exp["id"] not in reasons])
+            rebuild_statistics()
+        hot = len(experiences) - (0 if dry_run else len(reasons))
+
+    return {"scanned": len(experiences), "demoted": len(reasons), "reasons": counts,
+            "hot": hot, "cold": archive.count()}
+
+
+def _enforce_capacity(hot_count: Optional[int] = None):
+    """
+    Evict down to the low-water mark if the hot store holds more than its
+    capacity. Only the capacity rule applies here; the weight and staleness
+    rules wait for an explicit demote_experiences().
+    """
+    if not TIERING:
+        return
+    policy = get_tier_policy()
+    if policy.capacity is None:
+        return
+    if hot_count is None:
+        hot_count = count_experiences()
+    if policy.over_capacity(hot_count):
+        demote_experiences(policy, capacity_only=True)
+
+
+def _promote_locked(ids: Iterable[str], summary: Optional[StatsSummary] = None) -> List[Dict]:
+    """Move archived experiences back to the hot store; returns the promoted records."""
+    archive = get_archive()
+    records = archive.get_many(ids)
+    if not records:
+        return []
+    backend = get_backend()
+    # Left in both tiers by an interrupted demotion: the hot copy wins
+    hot = backend.positions(exp["id"] for exp in records)
+    now = datetime.now().isoformat()
+    promoted = []
+    for exp in records:
+        if exp["id"] in hot:
+            continue
+        exp.pop("demoted_at", None)
+        exp.pop("demoted_for", None)
+        exp["promoted_at"] = now
+        position = backend.append(exp)
+        if summary is not None:
+            summary.add(exp, position)
+        promoted.append(exp)
+    archive.remove(exp["id"] for exp in records)
+    profiling.count("promoted", len(promoted))
+    return promoted
+
+
+def promote_experiences(ids: Iterable[str]) -> List[Dict]:
+    """
+    Move the given experiences from the cold tier back to the hot store
+    (ids that are not archived are ignored). Promoted records carry
+    "promoted_at", which keeps them hot for the policy's grace period.
+    """
+    with _stats_update() as summary:
+        promoted = _promote_locked(list(ids), summary)
+    if promoted:
+        _enforce_capacity()
+    return promoted
+
+
+def get_experiences(ids: Iterable[str]) -> List[Dict]:
+    """Experiences by id: hot ones in storage order, then archived ones (left archived)."""
+    ids = set(ids)
+    found = get_backend().get_many(ids)
+    missing = ids - {exp["id"] for exp in found}
+    if missing and TIERING:
+        found += get_archive().get_many(missing)
+    return found
+
+
+def tier_sizes() -> Dict:
+    """Record counts of the hot and cold tiers and the hot store's capacity."""
+    return {"hot": count_experiences(), "cold": get_archive().count(),
+            "capacity": get_tier_policy().capacity}
+
+
+def get_weight_history() -> WeightHistory:
+    """The segmented weight-change history (see weight_history.py)."""
+    return WeightHistory(WEIGHT_HISTORY_PATH, HISTORY_SEGMENT_DIR, HISTORY_ROLLUP_PATH,
+                         HISTORY_SEGMENT_BYTES, HISTORY_SEGMENT_MAX_AGE)
+
+
+def get_experience_history(experience_id: str) -> Optional[Dict]:
+    """Rolled-up weight changes of one experience (None if it was never updated)."""
+    return get_weight_history().experience(experience_id)
+
+
+def iter_weight_history(experience_id: Optional[str] = None) -> Iterable[Dict]:
+    """Stream raw weight-change entries, oldest first, optionally for one experience."""
+    return get_weight_history().iter_entries(experience_id)
+
+
+def _load_stats(backend) -> Optional[StatsSummary]:
+    """The materialized summary if it reflects the store's current state."""
+    summary = StatsSummary.load(STATS_PATH)
+    if summary is None or summary.stamp != backend.stamp():
+        return None
+    return summary
+
+
+@contextmanager
+def _stats_update():
+    """
+    Writer section that keeps the materialized summary in step with the store.
+
+    Yields the current summary (None if it is already stale, in which case
+    it is left for the next reader to rebuild) for the caller to apply its
+    change to; it is saved with the store's new stamp when the block ends.
+    """
+    with write_lock():
+        backend = get_backend()
+        summary = _load_stats(backend)
+        yield summary
+        if summary is not None:
+            summary.stamp = backend.stamp()
+            summary.save(STATS_PATH)
+
+
+def rebuild_statistics() -> StatsSummary:
+    """Recompute the materialized summary with a full scan of the store."""
+    with write_lock():
+        backend = get_backend()
+        with span("stats_rebuild"):
+            summary = StatsSummary.build(backend.columns(), *get_weight_history().totals())
+        summary.stamp = backend.stamp()
+        summary.save(STATS_PATH)
+    return summary
+
+
+def get_statistics(top_n: int = 3, rebuild: bool = False) -> Dict:
+    """
+    Get statistics about the experience database.
+
+    Served from the materialized summary (see stats_summary.py), which
+    writers keep current; it is rebuilt from the store only when missing,
+    stale, unable to answer the top-`top_n` lists, or `rebuild` is set.
+    """
+    top_n = min(top_n, TOP_CAPACITY)
+    backend = get_backend()
+    summary = None if rebuild else _load_stats(backend)
+    leaders = summary and [summary.top(name, top_n) for name in ("top_weight", "top_used")]
+    if summary is None or None in leaders:
+        summary = rebuild_statistics()
+        leaders = [summary.top(name, top_n) for name in ("top_weight", "top_used")]
+
+    stats = summary.statistics()
+    if summary.total:
+        stats.update({
+            "helped_count": summary.helped,
+            "hurt_count": summary.hurt,
+            "top_by_weight": leaders[0],
+            "top_by_use": leaders[1],
+        })
+    if RESULT_CACHE:
+        stats["result_cache"] = get_result_cache().stats()
+    cold = get_archive().count()
+    if cold:
+        # Figures other than the total describe the hot tier
+        stats["total_experiences"] = summary.total + cold
+    stats["tiers"] = {"hot": summary.total, "cold": cold, "capacity": get_tier_policy().capacity}
+    return stats
 
 
 if __name__ == "__main__":
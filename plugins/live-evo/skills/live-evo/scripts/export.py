@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Export experiences as JSONL or CSV, streamed: one pass over the store with
+one record in memory at a time, so it works on stores of any size. Always
+runs in this process (the daemon answers whole requests, not streams).
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from experience_manager import iter_experiences
+from locking import atomic_write
+from profiling import add_profile_argument, profile_cli
+from record_filter import add_filter_arguments, filter_arguments
+
+FORMATS = ("jsonl", "csv")
+# CSV columns unless --fields says otherwise; other keys are left out
+CSV_FIELDS = ("id", "category", "weight", "use_count", "success_count", "created_at", "last_used",
+              "question", "failure_reason", "improvement", "missed_information")
+
+
+def write_experiences(f, experiences, fmt: str, fields) -> int:
+    """Write records to an open text file; returns how many were written."""
+    written = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for exp in experiences:
+            writer.writerow(exp)
+            written += 1
+    else:
+        for exp in experiences:
+            f.write(json.dumps(exp, default=str) + "\n")
+            written += 1
+    return written
+
+
+def add_arguments(parser):
+    parser.add_argument("--format", "-F", choices=FORMATS,
+                       help="Output format (default: from the --output suffix, else jsonl)")
+    parser.add_argument("--output", "-o", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--fields", help="Comma-separated CSV columns (default: the stored fields)")
+    parser.add_argument("--include-archive", action="store_true",
+                       help="Also export experiences in the cold archive")
+    add_filter_arguments(parser)
+
+
+def run(parser, args):
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else CSV_FIELDS
+    experiences = iter_experiences(include_archive=args.include_archive, **filter_arguments(args))
+
+    if args.output == "-":
+        written = write_experiences(sys.stdout, experiences, fmt, fields)
+        sys.stdout.flush()
+    else:
+        # Written to a temp file and renamed, so an interrupted export leaves no partial file
+        with atomic_write(Path(args.output), durable=False) as f:
+            written = write_experiences(f, experiences, fmt, fields)
+    print(f"Exported {written} experiences as {fmt}"
+          + ("" if args.output == "-" else f" to {args.output}"), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export experiences as JSONL or CSV")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("export", args.profile)
+    run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Persistent token -> posting-list index over the experience database.
+
+The index lives next to experience_db.jsonl and records, for every experience,
+where its line sits in the DB file plus the fields retrieval needs before the
+record itself is read (weight, category, token counts). Posting lists carry
+term frequencies, so they double as a sparse document-term matrix for BM25.
+Retrieval then only reads and scores experiences that share a query token.
+
+The per-document table and the postings are persisted as two files, and the
+postings are only read when something actually needs them, so callers that
+just want weights, offsets or counts never parse the (much larger) postings.
+Changes after that are appended to a delta log, one line per save, and only
+folded into new base files once the log outgrows a fraction of the postings,
+so indexing one new experience writes about one record's worth of terms.
+"""
+import json
+import math
+import os
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import profiling
+
+# Bytes before the indexed end-of-file used to detect rewrites of the DB
+_TAIL_PROBE = 256
+
+# Field order of the per-document entries in the persisted index
+DOC_OFFSET, DOC_LENGTH, DOC_WEIGHT, DOC_CATEGORY, DOC_TERMS, DOC_TOKENS = range(6)
+
+# A line {"id": ..., "deleted": true} retracts the earlier lines for that id
+# (the cold archive records promotions this way instead of rewriting itself)
+TOMBSTONE_KEY = "deleted"
+
+# Fold the delta log into the base files once it is this large: at least
+# DELTA_COMPACT_MIN_BYTES and DELTA_COMPACT_RATIO of the postings file
+DELTA_COMPACT_MIN_BYTES = 64 * 1024
+DELTA_COMPACT_RATIO = 0.25
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase whitespace tokens (same rule as simple_similarity)."""
+    return text.lower().split()
+
+
+def searchable_text(exp: Dict) -> str:
+    """Concatenate the text fields retrieval matches against."""
+    return " ".join([
+        exp.get("question", ""),
+        exp.get("failure_reason", ""),
+        exp.get("improvement", ""),
+        exp.get("missed_information", ""),
+    ])
+
+
+def tail_crc(db_path: Path, size: int) -> int:
+    """Checksum of the last bytes before `size`, used to validate the indexed prefix."""
+    if size <= 0:
+        return 0
+    with open(db_path, 'rb') as f:
+        start = max(0, size - _TAIL_PROBE)
+        f.seek(start)
+        return zlib.crc32(f.read(size - start))
+
+
+class InvertedIndex:
+    """Token -> {experience-id: term frequency} postings plus per-document metadata."""
+
+    VERSION = 4
+
+    def __init__(self):
+        # id -> [offset, length, weight, category, distinct tokens, total tokens]
+        self.docs: Dict[str, list] = {}
+        self.total_tokens = 0
+        self.db_path: Optional[Path] = None
+        self.db_size = 0
+        self.db_tail_crc = 0
+        # Postings file generation; bumped whenever postings are rewritten
+        self.generation = 0
+        self._postings: Optional[Dict[str, Dict[str, int]]] = {}
+        self._postings_file: Optional[Path] = None
+        # Set when the postings must be rewritten whole (fresh build or rebuild)
+        self._postings_dirty = False
+        # Changes not yet in the delta log: ["+", id, doc, {term: tf}],
+        # ["-", id, [terms]] or ["w", id, weight]
+        self._changes: List[list] = []
+        # Logged "+"/"-" changes not yet applied to the (still unread) postings
+        self._unapplied: List[list] = []
+        # (db_size, db_tail_crc) as last persisted, and the usable delta log bytes
+        self._saved_sync: Optional[Tuple[int, int]] = None
+        self._delta_bytes = 0
+        self._delta_torn = False
+        # id -> its distinct terms, so removal only touches the document's own postings;
+        # kept by add(), and rebuilt from the postings on the first removal after load()
+        self._doc_terms: Optional[Dict[str, List[str]]] = {}
+        # Documents with at most two distinct tokens (see phrase_overlap); None until needed
+        self._short_docs: Optional[Set[str]] = None
+
+    @property
+    def postings(self) -> Dict[str, Dict[str, int]]:
+        """Posting lists, read from disk on first access."""
+        if self._postings is None:
+            try:
+                with open(self._postings_file, 'r') as f:
+                    postings = json.load(f)
+                for change in self._unapplied:
+                    self._apply_postings(postings, change)
+                self._postings = postings
+            except (OSError, ValueError):
+                # Postings vanished or are corrupt: rebuild everything from the DB
+                fresh = InvertedIndex.build(self.db_path)
+                self.docs, self.total_tokens = fresh.docs, fresh.total_tokens
+                self._postings = fresh._postings
+                self._doc_terms = fresh._doc_terms
+                self._short_docs = None
+                self._postings_dirty = True
+            self._unapplied = []
+        return self._postings
+
+    @staticmethod
+    def _apply_postings(postings: Dict[str, Dict[str, int]], change: list):
+        """Replay one logged "+" or "-" change onto the postings."""
+        if change[0] == "+":
+            for term, tf in change[3].items():
+                postings.setdefault(term, {})[change[1]] = tf
+        else:
+            for term in change[2]:
+                ids = postings.get(term)
+                if ids is not None:
+                    ids.pop(change[1], None)
+                    if not ids:
+                        del postings[term]
+
+    def _apply_doc(self, change: list):
+        """Replay one logged change onto the per-document table."""
+        kind, exp_id = change[0], change[1]
+        if kind == "w":
+            self.set_weight(exp_id, change[2])
+            return
+        old = self.docs.pop(exp_id, None)
+        if old is not None:
+            self.total_tokens -= old[DOC_TOKENS]
+        if kind == "+":
+            self.docs[exp_id] = change[2]
+            self.total_tokens += change[2][DOC_TOKENS]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, exp: Dict, offset: int, length: int):
+        """Index one experience stored at `offset` (`length` bytes) in the DB."""
+        exp_id = exp.get("id")
+        if not exp_id:
+            return
+        if exp_id in self.docs:
+            self.remove(exp_id)
+        tokens = tokenize(searchable_text(exp))
+        counts = Counter(tokens)
+        postings = self.postings
+        for term, tf in counts.items():
+            postings.setdefault(term, {})[exp_id] = tf
+        if self._doc_terms is not None:
+            self._doc_terms[exp_id] = list(counts)
+        self._short_docs = None
+        doc = [offset, length, exp.get("weight", 1.0),
+               exp.get("category", "other"), len(counts), len(tokens)]
+        self.docs[exp_id] = doc
+        self.total_tokens += len(tokens)
+        self._log(["+", exp_id, list(doc), dict(counts)])
+
+    def remove(self, exp_id: str):
+        """Drop an experience and its postings."""
+        if exp_id not in self.docs:
+            return
+        postings = self.postings
+        if self._doc_terms is None:
+            # One pass over the postings, then every removal costs only its own terms
+            self._doc_terms = {}
+            for term, ids in postings.items():
+                for doc_id in ids:
+                    self._doc_terms.setdefault(doc_id, []).append(term)
+        doc = self.docs.pop(exp_id)
+        self.total_tokens -= doc[DOC_TOKENS]
+        terms = self._doc_terms.pop(exp_id, [])
+        self._apply_postings(postings, ["-", exp_id, terms])
+        self._short_docs = None
+        self._log(["-", exp_id, terms])
+
+    def candidates(self, query_tokens: Iterable[str],
+                   category: Optional[str] = None) -> Set[str]:
+        """IDs of experiences sharing at least one token with the query."""
+        found: Set[str] = set()
+        for token in set(query_tokens):
+            found.update(self.postings.get(token, ()))
+        if category:
+            found = {i for i in found if self.docs[i][DOC_CATEGORY] == category}
+        return found
+
+    def term_overlap(self, query_tokens: Iterable[str],
+                     category: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        {id: (distinct query tokens the document contains, distinct document
+        tokens)} for every document sharing a query token. This is exactly
+        the intersection and set size Jaccard similarity needs, so callers
+        can bound or compute it without reading the documents.
+        """
+        matched: Dict[str, int] = {}
+        for token in set(query_tokens):
+            for exp_id in self.postings.get(token, ()):
+                matched[exp_id] = matched.get(exp_id, 0) + 1
+        docs = self.docs
+        return {i: (n, docs[i][DOC_TERMS]) for i, n in matched.items()
+                if not category or docs[i][DOC_CATEGORY] == category}
+
+    def phrase_overlap(self, query: str, category: Optional[str] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        term_overlap's (0, distinct document tokens) for documents that share
+        no query token yet may still get the phrase boost, because the boost
+        matches substrings ("race" is in "trace"). A superset, found from
+        the vocabulary alone:
+          - query in text: a one-token query inside a document token, or a
+            two-token query as the end of one token and the start of another
+            (from three tokens on, the inner ones must match whole);
+          - text in query: at most two distinct document tokens, each inside
+            a query token.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        postings, docs = self.postings, self.docs
+        found: Set[str] = set()
+        if len(tokens) == 1:
+            found.update(*(ids for term, ids in postings.items() if tokens[0] in term))
+        elif len(tokens) == 2:
+            ends = set().union(*(ids for term, ids in postings.items() if term.endswith(tokens[0])))
+            starts = set().union(*(ids for term, ids in postings.items() if term.startswith(tokens[1])))
+            found.update(ends & starts)
+        if self._short_docs is None:
+            self._short_docs = {i for i, doc in docs.items() if doc[DOC_TERMS] <= 2}
+        if self._short_docs:
+            # Text in query: a short document holding some substring of a query token
+            pieces = {token[a:b] for token in set(tokens)
+                      for a in range(len(token)) for b in range(a + 1, len(token) + 1)}
+            columns = [postings[piece] for piece in pieces if piece in postings]
+            found.update(i for i in self._short_docs if any(i in ids for ids in columns))
+        shared = [postings[token] for token in set(tokens) if token in postings]
+        return {i: (0, docs[i][DOC_TERMS]) for i in found
+                if not any(i in ids for ids in shared)
+                and (not category or docs[i][DOC_CATEGORY] == category)}
+
+    def bm25(self, query_tokens: Iterable[str],
+             category: Optional[str] = None) -> Dict[str, float]:
+        """
+        Score every document sharing a query token with Okapi BM25.
+
+        Works column-wise over the posting lists (a sparse matrix-vector
+        product), so cost is proportional to the postings touched rather than
+        the corpus size. Scores are divided by the best score attainable for
+        the query (sum of idf * (k1 + 1)) and therefore lie in [0, 1).
+        """
+        n_docs = len(self.docs)
+        if not n_docs:
+            return {}
+        avg_len = (self.total_tokens / n_docs) or 1.0
+        docs = self.docs
+        scores: Dict[str, float] = {}
+        max_score = 0.0
+        for token in set(query_tokens):
+            column = self.postings.get(token)
+            if not column:
+                continue
+            idf = math.log(1.0 + (n_docs - len(column) + 0.5) / (len(column) + 0.5))
+            max_score += idf * (BM25_K1 + 1.0)
+            for exp_id, tf in column.items():
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * docs[exp_id][DOC_TOKENS] / avg_len)
+                scores[exp_id] = scores.get(exp_id, 0.0) + idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        if category:
+            scores = {i: s for i, s in scores.items() if docs[i][DOC_CATEGORY] == category}
+        if max_score:
+            for exp_id in scores:
+                scores[exp_id] /= max_score
+        return scores
+
+    def _log(self, change: list):
+        # A whole rewrite is due anyway, so there is nothing to log (keeps builds lean)
+        if not self._postings_dirty:
+            self._changes.append(change)
+
+    def set_weight(self, exp_id: str, weight: float):
+        doc = self.docs.get(exp_id)
+        if doc is not None and doc[DOC_WEIGHT] != weight:
+            doc[DOC_WEIGHT] = weight
+            self._log(["w", exp_id, weight])
+
+    def mark_synced(self, db_path: Path, size: Optional[int] = None):
+        """Record the DB size (default: current size) and tail checksum this index covers."""
+        self.db_path = db_path
+        if size is None:
+            size = db_path.stat().st_size if db_path.exists() else 0
+        self.db_size = size
+        self.db_tail_crc = tail_crc(db_path, self.db_size)
+
+    def catch_up(self, db_path: Path) -> Optional[bool]:
+        """
+        Bring the index up to date with the DB file.
+
+        Lines appended since the index was written are indexed in place.
+        Returns True if the index changed, False if it was already current,
+        and None if the indexed prefix no longer matches (full rebuild needed).
+        """
+        self.db_path = db_path
+        size = db_path.stat().st_size if db_path.exists() else 0
+        if size < self.db_size or tail_crc(db_path, self.db_size) != self.db_tail_crc:
+            return None
+        if size == self.db_size:
+            return False
+        with open(db_path, 'rb') as f:
+            f.seek(self.db_size)
+            end = self._index_lines(f, self.db_size)
+        if end == self.db_size:
+            return False
+        self.mark_synced(db_path, end)
+        return True
+
+    def _index_lines(self, f, offset: int) -> int:
+        """Index complete lines from `f`; returns the offset after the last one."""
+        parsed = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                # A concurrent append is still in progress; pick it up next time
+                break
+            if raw.strip():
+                try:
+                    exp = json.loads(raw)
+                except json.JSONDecodeError:
+                    exp = None
+                if isinstance(exp, dict) and exp.get(TOMBSTONE_KEY):
+                    self.remove(exp.get("id"))
+                elif isinstance(exp, dict):
+                    self.add(exp, offset, len(raw))
+                    parsed += 1
+            offset += len(raw)
+        profiling.count("records_parsed", parsed)
+        return offset
+
+    @classmethod
+    def build(cls, db_path: Path) -> "InvertedIndex":
+        """Build an index from scratch by scanning the whole DB file."""
+        index = cls()
+        index._postings_dirty = True
+        end = 0
+        if db_path.exists():
+            with open(db_path, 'rb') as f:
+                end = index._index_lines(f, 0)
+        index.mark_synced(db_path, end)
+        return index
+
+    @staticmethod
+    def _postings_path(path: Path, generation: int) -> Path:
+        return path.with_name(f"{path.stem}.postings.{generation}.json")
+
+    @staticmethod
+    def delta_path(path: Path) -> Path:
+        """The delta log of the index persisted at `path`."""
+        return path.with_name(f"{path.stem}.delta.jsonl")
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["InvertedIndex"]:
+        """Load a persisted index (postings deferred), or None if missing/corrupt/outdated."""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        index = cls()
+        index.docs = data.get("docs", {})
+        index.total_tokens = data.get("total_tokens", 0)
+        index.db_size = data.get("db_size", 0)
+        index.db_tail_crc = data.get("db_tail_crc", 0)
+        index.generation = data.get("generation", 0)
+        index._postings_file = cls._postings_path(path, index.generation)
+        if not index._postings_file.exists():
+            return None
+        index._postings = None
+        index._doc_terms = None
+        index._read_delta(cls.delta_path(path))
+        index._saved_sync = (index.db_size, index.db_tail_crc)
+        return index
+
+    def _read_delta(self, delta_path: Path):
+        """Replay the delta log lines written on top of this generation."""
+        try:
+            f = open(delta_path, 'rb')
+        except OSError:
+            return
+        with f:
+            for raw in f:
+                try:
+                    entry = json.loads(raw) if raw.endswith(b"\n") else None
+                except ValueError:
+                    entry = None
+                if not isinstance(entry, dict):
+                    # A save died mid-line; the next save starts a new generation
+                    self._delta_torn = True
+                    break
+                self._delta_bytes += len(raw)
+                if entry.get("generation") != self.generation:
+                    # Left over from before a compaction that did not get to remove it
+                    continue
+                for change in entry["changes"]:
+                    self._apply_doc(change)
+                    if change[0] != "w":
+                        self._unapplied.append(change)
+                self.db_size, self.db_tail_crc = entry["db_size"], entry["db_tail_crc"]
+
+    def save(self, path: Path, compact: bool = False):
+        """
+        Persist the index.
+
+        Changes since the last save are appended to the delta log as one
+        line. The base files are rewritten atomically (temp file, then
+        rename) only with `compact`, when the postings were rebuilt, or once
+        the log has outgrown DELTA_COMPACT_RATIO of the postings: the
+        postings go to a new generation-numbered file that the docs table
+        then points at, and the log starts over.
+        """
+        delta_path = self.delta_path(path)
+        if not (compact or self._postings_dirty or self._postings_file is None or self._delta_torn):
+            if not self._changes and self._saved_sync == (self.db_size, self.db_tail_crc):
+                return
+            line = (json.dumps({
+                "generation": self.generation,
+                "db_size": self.db_size,
+                "db_tail_crc": self.db_tail_crc,
+                "changes": self._changes,
+            }, separators=(",", ":")) + "\n").encode()
+            postings_bytes = self._postings_file.stat().st_size if self._postings_file.exists() else 0
+            if self._delta_bytes + len(line) <= max(DELTA_COMPACT_MIN_BYTES,
+                                                    postings_bytes * DELTA_COMPACT_RATIO):
+                with open(delta_path, 'ab') as f:
+                    f.write(line)
+                self._delta_bytes += len(line)
+                self._changes = []
+                self._saved_sync = (self.db_size, self.db_tail_crc)
+                return
+
+        old_postings = self._postings_file
+        postings = self.postings
+        self.generation += 1
+        # Never reuse a generation another process has written since this index was loaded
+        while self._postings_path(path, self.generation).exists():
+            self.generation += 1
+        self._postings_file = self._postings_path(path, self.generation)
+        tmp_path = self._postings_file.with_name(self._postings_file.name + ".tmp")
+        # dumps, not dump: json.dump streams through the pure-Python encoder
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(postings, separators=(",", ":")))
+        os.replace(tmp_path, self._postings_file)
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({
+                "version": self.VERSION,
+                "generation": self.generation,
+                "db_size": self.db_size,
+                "db_tail_crc": self.db_tail_crc,
+                "total_tokens": self.total_tokens,
+                "docs": self.docs,
+            }, separators=(",", ":")))
+        os.replace(tmp_path, path)
+        # The log's lines name the old generation, so a crash before this is harmless
+        try:
+            delta_path.unlink()
+        except OSError:
+            pass
+        self._postings_dirty = self._delta_torn = False
+        self._changes = []
+        self._delta_bytes = 0
+        self._saved_sync = (self.db_size, self.db_tail_crc)
+
+        if old_postings is not None and old_postings != self._postings_file:
+            try:
+                old_postings.unlink()
+            except OSError:
+                pass
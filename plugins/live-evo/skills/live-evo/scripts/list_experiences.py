@@ -7,38 +7,31 @@ import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from experience_manager import load_experiences
+from daemon import call
+from profiling import add_profile_argument, profile_cli
+from record_filter import RecordFilter, add_filter_arguments, describe, filter_arguments
 
 
-def main():
-    parser = argparse.ArgumentParser(description="List all experiences")
-    parser.add_argument("--category", "-c", help="Filter by category")
+def add_arguments(parser):
+    add_filter_arguments(parser)
     parser.add_argument("--sort", "-s", default="weight",
                        choices=["weight", "created", "uses"],
                        help="Sort by field")
     parser.add_argument("--limit", "-l", type=int, default=20, help="Limit results")
     parser.add_argument("--full", "-f", action="store_true", help="Show full details")
 
-    args = parser.parse_args()
 
-    experiences = load_experiences()
+def run(parser, args):
+    total = call("count")
 
-    if not experiences:
+    if not total:
         print("No experiences in database yet.")
         return
 
-    if args.category:
-        experiences = [e for e in experiences if e.get("category") == args.category]
-
-    # Sort
-    if args.sort == "weight":
-        experiences.sort(key=lambda x: x.get("weight", 1.0), reverse=True)
-    elif args.sort == "created":
-        experiences.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    elif args.sort == "uses":
-        experiences.sort(key=lambda x: x.get("use_count", 0), reverse=True)
-
-    experiences = experiences[:args.limit]
+    # Filter, sort and limit in the storage backend
+    sort_field = {"weight": "weight", "created": "created_at", "uses": "use_count"}[args.sort]
+    filters = filter_arguments(args)
+    experiences = call("query", sort=sort_field, limit=args.limit, **filters)
 
     print(f"Showing {len(experiences)} experiences (sorted by {args.sort}):\n")
 
@@ -60,11 +53,22 @@ def main():
         print()
 
     # Summary
-    total = len(load_experiences())
     shown = len(experiences)
     print(f"Showing {shown} of {total} total experiences")
-    if args.category:
-        print(f"(Filtered by category: {args.category})")
+    applied = describe(RecordFilter(**filters))
+    if applied:
+        print(f"(Filtered by {applied})")
+    return [exp.get("id") for exp in experiences]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List all experiences")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("list_experiences", args.profile)
+    run(parser, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the Live-Evo scripts.
+
+    live-evo retrieve -q "task description"
+    live-evo add -q ... -f ... -i ... + stats
+    live-evo retrieve -q "task" + tiers promote @ids
+
+Every subcommand is one of the scripts, with the same options and output,
+run inside this process. Steps separated by a standalone "+" run one after
+another in the same process, so a chain pays interpreter start-up, imports
+and loading the store and its indexes once. "@ids" in a step expands to
+the comma-separated experience IDs of the latest retrieve, list or add step
+before it. The whole chain is parsed before the first step runs, so a typo
+in a later step does not leave the first one half applied.
+
+Only the modules a step needs are imported, when it is parsed; `live-evo
+--help` imports none of them. `--profile` (before the first step or in any
+step) reports the whole chain with one span per step.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Subcommand -> (script module, name it reports under in profiles/metrics, help)
+COMMANDS = {
+    "retrieve": ("retrieve", "retrieve", "Search past experiences and build a guideline"),
+    "update": ("update", "update", "Update experience weights after verification"),
+    "add": ("add_experience", "add_experience", "Store a new experience"),
+    "list": ("list_experiences", "list_experiences", "List experiences"),
+    "stats": ("stats", "stats", "Show database statistics"),
+    "export": ("export", "export", "Stream experiences out as JSONL or CSV"),
+    "dedup": ("dedup", "dedup", "Merge near-duplicate experiences"),
+    "tiers": ("tiers", "tiers", "Demote/promote experiences between hot and cold tiers"),
+    "sync": ("sync", "sync", "Share experiences and weight updates between hosts"),
+    "migrate": ("migrate", "migrate", "Migrate the database to the SQLite backend"),
+    "daemon": ("daemon", "daemon", "Start, stop or check the resident server"),
+}
+CHAIN_SEPARATOR = "+"
+IDS_PLACEHOLDER = "@ids"
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: live-evo [--profile] COMMAND [ARGS...] [+ COMMAND [ARGS...]]...", "",
+             "Commands (`live-evo COMMAND --help` for their options):"]
+    lines += [f"  {name:<{width}}  {help_text}" for name, (_, _, help_text) in COMMANDS.items()]
+    lines += ["", f"Chain steps with a standalone '{CHAIN_SEPARATOR}'; '{IDS_PLACEHOLDER}' in a step is "
+              "replaced by the experience IDs of the latest retrieve/list/add step."]
+    return "\n".join(lines)
+
+
+def split_chain(argv: list) -> list:
+    """Split arguments into steps at each standalone separator."""
+    steps, current = [], []
+    for arg in argv:
+        if arg == CHAIN_SEPARATOR:
+            steps.append(current)
+            current = []
+        else:
+            current.append(arg)
+    steps.append(current)
+    return steps
+
+
+def parse_step(argv: list):
+    """(command, module, parser, args) for one step; exits with usage on errors."""
+    import argparse
+    import importlib
+
+    from profiling import add_profile_argument
+
+    if not argv:
+        sys.exit(f"live-evo: empty step in chain\n\n{usage()}")
+    command = argv[0]
+    if command not in COMMANDS:
+        sys.exit(f"live-evo: unknown command {command!r}\n\n{usage()}")
+    module_name, _, help_text = COMMANDS[command]
+    module = importlib.import_module(module_name)
+    parser = argparse.ArgumentParser(prog=f"live-evo {command}", description=help_text)
+    module.add_arguments(parser)
+    add_profile_argument(parser)
+    # "@ids" is filled in when the step runs; parse with a stand-in that passes validation
+    args = parser.parse_args([arg.replace(IDS_PLACEHOLDER, "0") for arg in argv[1:]])
+    return command, module, parser, args
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    profile = False
+    while argv and argv[0].startswith("-"):
+        option = argv.pop(0)
+        if option in ("-h", "--help"):
+            print(usage())
+            return
+        if option != "--profile":
+            sys.exit(f"live-evo: unknown option {option!r}\n\n{usage()}")
+        profile = True
+    if not argv:
+        sys.exit(usage())
+
+    raw_steps = split_chain(argv)
+    steps = [parse_step(step) for step in raw_steps]
+
+    from profiling import profile_cli, span
+
+    names = [COMMANDS[command][1] for command, _, _, _ in steps]
+    profile_cli(CHAIN_SEPARATOR.join(names), profile or any(args.profile for *_, args in steps))
+
+    ids = None
+    for (command, module, parser, args), raw in zip(steps, raw_steps):
+        if any(IDS_PLACEHOLDER in arg for arg in raw):
+            if ids is None:
+                sys.exit(f"live-evo {command}: {IDS_PLACEHOLDER} used before any step returned IDs")
+            args = parser.parse_args([arg.replace(IDS_PLACEHOLDER, ",".join(ids)) for arg in raw[1:]])
+        with span(command):
+            result = module.run(parser, args)
+        if isinstance(result, list):
+            ids = result
+
+
+if __name__ == "__main__":
+    main()
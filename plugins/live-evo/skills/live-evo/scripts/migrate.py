@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migrate the experience database to the SQLite backend.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from experience_manager import DB_PATH, SQLITE_PATH, backend_name, migrate_to_sqlite
+from profiling import add_profile_argument, profile_cli
+
+
+def add_arguments(parser):
+    parser.add_argument("--force", action="store_true",
+                       help="Rebuild the SQLite database even if it already exists, from "
+                            "the active backend")
+
+
+def run(parser, args):
+    if SQLITE_PATH.exists() and not args.force:
+        print(f"SQLite database already exists: {SQLITE_PATH}")
+        print("Use --force to rebuild it from the active backend.")
+        return
+
+    rebuild = SQLITE_PATH.exists() and backend_name() == "sqlite"
+    try:
+        count = migrate_to_sqlite()
+    except RuntimeError as e:
+        sys.exit(f"Not migrated: {e}")
+
+    if rebuild:
+        print(f"Rebuilt {SQLITE_PATH} from its own {count} experiences")
+        print(f"The JSONL file ({DB_PATH}) is stale and was not read.")
+        return
+    print(f"Migrated {count} experiences to {SQLITE_PATH}")
+    print(f"The JSONL file ({DB_PATH}) is no longer read while the SQLite database exists.")
+    print("Set LIVE_EVO_BACKEND=jsonl to switch back.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate experiences from JSONL to SQLite")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("migrate", args.profile)
+    run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
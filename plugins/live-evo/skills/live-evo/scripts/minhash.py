@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for Live-Evo with MinHash and LSH.
+
+An experience's text is reduced to shingles (its word tokens and word
+bigrams). A MinHash signature of NUM_HASHES values estimates the Jaccard
+similarity of two shingle sets, and LSH splits the signature into
+LSH_BANDS bands: two experiences become candidates when any band matches
+exactly, which happens with high probability above ~0.5 similarity and
+rarely below ~0.3. Candidates are then checked with exact Jaccard on
+their text, so the index only has to avoid comparing against everything.
+
+Per experience the index stores one 64-bit key per band, in a memory-mapped
+matrix row-aligned with a plain-text id file (like embeddings.py). Once the
+store is large enough, per-band tables of keys sorted with their rows are
+written as well and looked up by binary search; rows appended since the
+tables were built are scanned directly.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from inverted_index import tokenize
+
+NUM_HASHES = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_HASHES // LSH_BANDS
+
+# Sorted band tables are built once the store has this many rows
+LSH_MIN_ROWS = 1024
+# Rebuild the tables once this fraction of rows is not covered by them
+LSH_MAX_TAIL_FRACTION = 0.25
+# Rebuild the whole index once this fraction of rows belongs to deleted experiences
+MAX_DEAD_FRACTION = 0.25
+
+# Each shingle's NUM_HASHES 32-bit hash values, read from one SHAKE-128 digest
+_HASH_VALUES = struct.Struct(f"<{NUM_HASHES}I")
+_BAND_VALUES = struct.Struct(f"<{LSH_ROWS}I")
+
+_BANDS_MAGIC = b"LMB1"
+_LSH_MAGIC = b"LML1"
+# Padded to 16 bytes so the 64-bit keys behind them stay aligned
+_BANDS_HEADER = struct.Struct("<4sII4x")  # magic, bands, rows
+_LSH_HEADER = struct.Struct("<4sII4x")    # magic, bands, rows covered
+
+
+def shingles(text: str) -> Set[str]:
+    """Word tokens and word bigrams of `text`."""
+    tokens = tokenize(text)
+    return set(tokens).union(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def signature(shingle_set: Set[str]) -> List[int]:
+    """MinHash signature (NUM_HASHES values) of a non-empty shingle set."""
+    hashes = [_HASH_VALUES.unpack(hashlib.shake_128(s.encode()).digest(_HASH_VALUES.size))
+              for s in shingle_set]
+    # Column-wise minimum: the smallest value of each hash function over the set
+    return list(map(min, zip(*hashes)))
+
+
+def band_keys(sig: List[int]) -> array:
+    """One 64-bit key per LSH band of a signature."""
+    keys = array('Q')
+    for band in range(LSH_BANDS):
+        part = _BAND_VALUES.pack(*sig[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(part, digest_size=8).digest(), "little"))
+    return keys
+
+
+def text_keys(text: str) -> Optional[array]:
+    """Band keys of a text, or None if it has no tokens."""
+    shingle_set = shingles(text)
+    return band_keys(signature(shingle_set)) if shingle_set else None
+
+
+class MinHashIndex:
+    """Row-aligned (experience id, band keys) LSH index backed by mmap."""
+
+    def __init__(self, directory: Path):
+        self.bands_path = directory / "minhash.bands"
+        self.ids_path = directory / "minhash.ids"
+        self.lsh_path = directory / "minhash.lsh"
+        self.ids: List[str] = []
+        self.rows = 0
+        self._ids_on_disk = 0
+        self._mm = None
+        self._keys = None
+        self._lsh_mm = None
+        self._lsh = None
+
+    # --- opening -----------------------------------------------------------
+
+    @classmethod
+    def open(cls, directory: Path) -> "MinHashIndex":
+        index = cls(directory)
+        index._open()
+        return index
+
+    def _open(self):
+        self.close()
+        self.ids, self.rows, self._ids_on_disk = [], 0, 0
+        if not (self.bands_path.exists() and self.ids_path.exists()):
+            return
+        with open(self.bands_path, 'rb') as f:
+            header = f.read(_BANDS_HEADER.size)
+            if len(header) < _BANDS_HEADER.size:
+                return
+            magic, bands, rows = _BANDS_HEADER.unpack(header)
+            if magic != _BANDS_MAGIC or bands != LSH_BANDS:
+                return
+            if rows:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.ids_path, 'r') as f:
+            ids = f.read().split()
+        self._ids_on_disk = len(ids)
+        # A crash between the two appends leaves them uneven; trust the shorter
+        rows = min(rows, len(ids), self._row_capacity())
+        self.ids, self.rows = ids[:rows], rows
+        if self._mm is not None:
+            self._keys = memoryview(self._mm)[_BANDS_HEADER.size:
+                                              _BANDS_HEADER.size + rows * LSH_BANDS * 8].cast('Q')
+        self._lsh = self._load_lsh()
+
+    def _row_capacity(self) -> int:
+        if self._mm is None:
+            return 0
+        return (len(self._mm) - _BANDS_HEADER.size) // (LSH_BANDS * 8)
+
+    def close(self):
+        if self._lsh is not None:
+            for view in self._lsh["views"]:
+                view.release()
+            self._lsh = None
+        if self._keys is not None:
+            self._keys.release()
+            self._keys = None
+        for name in ("_mm", "_lsh_mm"):
+            mm = getattr(self, name)
+            if mm is not None:
+                mm.close()
+                setattr(self, name, None)
+
+    # --- writing -----------------------------------------------------------
+
+    def rebuild(self, items: Iterable):
+        """Rewrite the index from (id, text) pairs."""
+        self.close()
+        for path in (self.bands_path, self.ids_path, self.lsh_path):
+            if path.exists():
+                path.unlink()
+        self.ids, self.rows, self._ids_on_disk = [], 0, 0
+        self.append(items)
+
+    def append(self, items: Iterable):
+        """Hash and append (id, text) pairs; texts without tokens get an unmatchable row."""
+        ids, buf = [], array('Q')
+        for exp_id, text in items:
+            keys = text_keys(text)
+            ids.append(exp_id)
+            # Key 0 is reserved for empty texts and never looked up
+            buf.extend(keys if keys is not None else [0] * LSH_BANDS)
+        if not ids:
+            return
+        self.close()
+        rows = self.rows + len(ids)
+        mode = 'r+b' if self.bands_path.exists() else 'w+b'
+        with open(self.bands_path, mode) as f:
+            f.seek(_BANDS_HEADER.size + self.rows * LSH_BANDS * 8)
+            buf.tofile(f)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(_BANDS_HEADER.pack(_BANDS_MAGIC, LSH_BANDS, rows))
+        if self._ids_on_disk == self.rows:
+            with open(self.ids_path, 'a') as f:
+                f.write("".join(i + "\n" for i in ids))
+        else:
+            with open(self.ids_path, 'w') as f:
+                f.write("".join(i + "\n" for i in self.ids + ids))
+        self._open()
+
+    def needs_sync(self, live_ids: Iterable[str]) -> bool:
+        """Whether sync() would change anything for `live_ids`."""
+        live = set(live_ids)
+        stored = set(self.ids)
+        if not live <= stored:
+            return True
+        dead = sum(1 for i in self.ids if i not in live)
+        if self.rows and dead > self.rows * MAX_DEAD_FRACTION:
+            return True
+        return self.rows >= LSH_MIN_ROWS and self._lsh_needs_rebuild()
+
+    def sync(self, live_ids: Iterable[str], fetch_texts: Callable[[List[str]], Dict[str, str]]):
+        """
+        Make the index cover exactly `live_ids`.
+
+        Missing experiences are hashed and appended; rows of deleted
+        experiences are skipped at lookup time until they make up
+        MAX_DEAD_FRACTION of the index, which triggers a full rebuild.
+        """
+        live = set(live_ids)
+        stored = set(self.ids)
+        missing = sorted(i for i in live if i not in stored)
+        dead = sum(1 for i in self.ids if i not in live)
+        if self.rows and dead > self.rows * MAX_DEAD_FRACTION:
+            texts = fetch_texts(sorted(live))
+            self.rebuild(texts.items())
+        elif missing:
+            texts = fetch_texts(missing)
+            self.append((i, texts[i]) for i in missing if i in texts)
+        if self.rows >= LSH_MIN_ROWS and self._lsh_needs_rebuild():
+            self.build_lsh()
+
+    # --- sorted band tables --------------------------------------------------
+
+    def _load_lsh(self):
+        if self._mm is None or not self.lsh_path.exists():
+            return None
+        with open(self.lsh_path, 'rb') as f:
+            header = f.read(_LSH_HEADER.size)
+            if len(header) < _LSH_HEADER.size:
+                return None
+            magic, bands, covered = _LSH_HEADER.unpack(header)
+            if magic != _LSH_MAGIC or bands != LSH_BANDS or covered > self.rows or not covered:
+                return None
+            if os.fstat(f.fileno()).st_size != _LSH_HEADER.size + bands * covered * 12:
+                return None
+            self._lsh_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with memoryview(self._lsh_mm) as view:
+            keys_end = _LSH_HEADER.size + bands * covered * 8
+            keys = view[_LSH_HEADER.size:keys_end].cast('Q')
+            rows = view[keys_end:].cast('I')
+        tables = [(keys[b * covered:(b + 1) * covered], rows[b * covered:(b + 1) * covered])
+                  for b in range(bands)]
+        return {
+            # Per band: (sorted keys, their rows)
+            "tables": tables,
+            "covered": covered,
+            "views": [v for table in tables for v in table] + [keys, rows],
+        }
+
+    @property
+    def _covered(self) -> int:
+        return self._lsh["covered"] if self._lsh else 0
+
+    def _lsh_needs_rebuild(self) -> bool:
+        if self._lsh is None:
+            return True
+        return self.rows - self._covered > self.rows * LSH_MAX_TAIL_FRACTION
+
+    def build_lsh(self):
+        """Write per-band tables of every row's key, sorted for binary search."""
+        rows, keys = self.rows, self._keys
+        sorted_keys, sorted_rows = array('Q'), array('I')
+        for band in range(LSH_BANDS):
+            order = sorted(range(rows), key=lambda r: keys[r * LSH_BANDS + band])
+            sorted_keys.extend(keys[r * LSH_BANDS + band] for r in order)
+            sorted_rows.extend(order)
+
+        tmp_path = self.lsh_path.with_name(self.lsh_path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(_LSH_HEADER.pack(_LSH_MAGIC, LSH_BANDS, rows))
+            sorted_keys.tofile(f)
+            sorted_rows.tofile(f)
+        os.replace(tmp_path, self.lsh_path)
+        self._open()
+
+    # --- lookup --------------------------------------------------------------
+
+    def candidates(self, text: str, allow: Optional[Callable[[str], bool]] = None) -> Set[str]:
+        """Ids sharing at least one LSH band with `text` (sub-linear once tables exist)."""
+        query = text_keys(text)
+        if query is None or not self.rows:
+            return set()
+        rows: Set[int] = set()
+        covered = self._covered
+        if covered:
+            for band, (keys, band_rows) in enumerate(self._lsh["tables"]):
+                key = query[band]
+                i = bisect_left(keys, key)
+                while i < covered and keys[i] == key:
+                    rows.add(band_rows[i])
+                    i += 1
+        # Rows appended after the tables were built are scanned directly
+        keys = self._keys
+        for row in range(covered, self.rows):
+            base = row * LSH_BANDS
+            if any(keys[base + band] == query[band] for band in range(LSH_BANDS)):
+                rows.add(row)
+        found = {self.ids[r] for r in rows}
+        return found if allow is None else {i for i in found if allow(i)}
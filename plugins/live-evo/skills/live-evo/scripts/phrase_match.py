@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Per-query phrase matching for the Jaccard scorer.
+
+simple_similarity() adds a boost when the lowercased query and an
+experience's searchable text contain one another. Done naively that means,
+for every record, lowering and splitting the (often long) query again and
+running two substring searches. A PhraseMatcher is compiled once per query
+instead and then scores any number of texts:
+
+- the query's lowercase form, token set and inner tokens are computed once;
+- "query in text" is only searched for when the text is long enough and
+  holds every inner query token (a token strictly inside the query is
+  whitespace-delimited, so it must be a whole token of any text containing
+  the query);
+- "text in query" likewise needs a short enough text whose inner tokens
+  are all query tokens.
+
+Those token tests reuse the text's token set, which Jaccard needs anyway,
+so for almost every record neither substring search runs at all.
+"""
+from typing import Set, Tuple
+
+
+class PhraseMatcher:
+    """Jaccard overlap and mutual-containment test of one query against many texts."""
+
+    __slots__ = ("query", "tokens", "inner")
+
+    def __init__(self, query: str):
+        self.query = query.lower()
+        words = self.query.split()
+        self.tokens: Set[str] = set(words)
+        self.inner: Set[str] = set(words[1:-1])
+
+    def contains(self, text: str, words=None, text_tokens=None) -> bool:
+        """
+        Whether the lowercased query and `text` (lowercased) contain one
+        another. `words`/`text_tokens` (text.split() and its set) are
+        reused when the caller has them.
+        """
+        if words is None:
+            words = text.split()
+        query = self.query
+        if len(text) >= len(query):
+            return self.inner.issubset(text_tokens or set(words)) and query in text
+        return self.tokens.issuperset(words[1:-1]) and text in query
+
+    def score(self, text: str) -> Tuple[float, bool]:
+        """(Jaccard similarity of the token sets, whether either contains the other)."""
+        text = text.lower()
+        words = text.split()
+        text_tokens = set(words)
+        if not self.tokens or not text_tokens:
+            return 0.0, False
+        overlap = len(self.tokens & text_tokens)
+        jaccard = overlap / (len(self.tokens) + len(text_tokens) - overlap)
+        return jaccard, self.contains(text, words, text_tokens)
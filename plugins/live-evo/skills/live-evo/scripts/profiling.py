@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Lightweight spans, timers and counters for Live-Evo.
+
+Library code wraps its phases in `span("name")` and bumps counters with
+`count("name", n)`; both are near no-ops until profiling is enabled.
+Spans nest, so a phase is reported under its parent ("retrieve/score").
+
+Every CLI script takes --profile, which enables profiling and prints a JSON
+breakdown to stderr when the script exits: time from process start to
+main() (interpreter start-up and imports), per-span totals and call counts,
+counters, and bytes read/written (from /proc/self/io where available).
+Operations served by the daemon are profiled there and reported under
+"daemon/...".
+
+With LIVE_EVO_METRICS=1 every CLI run also appends its breakdown to an
+append-only metrics file (METRICS_PATH), which `stats.py --metrics`
+summarizes as latency percentiles per command and span.
+"""
+import atexit
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Append CLI timings to the metrics file (path set by experience_manager)
+METRICS_ENABLED = os.environ.get("LIVE_EVO_METRICS", "0") not in ("", "0")
+METRICS_PATH = None
+
+_enabled = False
+_stack: List[str] = []
+# span path -> [calls, seconds]
+_spans: Dict[str, list] = {}
+_counters: Dict[str, int] = {}
+_io_start: Optional[Dict[str, int]] = None
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        _stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        path = "/".join(_stack)
+        _stack.pop()
+        entry = _spans.get(path)
+        if entry is None:
+            _spans[path] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """Context manager timing one phase (nested under any open span)."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def count(name: str, n: int = 1):
+    """Add `n` to a counter (records parsed, candidates scored, ...)."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    """Start collecting (resets anything collected so far)."""
+    global _enabled, _io_start
+    _enabled = True
+    _stack.clear()
+    _spans.clear()
+    _counters.clear()
+    _io_start = _proc_io()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def _proc_io() -> Optional[Dict[str, int]]:
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except (OSError, ValueError):
+        return None
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux; ~10 ms resolution)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks after boot); comm may contain spaces
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def report() -> Dict:
+    """Everything collected since enable()."""
+    counters = dict(_counters)
+    io_now = _proc_io()
+    if _io_start is not None and io_now is not None:
+        counters["bytes_read"] = io_now["rchar"] - _io_start["rchar"]
+        counters["bytes_written"] = io_now["wchar"] - _io_start["wchar"]
+    return {
+        "spans": {path: {"calls": calls, "ms": round(seconds * 1000, 3)}
+                  for path, (calls, seconds) in sorted(_spans.items())},
+        "counters": counters,
+    }
+
+
+def merge(remote: Dict, prefix: str):
+    """Fold a report from another process (the daemon) in under `prefix`/."""
+    if not _enabled:
+        return
+    base = "/".join(_stack + [prefix])
+    for path, entry in remote.get("spans", {}).items():
+        mine = _spans.setdefault(f"{base}/{path}", [0, 0.0])
+        mine[0] += entry["calls"]
+        mine[1] += entry["ms"] / 1000
+    for name, n in remote.get("counters", {}).items():
+        count(f"{prefix}_{name}" if name.startswith("bytes_") else name, n)
+
+
+# --- CLI integration -------------------------------------------------------
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", action="store_true",
+                       help="Print a JSON timing breakdown and counters to stderr on exit")
+
+
+def profile_cli(command: str, print_report: bool):
+    """
+    Profile the rest of this CLI run. Called right after argument parsing;
+    the breakdown is printed (--profile) and/or appended to the metrics
+    file when the process exits.
+    """
+    if not (print_report or METRICS_ENABLED):
+        return
+    startup = _process_age()
+    started = time.perf_counter()
+    enable()
+
+    def finish():
+        data = {"command": command, "timestamp": time.time()}
+        main_s = time.perf_counter() - started
+        data["startup_ms"] = None if startup is None else round(startup * 1000, 3)
+        data["main_ms"] = round(main_s * 1000, 3)
+        data["total_ms"] = round(((startup or 0.0) + main_s) * 1000, 3)
+        data.update(report())
+        disable()
+        if print_report:
+            sys.stderr.write(json.dumps(data, indent=2) + "\n")
+        if METRICS_ENABLED and METRICS_PATH is not None:
+            append_metrics(data)
+
+    atexit.register(finish)
+
+
+def append_metrics(data: Dict):
+    line = (json.dumps(data, separators=(",", ":")) + "\n").encode()
+    try:
+        # One O_APPEND write per run, so concurrent runs never interleave lines
+        fd = os.open(METRICS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+# --- metrics summary ---------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in [0, 100])."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def read_metrics(last: Optional[int] = None) -> List[Dict]:
+    """Entries of the metrics file, oldest first (only the `last` ones if given)."""
+    from collections import deque
+    entries = deque(maxlen=last)
+    try:
+        f = open(METRICS_PATH, 'rb')
+    except (OSError, TypeError):
+        return []
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+    return list(entries)
+
+
+def summarize_metrics(entries: Iterable[Dict],
+                      quantiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict]:
+    """
+    Latency percentiles per command: {command: {"runs", "total": {pXX: ms},
+    "spans": {path: {pXX: ms}}}}. Spans are summarized over the runs that
+    entered them.
+    """
+    quantiles = list(quantiles)
+    by_command: Dict[str, Dict[str, List[float]]] = {}
+    for entry in entries:
+        series = by_command.setdefault(entry.get("command", "?"), {})
+        series.setdefault("", []).append(entry.get("total_ms") or entry.get("main_ms", 0.0))
+        for path, span_entry in entry.get("spans", {}).items():
+            series.setdefault(path, []).append(span_entry.get("ms", 0.0))
+
+    summary = {}
+    for command, series in sorted(by_command.items()):
+        totals = series.pop("")
+        summary[command] = {
+            "runs": len(totals),
+            "total": {f"p{q:g}": round(percentile(totals, q), 3) for q in quantiles},
+            "spans": {path: {f"p{q:g}": round(percentile(values, q), 3) for q in quantiles}
+                      for path, values in sorted(series.items())},
+        }
+    return summary
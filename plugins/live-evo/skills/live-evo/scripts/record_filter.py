@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Record predicates shared by listing, iteration and export.
+
+A RecordFilter selects experiences by category, a weight range and a
+created_at range, and is pushed down to wherever the records are: SQL
+WHERE clauses for SQLite, column tests for the columnar view, and, for
+streamed JSONL, a byte-level test that rules most non-matching lines out
+before they are parsed.
+
+created_at values are ISO 8601 strings, so ranges compare them as
+strings: created_since <= created_at < created_before. Records without a
+created_at never match a created_at range.
+"""
+import json
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import profiling
+
+_CREATED_KEY = b'"created_at": "'
+
+
+class RecordFilter:
+    """Which experiences a listing, scan or export returns (every field optional)."""
+
+    FIELDS = ("category", "min_weight", "max_weight", "created_since", "created_before")
+
+    def __init__(self, category: Optional[str] = None, min_weight: Optional[float] = None,
+                 max_weight: Optional[float] = None, created_since: Optional[str] = None,
+                 created_before: Optional[str] = None):
+        self.category = category or None
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.created_since = created_since
+        self.created_before = created_before
+        # A category's value as it can appear in a stored line (escaped or raw UTF-8)
+        self._category_needles = (
+            {json.dumps(self.category).encode(), json.dumps(self.category, ensure_ascii=False).encode()}
+            if self.category else set())
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, field) is not None for field in self.FIELDS)
+
+    def weight_ok(self, weight: float) -> bool:
+        return ((self.min_weight is None or weight >= self.min_weight)
+                and (self.max_weight is None or weight <= self.max_weight))
+
+    def created_ok(self, created_at) -> bool:
+        if self.created_since is None and self.created_before is None:
+            return True
+        if not isinstance(created_at, str) or not created_at:
+            return False
+        return ((self.created_since is None or created_at >= self.created_since)
+                and (self.created_before is None or created_at < self.created_before))
+
+    def matches(self, exp: Dict, default_weight: float = 1.0) -> bool:
+        return ((self.category is None or exp.get("category") == self.category)
+                and self.weight_ok(exp.get("weight", default_weight))
+                and self.created_ok(exp.get("created_at")))
+
+    def rules_out(self, line: bytes) -> bool:
+        """
+        Whether a raw JSONL line certainly does not match, judged without
+        parsing it. Weights are not tested: pending deltas may change them.
+        """
+        if self._category_needles and not any(n in line for n in self._category_needles):
+            return True
+        if self.created_since is None and self.created_before is None:
+            return False
+        if line.count(_CREATED_KEY) != 1:
+            # Absent in this spelling, or also nested in another value: parse to be sure
+            return False
+        start = line.index(_CREATED_KEY) + len(_CREATED_KEY)
+        end = line.find(b'"', start)
+        try:
+            return not self.created_ok(line[start:end].decode())
+        except UnicodeDecodeError:
+            return False
+
+    def sql(self) -> Tuple[str, List]:
+        """(WHERE clause or "", parameters) for the experiences table."""
+        clauses, params = [], []
+        for clause, value in (("category = ?", self.category), ("weight >= ?", self.min_weight),
+                              ("weight <= ?", self.max_weight),
+                              ("created_at >= ?", self.created_since),
+                              ("created_at < ?", self.created_before)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if self.created_since is not None or self.created_before is not None:
+            clauses.append("created_at != ''")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def scan_jsonl(f: BinaryIO, where: RecordFilter, deltas: Optional[Dict[str, Dict]] = None,
+               default_weight: float = 1.0) -> Iterator[Tuple[int, Dict]]:
+    """
+    (offset, record) for each line of an open JSONL file that matches
+    `where`, with pending field deltas applied. One line is held at a time;
+    lines `where` rules out are skipped unparsed, and an unterminated last
+    line (an append in progress) is left alone.
+    """
+    deltas = deltas or {}
+    offset = f.tell()
+    parsed = skipped = 0
+    try:
+        for raw in f:
+            start, offset = offset, offset + len(raw)
+            if not raw.endswith(b"\n"):
+                break
+            if where and where.rules_out(raw):
+                skipped += 1
+                continue
+            try:
+                exp = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(exp, dict):
+                continue
+            parsed += 1
+            if 'weight' not in exp:
+                exp['weight'] = default_weight
+            if exp.get("id") in deltas:
+                exp.update(deltas[exp["id"]])
+            if not where or where.matches(exp, default_weight):
+                yield start, exp
+    finally:
+        profiling.count("records_parsed", parsed)
+        profiling.count("records_skipped", skipped)
+
+
+# --- command-line options ---------------------------------------------------
+
+def timestamp(value: str) -> str:
+    """argparse type: an ISO 8601 date or time, normalized for string comparison."""
+    return datetime.fromisoformat(value).isoformat()
+
+
+def add_filter_arguments(parser):
+    parser.add_argument("--category", "-c", help="Only this category")
+    parser.add_argument("--min-weight", type=float, help="Only experiences weighing at least this")
+    parser.add_argument("--max-weight", type=float, help="Only experiences weighing at most this")
+    parser.add_argument("--since", type=timestamp, dest="created_since",
+                       help="Only experiences created at or after this ISO date/time")
+    parser.add_argument("--before", type=timestamp, dest="created_before",
+                       help="Only experiences created before this ISO date/time")
+
+
+def filter_arguments(args) -> Dict:
+    """The options add_filter_arguments added, as keyword arguments for the library."""
+    return {field: getattr(args, field) for field in RecordFilter.FIELDS}
+
+
+def describe(where: RecordFilter) -> str:
+    """Human-readable summary of the filters in use ("" when there are none)."""
+    parts = []
+    if where.category is not None:
+        parts.append(f"category: {where.category}")
+    if where.min_weight is not None or where.max_weight is not None:
+        low = "" if where.min_weight is None else f"{where.min_weight:g}"
+        high = "" if where.max_weight is None else f"{where.max_weight:g}"
+        parts.append(f"weight: {low}..{high}")
+    if where.created_since is not None or where.created_before is not None:
+        parts.append(f"created: {where.created_since or ''}..{where.created_before or ''}")
+    return ", ".join(parts)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+On-disk LRU cache of retrieval results.
+
+Each entry is a small JSON file in the cache directory, named by the
+store's generation (its change stamp) and a hash of the lookup key. A hit
+refreshes the file's mtime, so mtimes give the LRU order; once the
+entries exceed the count or byte bound the least recently used ones are
+deleted. Entries of an older generation can never hit again and are
+dropped as soon as an entry of a newer one is written, so callers must
+only put values computed entirely at the generation they pass.
+
+Hit, miss and eviction counters are kept in a small JSON file updated
+under the cache's own lock, so readers never wait on the store's writers.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from locking import atomic_write, file_lock
+
+_COUNTERS = ("hits", "misses", "evictions")
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class ResultCache:
+    """Bounded LRU cache of JSON values keyed by (generation, key) (see module docstring)."""
+
+    def __init__(self, directory: Path, max_entries: int, max_bytes: int):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.counters_path = directory / "counters.json"
+        self.lock_path = directory / "cache.lock"
+
+    def _path(self, generation: Any, key: Any) -> Path:
+        return self.directory / f"{_digest(generation)[:16]}-{_digest(key)}.json"
+
+    # --- lookups -----------------------------------------------------------
+
+    def get(self, generation: Any, key: Any) -> Optional[Any]:
+        """The cached value, or None on a miss."""
+        path = self._path(generation, key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return value
+
+    def put(self, generation: Any, key: Any, value: Any):
+        """Store a value, then evict down to the bounds."""
+        path = self._path(generation, key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, durable=False) as f:
+            json.dump(value, f, separators=(",", ":"), default=str)
+        self._evict(path.name.split("-", 1)[0])
+
+    def clear(self):
+        for entry in self._entries():
+            _unlink(entry.path)
+
+    # --- maintenance -------------------------------------------------------
+
+    def _entries(self):
+        try:
+            with os.scandir(self.directory) as it:
+                return [e for e in it if e.name.endswith(".json") and "-" in e.name]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self, generation_prefix: str):
+        live, evicted = [], 0
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if not entry.name.startswith(generation_prefix + "-"):
+                evicted += _unlink(entry.path)
+            else:
+                live.append((st.st_mtime_ns, st.st_size, entry.path))
+        live.sort()
+        total = sum(size for _, size, _ in live)
+        while live and (len(live) > self.max_entries or total > self.max_bytes):
+            _, size, path = live.pop(0)
+            total -= size
+            evicted += _unlink(path)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _count(self, counter: str, n: int = 1):
+        try:
+            with file_lock(self.lock_path):
+                counters = self._load_counters()
+                counters[counter] += n
+                with atomic_write(self.counters_path, durable=False) as f:
+                    json.dump(counters, f)
+        except OSError:
+            pass
+
+    def _load_counters(self) -> Dict[str, int]:
+        try:
+            with open(self.counters_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        return {c: int(data.get(c, 0)) for c in _COUNTERS}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus the current number and total size of entries."""
+        stats: Dict[str, Any] = self._load_counters()
+        sizes = []
+        for entry in self._entries():
+            try:
+                sizes.append(entry.stat().st_size)
+            except FileNotFoundError:
+                continue
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(sizes)
+        stats["bytes"] = sum(sizes)
+        return stats
+
+
+def _unlink(path) -> int:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        return 0
+    return 1
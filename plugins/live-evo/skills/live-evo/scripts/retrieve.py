@@ -3,42 +3,100 @@
 Retrieve relevant experiences and generate task-specific guideline.
 """
 import argparse
+import json
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from experience_manager import find_relevant_experiences, generate_guideline, load_experiences
+from daemon import call
+from experience_manager import DEFAULT_SCORER, SCORERS, generate_guideline
+from profiling import add_profile_argument, profile_cli
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Retrieve relevant experiences for a task")
-    parser.add_argument("--query", "-q", required=True, help="Task description to search for")
+def read_queries(path: str):
+    """Read batch queries: one JSON object ({"query": ..., overrides}) or string per line."""
+    f = sys.stdin if path == "-" else open(path, 'r')
+    try:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield item if isinstance(item, dict) else {"query": str(item)}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def run_batch(args):
+    """Stream one JSON result line per query in the queries file."""
+    from experience_manager import find_relevant_experiences_batch
+
+    items = list(read_queries(args.queries_file))
+    batch = find_relevant_experiences_batch(
+        items,
+        top_k=args.top_k,
+        threshold=args.threshold,
+        category=args.category,
+        scorer=args.scorer,
+        processes=args.processes,
+    )
+    for i, (item, results) in enumerate(zip(items, batch)):
+        experiences = [exp for exp, _ in results]
+        record = {
+            "index": i,
+            "query": item["query"],
+            "results": [{"id": exp.get("id"), "score": score, "weight": exp.get("weight"),
+                         "category": exp.get("category"), "question": exp.get("question")}
+                        for exp, score in results],
+            "experience_ids": [exp.get("id") for exp in experiences],
+            "guideline": generate_guideline(item["query"], experiences),
+        }
+        if "id" in item:
+            record["id"] = item["id"]
+        sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+
+
+def add_arguments(parser):
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", "-q", help="Task description to search for")
+    source.add_argument("--queries-file", help="JSONL file of queries ('-' for stdin); "
+                                               "prints one JSON result per line")
     parser.add_argument("--top-k", "-k", type=int, default=5, help="Number of experiences to retrieve")
     parser.add_argument("--threshold", "-t", type=float, default=0.1, help="Minimum similarity threshold")
     parser.add_argument("--category", "-c", help="Filter by category")
+    parser.add_argument("--scorer", default=DEFAULT_SCORER, choices=sorted(SCORERS),
+                       help="Similarity scorer (jaccard keyword overlap, bm25, or local embedding)")
     parser.add_argument("--raw", action="store_true", help="Show raw experiences without guideline")
+    parser.add_argument("--processes", "-p", type=int,
+                       help="Worker processes for --queries-file (default: auto)")
 
-    args = parser.parse_args()
 
-    # Check if we have any experiences
-    all_experiences = load_experiences()
-    if not all_experiences:
-        print("No experiences in database yet.")
-        print("As you complete verifiable tasks and learn from mistakes,")
-        print("use `add_experience.py` to store lessons learned.")
+def run(parser, args):
+    if args.queries_file:
+        run_batch(args)
         return
 
-    # Find relevant experiences
-    results = find_relevant_experiences(
+    # Find relevant experiences (one daemon round trip when it is running)
+    response = call(
+        "retrieve",
         query=args.query,
         top_k=args.top_k,
         threshold=args.threshold,
-        category=args.category
+        category=args.category,
+        scorer=args.scorer,
     )
+    total, results = response["total"], response["results"]
+
+    # Check if we have any experiences
+    if not total:
+        print("No experiences in database yet.")
+        print("As you complete verifiable tasks and learn from mistakes,")
+        print("use `add_experience.py` to store lessons learned.")
+        return
 
     if not results:
         print(f"No relevant experiences found for: {args.query[:60]}...")
-        print(f"(Total experiences in database: {len(all_experiences)})")
+        print(f"(Total experiences in database: {total})")
         print("\nProceed without guideline, but consider adding an experience after this task if you learn something.")
         return
 
@@ -64,12 +122,22 @@ def main():
             print(f"**Missed Info:** {exp.get('missed_information', '')}")
             print("-" * 40)
     else:
-        guideline = generate_guideline(args.query, experiences)
         print("\n" + "=" * 60)
-        print(guideline)
+        print(response["guideline"])
         print("=" * 60)
 
     print(f"\nExperience IDs (for update): {','.join(experience_ids)}")
+    return experience_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieve relevant experiences for a task")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("retrieve", args.profile)
+    run(parser, args)
 
 
 if __name__ == "__main__":
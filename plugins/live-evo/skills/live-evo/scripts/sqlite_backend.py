@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+SQLite storage backend for Live-Evo.
+
+Experiences live in one table with indexed id, category, weight, created_at
+and use_count columns, so filtered listings, sorted top-N queries and point
+updates by ID never scan the whole store. An external-content FTS5 table,
+kept in sync by triggers, supplies retrieval candidates and BM25 ranks.
+
+The database runs in WAL mode so many agent sessions can read while one
+writes; writers take the lock up front (BEGIN IMMEDIATE) and wait on
+busy_timeout instead of failing.
+"""
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import profiling
+from columns import ExperienceColumns
+from profiling import span
+from record_filter import RecordFilter
+
+# Columns stored natively; any other keys round-trip through the `extra` JSON column
+COLUMNS = ("id", "question", "failure_reason", "improvement", "missed_information",
+           "category", "weight", "created_at", "use_count", "success_count", "last_used")
+TEXT_FIELDS = ("question", "failure_reason", "improvement", "missed_information")
+SORT_COLUMNS = {"weight", "created_at", "use_count"}
+
+# SQLite's default limit on bound parameters is 999
+_CHUNK = 500
+_BUSY_TIMEOUT_MS = 30000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiences (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    question TEXT NOT NULL DEFAULT '',
+    failure_reason TEXT NOT NULL DEFAULT '',
+    improvement TEXT NOT NULL DEFAULT '',
+    missed_information TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT 'other',
+    weight REAL NOT NULL DEFAULT 1.0,
+    created_at TEXT,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_experiences_category ON experiences(category);
+CREATE INDEX IF NOT EXISTS idx_experiences_weight ON experiences(weight);
+CREATE INDEX IF NOT EXISTS idx_experiences_created_at ON experiences(created_at);
+CREATE INDEX IF NOT EXISTS idx_experiences_use_count ON experiences(use_count);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS experiences_fts USING fts5(
+    question, failure_reason, improvement, missed_information,
+    content='experiences', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS experiences_ai AFTER INSERT ON experiences BEGIN
+    INSERT INTO experiences_fts(rowid, question, failure_reason, improvement, missed_information)
+    VALUES (new.rowid, new.question, new.failure_reason, new.improvement, new.missed_information);
+END;
+CREATE TRIGGER IF NOT EXISTS experiences_ad AFTER DELETE ON experiences BEGIN
+    INSERT INTO experiences_fts(experiences_fts, rowid, question, failure_reason, improvement, missed_information)
+    VALUES ('delete', old.rowid, old.question, old.failure_reason, old.improvement, old.missed_information);
+END;
+
+-- meta.generation counts row changes, so readers can tell whether the store changed
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TRIGGER IF NOT EXISTS experiences_gen_ai AFTER INSERT ON experiences BEGIN
+    INSERT INTO meta VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS experiences_gen_au AFTER UPDATE ON experiences BEGIN
+    INSERT INTO meta VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS experiences_gen_ad AFTER DELETE ON experiences BEGIN
+    INSERT INTO meta VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS experiences_au AFTER UPDATE OF question, failure_reason, improvement, missed_information
+ON experiences BEGIN
+    INSERT INTO experiences_fts(experiences_fts, rowid, question, failure_reason, improvement, missed_information)
+    VALUES ('delete', old.rowid, old.question, old.failure_reason, old.improvement, old.missed_information);
+    INSERT INTO experiences_fts(rowid, question, failure_reason, improvement, missed_information)
+    VALUES (new.rowid, new.question, new.failure_reason, new.improvement, new.missed_information);
+END;
+"""
+
+_UPSERT = (
+    f"INSERT INTO experiences ({', '.join(COLUMNS)}, extra) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS[1:] + ("extra",))
+)
+
+
+def _chunks(items: List, size: int = _CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# The text simple_similarity matches against (searchable_text), lowercased
+_SEARCH_TEXT = "lower(question || ' ' || failure_reason || ' ' || improvement || ' ' || missed_information)"
+
+
+def _fts_query(tokens: Iterable[str]) -> str:
+    """OR together the query tokens as quoted FTS5 phrases."""
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(set(tokens)))
+
+
+class SqliteBackend:
+    """Experience store in a WAL-mode SQLite database with FTS5 retrieval."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path), timeout=_BUSY_TIMEOUT_MS / 1000,
+                                    isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+        self.conn.executescript(_SCHEMA)
+        self._columns: Optional[ExperienceColumns] = None
+        self._columns_stamp = None
+
+    def close(self):
+        self.conn.close()
+
+    # --- record conversion -------------------------------------------------
+
+    @staticmethod
+    def _to_row(exp: Dict) -> tuple:
+        extra = {k: v for k, v in exp.items() if k not in COLUMNS}
+        return (
+            exp["id"],
+            exp.get("question", ""),
+            exp.get("failure_reason", ""),
+            exp.get("improvement", ""),
+            exp.get("missed_information", ""),
+            exp.get("category", "other"),
+            exp.get("weight", 1.0),
+            exp.get("created_at"),
+            exp.get("use_count", 0),
+            exp.get("success_count", 0),
+            exp.get("last_used"),
+            json.dumps(extra, default=str) if extra else None,
+        )
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict:
+        exp = {c: row[c] for c in COLUMNS}
+        if exp["last_used"] is None:
+            del exp["last_used"]
+        if row["extra"]:
+            exp.update(json.loads(row["extra"]))
+        return exp
+
+    def _write(self, statements):
+        """Run (sql, params-seq) pairs in one IMMEDIATE transaction."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                self.conn.executemany(sql, params)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # --- storage API -------------------------------------------------------
+
+    def load_all(self) -> List[Dict]:
+        with span("load_all"):
+            experiences = [self._from_row(r) for r in self.conn.execute(
+                "SELECT * FROM experiences ORDER BY rowid")]
+        profiling.count("records_parsed", len(experiences))
+        return experiences
+
+    def iter_records(self, where: RecordFilter) -> Iterator[Dict]:
+        """Stream the records matching `where` in rowid order (filtered in SQL)."""
+        clause, params = where.sql()
+        read = 0
+        try:
+            for row in self.conn.execute(f"SELECT * FROM experiences{clause} ORDER BY rowid", params):
+                read += 1
+                yield self._from_row(row)
+        finally:
+            profiling.count("records_read", read)
+
+    def save_all(self, experiences: List[Dict]):
+        rows = [self._to_row(e) for e in experiences if e.get("id")]
+        self._write([("DELETE FROM experiences", [()]), (_UPSERT, rows)])
+
+    def append(self, exp: Dict) -> int:
+        """Insert or replace one experience; returns its rowid (storage position)."""
+        self._write([(_UPSERT, [self._to_row(exp)])])
+        return self.conn.execute("SELECT rowid FROM experiences WHERE id = ?",
+                                 (exp["id"],)).fetchone()[0]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+
+    def get_many(self, ids: Iterable[str]) -> List[Dict]:
+        found = []
+        for chunk in _chunks(sorted(set(ids))):
+            found.extend(self.conn.execute(
+                f"SELECT * FROM experiences WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk))
+        found.sort(key=lambda r: r["rowid"])
+        profiling.count("records_read", len(found))
+        return [self._from_row(r) for r in found]
+
+    def update_fields(self, changes: List[Dict]):
+        """Point-update columns by id; each change is {"id": ..., column: value, ...}."""
+        statements = []
+        for change in changes:
+            fields = [k for k in change if k in COLUMNS and k != "id"]
+            if fields:
+                sql = (f"UPDATE experiences SET {', '.join(f + ' = ?' for f in fields)} "
+                       f"WHERE id = ?")
+                statements.append((sql, [[change[f] for f in fields] + [change["id"]]]))
+        if statements:
+            self._write(statements)
+
+    def positions(self, ids: Iterable[str]) -> Dict[str, int]:
+        """Storage order keys (rowids) of the given experiences."""
+        positions = {}
+        for chunk in _chunks(list(ids)):
+            positions.update(self.conn.execute(
+                f"SELECT id, rowid FROM experiences WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk).fetchall())
+        return positions
+
+    def stamp(self) -> list:
+        """Changes whenever any experience row is inserted, updated or deleted."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return [self.name, self.path.stat().st_ino, row[0] if row else 0]
+
+    def columns(self) -> ExperienceColumns:
+        """Columnar view of the scalar fields, rebuilt when stamp() changes."""
+        stamp = self.stamp()
+        if self._columns is None or stamp != self._columns_stamp:
+            cols = ExperienceColumns(self._read_rows)
+            with span("columns_parse"):
+                for row in self.conn.execute(
+                        "SELECT rowid, id, category, weight, use_count, success_count, created_at "
+                        "FROM experiences ORDER BY rowid"):
+                    cols.append(dict(row), row["rowid"])
+            profiling.count("records_parsed", len(cols))
+            self._columns, self._columns_stamp = cols, stamp
+        return self._columns
+
+    def _read_rows(self, cols: ExperienceColumns, rows: List[int]) -> List[Dict]:
+        rowids = [cols.positions[r] for r in rows]
+        found = {}
+        for chunk in _chunks(rowids):
+            found.update((r["rowid"], r) for r in self.conn.execute(
+                f"SELECT * FROM experiences WHERE rowid IN ({','.join('?' * len(chunk))})",
+                chunk))
+        profiling.count("records_read", len(found))
+        return [self._from_row(found[rowid]) for rowid in rowids if rowid in found]
+
+    def weights(self, ids: Iterable[str]) -> Dict[str, float]:
+        weights = {}
+        for chunk in _chunks(list(ids)):
+            weights.update(self.conn.execute(
+                f"SELECT id, weight FROM experiences WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk).fetchall())
+        return weights
+
+    def live_ids(self, category: Optional[str] = None) -> Set[str]:
+        if category:
+            rows = self.conn.execute("SELECT id FROM experiences WHERE category = ?", (category,))
+        else:
+            rows = self.conn.execute("SELECT id FROM experiences")
+        return {r[0] for r in rows}
+
+    def candidates(self, tokens: Iterable[str], category: Optional[str] = None) -> Set[str]:
+        return set(self.bm25(tokens, category))
+
+    def term_overlap(self, tokens: Iterable[str],
+                     category: Optional[str] = None) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Candidates sharing a query token; FTS5 keeps no per-document term counts, so None."""
+        return dict.fromkeys(self.candidates(tokens, category))
+
+    def phrase_overlap(self, query: str,
+                       category: Optional[str] = None) -> Dict[str, Optional[Tuple[int, int]]]:
+        """
+        Rows whose text contains the query or sits inside it, the substring
+        matches that earn simple_similarity's phrase boost. A scan, but in
+        SQLite; lower() only folds ASCII, so other letters match by case.
+        """
+        query = query.lower()
+        if not query.strip():
+            return {}
+        sql = (f"SELECT id FROM experiences WHERE (instr({_SEARCH_TEXT}, ?) "
+               f"OR instr(?, {_SEARCH_TEXT})) AND trim({_SEARCH_TEXT}) != ''")
+        params = [query, query]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        return dict.fromkeys(r[0] for r in self.conn.execute(sql, params))
+
+    def bm25(self, tokens: Iterable[str], category: Optional[str] = None) -> Dict[str, float]:
+        """
+        FTS5 BM25 for documents matching any query token.
+
+        FTS5 ranks are negative (lower is better); they are divided by the
+        best rank of the query so the top match scores 1.0.
+        """
+        match = _fts_query(tokens)
+        if not match:
+            return {}
+        sql = ("SELECT e.id, bm25(experiences_fts) FROM experiences_fts "
+               "JOIN experiences e ON e.rowid = experiences_fts.rowid "
+               "WHERE experiences_fts MATCH ?")
+        params = [match]
+        if category:
+            sql += " AND e.category = ?"
+            params.append(category)
+        ranks = self.conn.execute(sql, params).fetchall()
+        best = min((rank for _, rank in ranks), default=0.0)
+        if not best:
+            return {exp_id: 0.0 for exp_id, _ in ranks}
+        return {exp_id: rank / best for exp_id, rank in ranks}
+
+    def query(self, where: RecordFilter, sort: str = "weight",
+              limit: Optional[int] = None) -> List[Dict]:
+        """Experiences matching `where`, ordered by an indexed column (descending)."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}")
+        clause, params = where.sql()
+        sql = "SELECT * FROM experiences" + clause
+        sql += f" ORDER BY {sort} DESC, rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        experiences = [self._from_row(r) for r in self.conn.execute(sql, params)]
+        profiling.count("records_read", len(experiences))
+        return experiences
+
+    def compact(self):
+        """Merge FTS segments and checkpoint the WAL back into the main file."""
+        self.conn.execute("INSERT INTO experiences_fts(experiences_fts) VALUES ('optimize')")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
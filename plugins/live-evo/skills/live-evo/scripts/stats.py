@@ -2,16 +2,84 @@
 """
 Show statistics about the experience database.
 """
-import json
+import argparse
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from experience_manager import get_statistics, load_experiences, WEIGHT_HISTORY_PATH
+from daemon import call
+from profiling import add_profile_argument, profile_cli
 
 
-def main():
-    stats = get_statistics()
+def show_experience_history(experience_id: str, raw: bool):
+    """Print one experience's weight-change rollup (and, with raw, every change)."""
+    history = call("history", experience_id=experience_id)
+    if not history:
+        print(f"No weight updates recorded for {experience_id}.")
+        return
+
+    print(f"Weight history of {experience_id}:")
+    confirmed = history.get("confirmed", 0)
+    print(f"  Updates: {history['updates']} ({history['helped']} helped, "
+          f"{history['updates'] - history['helped'] - confirmed} hurt"
+          + (f", {confirmed} confirmed by a merge)" if confirmed else ")"))
+    print(f"  First change: {history.get('first_change')}")
+    print(f"  Last change: {history.get('last_change')}")
+    print(f"  Weight: {history.get('first_weight', 0):.2f} -> {history.get('last_weight', 0):.2f} "
+          f"(min {history.get('min_weight', 0):.2f}, max {history.get('max_weight', 0):.2f})")
+
+    if raw:
+        from experience_manager import iter_weight_history
+        from weight_history import is_confirm
+        print("\nChanges:")
+        for entry in iter_weight_history(experience_id):
+            mark = "=" if is_confirm(entry) else "+" if entry.get("helped") else "-"
+            print(f"  {entry.get('timestamp')} {mark} {entry.get('old_weight', 0):.2f} -> "
+                  f"{entry.get('new_weight', 0):.2f}")
+
+
+def show_metrics(last: int):
+    """Print latency percentiles of recent CLI runs from the metrics file."""
+    from profiling import read_metrics, summarize_metrics
+
+    summary = summarize_metrics(read_metrics(last))
+    if not summary:
+        print("No metrics recorded yet (set LIVE_EVO_METRICS=1 to record CLI timings).")
+        return
+
+    width = max([len("command / span")] + [len(c) for c in summary] +
+                [len(p) + 2 for entry in summary.values() for p in entry["spans"]])
+    print(f"{'command / span':<{width}} {'runs':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+    for command, entry in summary.items():
+        rows = [(command, entry["runs"], entry["total"])]
+        rows += [("  " + path, "", times) for path, times in entry["spans"].items()]
+        for label, runs, times in rows:
+            print(f"{label:<{width}} {runs:>6} {times['p50']:>10.1f} {times['p90']:>10.1f} "
+                  f"{times['p99']:>10.1f}")
+
+
+def add_arguments(parser):
+    parser.add_argument("--rebuild", action="store_true",
+                       help="Recompute the statistics summary from the full database")
+    parser.add_argument("--experience", "-e", help="Show the weight history of one experience ID")
+    parser.add_argument("--raw", action="store_true",
+                       help="With --experience, also list every recorded weight change")
+    parser.add_argument("--metrics", action="store_true",
+                       help="Summarize recorded CLI latencies (see LIVE_EVO_METRICS)")
+    parser.add_argument("--last", type=int, default=1000,
+                       help="With --metrics, only the most recent N runs")
+
+
+def run(parser, args):
+    if args.metrics:
+        show_metrics(args.last)
+        return
+
+    if args.experience:
+        show_experience_history(args.experience, args.raw)
+        return
+
+    stats = call("stats", rebuild=args.rebuild)
 
     if stats.get("total", 0) == 0 and "total_experiences" not in stats:
         print("No experiences in database yet.")
@@ -27,6 +95,11 @@ def main():
     print("=" * 50)
 
     print(f"\nTotal Experiences: {stats.get('total_experiences', 0)}")
+    tiers = stats.get("tiers")
+    if tiers:
+        capacity = tiers["capacity"] if tiers["capacity"] is not None else "unbounded"
+        print(f"  Hot tier: {tiers['hot']} (capacity {capacity})")
+        print(f"  Cold archive: {tiers['cold']}")
     print(f"\nBy Category:")
     for cat, count in stats.get("categories", {}).items():
         print(f"  - {cat}: {count}")
@@ -39,39 +112,49 @@ def main():
     print(f"  Low quality (<=0.5): {stats.get('low_quality_count', 0)}")
 
     # Weight history
-    if WEIGHT_HISTORY_PATH.exists():
-        with open(WEIGHT_HISTORY_PATH, 'r') as f:
-            history = [json.loads(line) for line in f if line.strip()]
-
-        if history:
-            helped_count = len([h for h in history if h.get("helped", False)])
-            hurt_count = len(history) - helped_count
-
-            print(f"\nWeight Update History:")
-            print(f"  Total updates: {len(history)}")
-            print(f"  Helped (weight increased): {helped_count}")
-            print(f"  Hurt (weight decreased): {hurt_count}")
-            if history:
-                print(f"  Success rate: {helped_count/len(history)*100:.1f}%")
+    helped_count = stats.get("helped_count", 0)
+    total_updates = helped_count + stats.get("hurt_count", 0)
+    if total_updates:
+        print(f"\nWeight Update History:")
+        print(f"  Total updates: {total_updates}")
+        print(f"  Helped (weight increased): {helped_count}")
+        print(f"  Hurt (weight decreased): {stats.get('hurt_count', 0)}")
+        print(f"  Success rate: {helped_count/total_updates*100:.1f}%")
 
     # Top experiences
-    experiences = load_experiences()
+    experiences = stats.get("top_by_weight", [])
     if experiences:
-        experiences.sort(key=lambda x: x.get("weight", 1.0), reverse=True)
-
         print(f"\nTop 3 Most Useful Experiences:")
-        for i, exp in enumerate(experiences[:3], 1):
+        for i, exp in enumerate(experiences, 1):
             print(f"  {i}. [{exp.get('weight', 1.0):.2f}] {exp.get('question', '')[:50]}...")
 
-        experiences.sort(key=lambda x: x.get("use_count", 0), reverse=True)
+        experiences = stats.get("top_by_use", [])
         print(f"\nMost Used Experiences:")
-        for i, exp in enumerate(experiences[:3], 1):
+        for i, exp in enumerate(experiences, 1):
             uses = exp.get("use_count", 0)
             successes = exp.get("success_count", 0)
             print(f"  {i}. [{uses} uses, {successes} successes] {exp.get('question', '')[:40]}...")
 
+    cache = stats.get("result_cache")
+    if cache and cache["hits"] + cache["misses"]:
+        print(f"\nRetrieval Cache:")
+        print(f"  Hits: {cache['hits']}  Misses: {cache['misses']}  "
+              f"(hit rate {cache['hit_rate'] * 100:.1f}%)")
+        print(f"  Entries: {cache['entries']} ({cache['bytes'] / 1024:.1f} KiB), "
+              f"evicted: {cache['evictions']}")
+
     print("\n" + "=" * 50)
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Show statistics about the experience database")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("stats", args.profile)
+    run(parser, args)
+
+
 if __name__ == "__main__":
     main()
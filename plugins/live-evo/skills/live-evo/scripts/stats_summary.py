@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Materialized statistics for the experience store.
+
+A small JSON record next to the DB holds everything stats.py shows: counts
+per category, a histogram of exact weight values (which also yields the
+average, min, max and quality counts), helped/hurt verdict totals and the
+leading experiences by weight and by use count. Writers update it in the
+same locked section as the data, so reading statistics never touches the
+experiences themselves.
+
+The record carries the backend's change stamp from its last update; if the
+store changed without it (a bulk rewrite, an older client, a hand edit) the
+stamps differ and the caller rebuilds it with a full scan.
+
+Leader lists keep up to TOP_CAPACITY entries plus `bound`, an upper bound on
+the sort key of every experience not in the list. Entries whose key drops to
+the bound leave the list, outsiders whose key rises above it join, and the
+list answers a top-n query exactly while it still holds n entries (or there
+are no outsiders at all).
+"""
+import heapq
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from columns import ExperienceColumns
+from locking import atomic_write
+
+# Entries kept per leader list; top-n queries are exact for n up to this
+TOP_CAPACITY = 32
+# Leader lists: name -> record field they rank by (ties go to the older record)
+TOP_FIELDS = {"top_weight": "weight", "top_used": "use_count"}
+# Fields copied into leader entries (enough for stats.py to print them)
+ENTRY_FIELDS = ("id", "question", "category", "weight", "use_count", "success_count")
+HIGH_QUALITY_WEIGHT = 1.5
+LOW_QUALITY_WEIGHT = 0.5
+
+
+def _entry(exp: Dict, pos: int) -> Dict:
+    entry = {f: exp.get(f) for f in ENTRY_FIELDS}
+    entry["weight"] = exp.get("weight", 1.0)
+    entry["use_count"] = exp.get("use_count", 0)
+    entry["success_count"] = exp.get("success_count", 0)
+    entry["pos"] = pos
+    return entry
+
+
+def _key(entry: Dict, field: str) -> list:
+    # Descending by field, then by storage position (what query_experiences returns)
+    return [entry[field], -entry["pos"]]
+
+
+class StatsSummary:
+    """Incrementally maintained statistics record (see module docstring)."""
+
+    VERSION = 1
+
+    def __init__(self):
+        self.stamp = None
+        self.total = 0
+        self.categories: Dict[str, int] = {}
+        # repr(weight) -> number of experiences with exactly that weight
+        self.weights: Dict[str, int] = {}
+        self.helped = 0
+        self.hurt = 0
+        # name -> {"entries": leaders, "bound": snapshot of the best evicted entry}
+        self.tops: Dict[str, Dict] = {name: {"entries": [], "bound": None} for name in TOP_FIELDS}
+
+    # --- maintenance -------------------------------------------------------
+
+    def _count_weight(self, weight: float, delta: int):
+        key = repr(float(weight))
+        count = self.weights.get(key, 0) + delta
+        if count:
+            self.weights[key] = count
+        else:
+            self.weights.pop(key, None)
+
+    def _offer(self, name: str, entry: Dict):
+        """Place the latest version of an experience in (or out of) a leader list."""
+        field = TOP_FIELDS[name]
+        top = self.tops[name]
+        entries = [e for e in top["entries"] if e["id"] != entry["id"]]
+        bound = top["bound"]
+        if bound is None or _key(entry, field) > _key(bound, field):
+            entries.append(entry)
+            entries.sort(key=lambda e: _key(e, field), reverse=True)
+            if len(entries) > TOP_CAPACITY:
+                evicted = entries.pop()
+                if bound is None or _key(evicted, field) > _key(bound, field):
+                    top["bound"] = evicted
+        top["entries"] = entries
+
+    def add(self, exp: Dict, pos: int):
+        """Account for a newly stored experience at storage position `pos`."""
+        self.total += 1
+        category = exp.get("category", "other")
+        self.categories[category] = self.categories.get(category, 0) + 1
+        self._count_weight(exp.get("weight", 1.0), 1)
+        for name in TOP_FIELDS:
+            self._offer(name, _entry(exp, pos))
+
+    def update(self, exp: Dict, old_weight: float, pos: int):
+        """Account for an experience whose weight/counters changed (category is fixed)."""
+        self._count_weight(old_weight, -1)
+        self._count_weight(exp.get("weight", 1.0), 1)
+        for name in TOP_FIELDS:
+            self._offer(name, _entry(exp, pos))
+
+    def tracked_ids(self) -> List[str]:
+        """IDs whose storage position the summary holds (see reposition)."""
+        ids = []
+        for top in self.tops.values():
+            ids.extend(e["id"] for e in top["entries"])
+            if top["bound"] is not None:
+                ids.append(top["bound"]["id"])
+        return ids
+
+    def reposition(self, positions: Dict[str, int]):
+        """Refresh storage positions after the store was rewritten (order is preserved)."""
+        for top in self.tops.values():
+            for entry in top["entries"] + ([top["bound"]] if top["bound"] else []):
+                if entry["id"] in positions:
+                    entry["pos"] = positions[entry["id"]]
+
+    def record_verdicts(self, helped: bool, count: int):
+        if helped:
+            self.helped += count
+        else:
+            self.hurt += count
+
+    def top(self, name: str, n: int) -> Optional[List[Dict]]:
+        """The n leaders of a list, or None if the list can no longer tell."""
+        top = self.tops[name]
+        if len(top["entries"]) < min(n, self.total) and top["bound"] is not None:
+            return None
+        return [{f: e[f] for f in ENTRY_FIELDS} for e in top["entries"][:n]]
+
+    # --- (re)building ------------------------------------------------------
+
+    @classmethod
+    def build(cls, columns: ExperienceColumns, helped: int = 0, hurt: int = 0) -> "StatsSummary":
+        """
+        Compute the summary from the columnar view of the whole store.
+
+        Only the scalar columns are scanned; the records of the leaders are
+        read at the end.
+        """
+        summary = cls()
+        summary.total = len(columns)
+        for code, count in Counter(columns.category_codes).items():
+            category = columns.categories[code]
+            category = "other" if category is None else category
+            summary.categories[category] = summary.categories.get(category, 0) + count
+        summary.weights = {repr(w): c for w, c in Counter(columns.weight).items()}
+        positions = columns.positions
+        for name, field in TOP_FIELDS.items():
+            values = columns.column(field)
+            rows = heapq.nlargest(TOP_CAPACITY + 1, range(len(columns)),
+                                  key=lambda r: (values[r], -positions[r]))
+            ranked = [_entry(exp, positions[r])
+                      for r, exp in zip(rows, columns.records(rows))]
+            summary.tops[name] = {
+                "entries": ranked[:TOP_CAPACITY],
+                "bound": ranked[TOP_CAPACITY] if len(ranked) > TOP_CAPACITY else None,
+            }
+        summary.helped, summary.hurt = helped, hurt
+        return summary
+
+    # --- reporting ---------------------------------------------------------
+
+    def statistics(self) -> Dict:
+        """The figures get_statistics() reports."""
+        if not self.total:
+            return {"total": 0, "message": "No experiences yet"}
+        weights = sorted((float(w), c) for w, c in self.weights.items())
+        return {
+            "total_experiences": self.total,
+            "categories": dict(self.categories),
+            "average_weight": sum(w * c for w, c in weights) / self.total,
+            "min_weight": min(w for w, _ in weights),
+            "max_weight": max(w for w, _ in weights),
+            "high_quality_count": sum(c for w, c in weights if w >= HIGH_QUALITY_WEIGHT),
+            "low_quality_count": sum(c for w, c in weights if w <= LOW_QUALITY_WEIGHT),
+            "weight_histogram": self.histogram(),
+        }
+
+    def histogram(self, width: float = 0.1) -> Dict[str, int]:
+        """Experience counts per weight bucket of `width`, keyed by bucket start."""
+        buckets: Dict[float, int] = {}
+        for w, c in self.weights.items():
+            start = round(int(float(w) / width + 1e-9) * width, 6)
+            buckets[start] = buckets.get(start, 0) + c
+        return {f"{start:.1f}": buckets[start] for start in sorted(buckets)}
+
+    # --- persistence -------------------------------------------------------
+
+    def save(self, path: Path):
+        with atomic_write(path, durable=False) as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.VERSION,
+            "stamp": self.stamp,
+            "total": self.total,
+            "categories": self.categories,
+            "weights": self.weights,
+            "helped": self.helped,
+            "hurt": self.hurt,
+            "tops": self.tops,
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["StatsSummary"]:
+        """Load a persisted summary, or None if missing, corrupt or outdated."""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return None
+        summary = cls()
+        summary.stamp = data.get("stamp")
+        summary.total = data.get("total", 0)
+        summary.categories = data.get("categories", {})
+        summary.weights = data.get("weights", {})
+        summary.helped = data.get("helped", 0)
+        summary.hurt = data.get("hurt", 0)
+        summary.tops.update(data.get("tops", {}))
+        return summary
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Share experiences and weight updates between hosts with delta bundles.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from delta_sync import export_changes, get_sync_state, import_bundles, pull_changes, push_changes
+from profiling import add_profile_argument, profile_cli
+
+
+def print_export(result: dict):
+    if result["path"] is None:
+        print("Nothing new to push")
+        return
+    print(f"Wrote bundle #{result['number']} to {result['path']}: {result['records']} records, "
+          f"{result['events']} weight updates ({result['bytes']} bytes)")
+
+
+def print_import(result: dict):
+    print(f"Imported {result['bundles']} bundles: {result['records']} new records, "
+          f"{result['events']} weight updates")
+    if result["pending"]:
+        print(f"  {result['pending']} updates wait for records that have not arrived yet")
+
+
+def show_status():
+    state = get_sync_state().data
+    print(f"Host id: {state['host']}")
+    for peer, mark in sorted(state["peers"].items()):
+        print(f"  -> {peer}: {mark['bundles']} bundles sent")
+    for origin, ranges in sorted(state["received"].items()):
+        count = sum(hi - lo + 1 for lo, hi in ranges)
+        if count:
+            print(f"  <- {origin}: {count} weight updates received")
+    if state["pending"]:
+        print(f"  {len(state['pending'])} received updates wait for their records")
+
+
+def add_arguments(parser):
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write a bundle of local changes since a peer's watermark")
+    export.add_argument("--peer", required=True, help="Name of the peer the bundle is for")
+    export.add_argument("--output", "-o", required=True, help="Bundle file (or directory) to write")
+
+    imports = commands.add_parser("import", help="Merge bundles from other hosts")
+    imports.add_argument("bundles", nargs="+", help="Bundle files")
+
+    for name, text in (("push", "Drop a bundle of local changes into a peer directory"),
+                       ("pull", "Merge the bundles other hosts left in a peer directory"),
+                       ("sync", "Pull from, then push to, a peer directory")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("directory", help="Peer directory (e.g. on a shared mount)")
+
+    commands.add_parser("status", help="Show this host's id and per-peer watermarks")
+
+
+def run(parser, args):
+    if args.command == "export":
+        print_export(export_changes(args.peer, Path(args.output)))
+    elif args.command == "import":
+        print_import(import_bundles([Path(p) for p in args.bundles]))
+    elif args.command == "status":
+        show_status()
+    else:
+        directory = Path(args.directory).expanduser()
+        if args.command in ("pull", "sync"):
+            print_import(pull_changes(directory))
+        if args.command in ("push", "sync"):
+            print_export(push_changes(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync experience databases between hosts")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("sync", args.profile)
+    run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
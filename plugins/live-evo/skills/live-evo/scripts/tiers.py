@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Manage the hot/cold experience tiers: demote by policy, promote, show sizes.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from cold_tier import EVICTION_ORDERS, TierPolicy
+from experience_manager import (demote_experiences, get_tier_policy, promote_experiences,
+                                set_tier_policy, tier_sizes)
+from profiling import add_profile_argument, profile_cli
+
+
+def _optional(cast):
+    """argparse type that maps "none" to None (an unset limit)."""
+    def parse(value: str):
+        return None if value.lower() == "none" else cast(value)
+    return parse
+
+
+def show_status():
+    sizes = tier_sizes()
+    policy = get_tier_policy()
+    print(f"Hot tier: {sizes['hot']} experiences")
+    print(f"Cold archive: {sizes['cold']} experiences")
+    print("Policy:")
+    for field, value in policy.to_dict().items():
+        print(f"  {field}: {value}")
+
+
+def add_arguments(parser):
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    demote = commands.add_parser("demote", help="Move experiences the policy selects to the cold archive")
+    demote.add_argument("--dry-run", "-n", action="store_true",
+                        help="Report what would be demoted without changing anything")
+    # One-off rules on top of the saved policy (which leaves them off by default)
+    demote.add_argument("--min-weight", type=float, default=argparse.SUPPRESS,
+                        help="Also demote experiences at or below this weight, this time only")
+    demote.add_argument("--stale-days", type=float, default=argparse.SUPPRESS,
+                        help="Also demote experiences unused for this many days, this time only")
+
+    promote = commands.add_parser("promote", help="Move archived experiences back to the hot tier")
+    promote.add_argument("ids", nargs="+", help="Experience IDs (separate or comma-separated)")
+
+    # Unset options are left out of args, so only the given settings change
+    policy = commands.add_parser("policy", help="Show or change the demotion policy",
+                                 argument_default=argparse.SUPPRESS)
+    policy.add_argument("--capacity", type=_optional(int),
+                        help="Most experiences kept hot ('none', the default, for no bound)")
+    policy.add_argument("--low-water", type=float,
+                        help="Fraction of capacity to evict down to once it is exceeded")
+    policy.add_argument("--min-weight", type=_optional(float),
+                        help="Demote experiences at or below this weight on `demote` ('none', the default, to disable)")
+    policy.add_argument("--stale-days", type=_optional(float),
+                        help="Demote experiences unused for this many days on `demote` ('none', the default, to disable)")
+    policy.add_argument("--grace-days", type=float,
+                        help="Never demote experiences created or promoted this recently")
+    policy.add_argument("--evict", choices=EVICTION_ORDERS,
+                        help="Capacity eviction order: least recently or least frequently used")
+
+    commands.add_parser("status", help="Show tier sizes and the policy")
+
+
+def run(parser, args):
+    if args.command == "demote":
+        rules = {field: getattr(args, field) for field in ("min_weight", "stale_days") if hasattr(args, field)}
+        policy = TierPolicy(**dict(get_tier_policy().to_dict(), **rules))
+        result = demote_experiences(policy, dry_run=args.dry_run)
+        verb = "Would demote" if args.dry_run else "Demoted"
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(result["reasons"].items()))
+        print(f"Scanned {result['scanned']} hot experiences")
+        print(f"{verb} {result['demoted']}" + (f" ({reasons})" if reasons else ""))
+        print(f"Hot: {result['hot']}  Cold: {result['cold']}")
+    elif args.command == "promote":
+        ids = [i.strip() for arg in args.ids for i in arg.split(",") if i.strip()]
+        promoted = promote_experiences(ids)
+        for exp in promoted:
+            print(f"Promoted {exp['id']}: {exp.get('question', '')[:60]}")
+        missing = set(ids) - {exp["id"] for exp in promoted}
+        if missing:
+            print(f"Not in the cold archive: {', '.join(sorted(missing))}")
+    elif args.command == "policy":
+        settings = {field: getattr(args, field) for field in TierPolicy.FIELDS if hasattr(args, field)}
+        if settings:
+            set_tier_policy(**settings)
+        show_status()
+    else:
+        show_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage hot/cold experience tiers")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("tiers", args.profile)
+    run(parser, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,55 +3,149 @@
 Update experience weights based on contrastive evaluation results.
 """
 import argparse
+import json
+import os
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from experience_manager import update_weights
+from daemon import call
+from profiling import add_profile_argument, profile_cli, span
 
+# Verdict files at least this long are evaluated on a process pool by default
+VERDICT_POOL_MIN = 1024
 
-def main():
-    parser = argparse.ArgumentParser(description="Update experience weights after verification")
-    parser.add_argument("--task", "-t", required=True, help="Task description")
-    parser.add_argument("--result-a", "-a", required=True, help="Result without memory (baseline)")
-    parser.add_argument("--result-b", "-b", required=True, help="Result with guideline")
-    parser.add_argument("--correct", "-c", required=True, help="Correct answer/outcome")
-    parser.add_argument("--experience-ids", "-e", required=True, help="Comma-separated experience IDs used")
+OUTCOMES = {
+    (True, False): (True, "Guideline HELPED (turned incorrect into correct)"),
+    (True, True): (True, "Both correct, guideline maintained quality"),
+    (False, True): (False, "Guideline HURT (turned correct into incorrect)"),
+    # Both incorrect - neutral, but lean toward decreased weight
+    (False, False): (False, "Both incorrect, slight weight decrease"),
+}
 
-    args = parser.parse_args()
 
-    experience_ids = [id.strip() for id in args.experience_ids.split(",") if id.strip()]
+def matches(result: str, correct: str) -> bool:
+    # Simple evaluation: check if results match correct answer
+    # In practice, you might want more sophisticated comparison
+    return correct.lower() in result.lower() or result.lower() in correct.lower()
+
+
+def evaluate(result_a: str, result_b: str, correct: str) -> dict:
+    """Judge one contrastive run: was each result correct, and did the guideline help?"""
+    a_correct = matches(result_a, correct)
+    b_correct = matches(result_b, correct)
+    helped, outcome = OUTCOMES[(b_correct, a_correct)]
+    return {"result_a_correct": a_correct, "result_b_correct": b_correct,
+            "helped": helped, "outcome": outcome}
+
+
+def parse_ids(value) -> list:
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(i).strip() for i in value or () if str(i).strip()]
+
+
+def read_verdicts(path: str):
+    """
+    Read verdicts, one JSON object per line: "experience_ids" (list or
+    comma-separated) plus either "result_a"/"result_b"/"correct" to be
+    evaluated or an explicit "helped".
+    """
+    f = sys.stdin if path == "-" else open(path, 'r')
+    try:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _evaluate_verdict(item: dict) -> dict:
+    if "helped" in item:
+        helped = bool(item["helped"])
+        return {"helped": helped, "outcome": "given"}
+    return evaluate(item.get("result_a", ""), item.get("result_b", ""), item.get("correct", ""))
+
+
+def evaluate_verdicts(items: list, processes=None) -> list:
+    """Evaluate every verdict, across a forked process pool for large batches."""
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(items) >= VERDICT_POOL_MIN else 1
+    if processes <= 1 or len(items) <= 1:
+        return [_evaluate_verdict(item) for item in items]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = None
+    chunksize = max(1, len(items) // (processes * 4))
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        return list(pool.map(_evaluate_verdict, items, chunksize=chunksize))
+
+
+def run_batch(args):
+    """Apply every verdict in the verdicts file in one batch; one JSON result line each."""
+    items = list(read_verdicts(args.verdicts_file))
+    with span("evaluate"):
+        verdicts = evaluate_verdicts(items, args.processes)
+    results = call("update_many", verdicts=[[parse_ids(item.get("experience_ids")), v["helped"]]
+                                            for item, v in zip(items, verdicts)])
+
+    total = 0
+    for i, (item, verdict, result) in enumerate(zip(items, verdicts, results)):
+        record = {"index": i, "helped": verdict["helped"], "outcome": verdict["outcome"],
+                  "updates": result["updates"], "total_updated": result["total_updated"]}
+        if "id" in item:
+            record["id"] = item["id"]
+        sys.stdout.write(json.dumps(record) + "\n")
+        total += result["total_updated"]
+    print(f"Applied {len(items)} verdicts ({total} weight updates)", file=sys.stderr)
+
+
+def add_arguments(parser):
+    parser.add_argument("--task", "-t", help="Task description")
+    parser.add_argument("--result-a", "-a", help="Result without memory (baseline)")
+    parser.add_argument("--result-b", "-b", help="Result with guideline")
+    parser.add_argument("--correct", "-c", help="Correct answer/outcome")
+    parser.add_argument("--experience-ids", "-e", help="Comma-separated experience IDs used")
+    parser.add_argument("--verdicts-file",
+                       help="JSONL file of verdicts ('-' for stdin), applied as one batch; "
+                            "each line has experience_ids and result_a/result_b/correct "
+                            "(or helped)")
+    parser.add_argument("--processes", "-p", type=int,
+                       help="Worker processes for evaluating --verdicts-file (default: auto)")
+
+
+def run(parser, args):
+    if args.verdicts_file:
+        run_batch(args)
+        return
+
+    missing = [name for name in ("task", "result_a", "result_b", "correct", "experience_ids")
+               if getattr(args, name) is None]
+    if missing:
+        parser.error("the following arguments are required: " +
+                     ", ".join("--" + name.replace("_", "-") for name in missing))
+
+    experience_ids = parse_ids(args.experience_ids)
 
     if not experience_ids:
         print("No experience IDs provided. Nothing to update.")
         return
 
-    # Simple evaluation: check if results match correct answer
-    # In practice, you might want more sophisticated comparison
-    result_a_correct = args.correct.lower() in args.result_a.lower() or args.result_a.lower() in args.correct.lower()
-    result_b_correct = args.correct.lower() in args.result_b.lower() or args.result_b.lower() in args.correct.lower()
+    verdict = evaluate(args.result_a, args.result_b, args.correct)
 
     print(f"Task: {args.task[:60]}...")
-    print(f"\nBaseline (without memory): {'CORRECT' if result_a_correct else 'INCORRECT'}")
-    print(f"With guideline: {'CORRECT' if result_b_correct else 'INCORRECT'}")
-
-    # Determine if guideline helped
-    if result_b_correct and not result_a_correct:
-        helped = True
-        print("\n=> Guideline HELPED (turned incorrect into correct)")
-    elif result_b_correct and result_a_correct:
-        helped = True
-        print("\n=> Both correct, guideline maintained quality")
-    elif not result_b_correct and result_a_correct:
-        helped = False
-        print("\n=> Guideline HURT (turned correct into incorrect)")
-    else:
-        # Both incorrect - neutral, but lean toward decreased weight
-        helped = False
-        print("\n=> Both incorrect, slight weight decrease")
+    print(f"\nBaseline (without memory): {'CORRECT' if verdict['result_a_correct'] else 'INCORRECT'}")
+    print(f"With guideline: {'CORRECT' if verdict['result_b_correct'] else 'INCORRECT'}")
+    print(f"\n=> {verdict['outcome']}")
 
     # Update weights
-    result = update_weights(experience_ids, helped)
+    result = call("update", experience_ids=experience_ids, helped=verdict["helped"])
 
     print(f"\nWeight updates:")
     for update in result["updates"]:
@@ -61,5 +155,15 @@ def main():
         print("  No experiences found with the provided IDs")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Update experience weights after verification")
+    add_arguments(parser)
+    add_profile_argument(parser)
+
+    args = parser.parse_args()
+    profile_cli("update", args.profile)
+    run(parser, args)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Segmented weight-change history with per-experience rollups.
+
+update_weights appends one JSON line per changed experience to the active
+segment (weight_history.jsonl). Once that segment passes a size limit or
+its oldest entry passes an age limit it is rotated: its entries are folded
+into the rollup file, and the raw lines move to a gzip-compressed cold
+segment that is only read again when someone streams the raw history.
+
+The rollup holds verdict totals plus, per experience, the update, helped
+and confirmed counts, first/last change time and a summary of the weight
+trajectory (first, last, min, max).
+
+An entry with "kind": "confirm" records a re-learned lesson merged into
+the stored one (add_experience with on_duplicate="merge"). It moves the
+weight like a helpful verdict ("helped" is true) and counts as a use, but
+it is not a verdict: it counts towards neither the helped/hurt totals nor
+the experience's successes. Readers combine it with the active
+segment, which the size/age limits keep small, so neither statistics nor
+per-experience lookups scan the full history.
+
+Malformed lines (e.g. a torn write) are skipped everywhere.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from locking import atomic_write
+
+SEGMENT_PATTERN = "weight_history.{:06d}.jsonl.gz"
+
+# "kind" of an entry recording a merge confirmation rather than a verdict
+CONFIRM_KIND = "confirm"
+
+
+def is_confirm(entry: Dict) -> bool:
+    return entry.get("kind") == CONFIRM_KIND
+
+
+def is_success(entry: Dict) -> bool:
+    """Whether an entry is a helpful verdict (confirmations are not verdicts)."""
+    return bool(entry.get("helped", False)) and not is_confirm(entry)
+
+
+def _parse(line) -> Optional[Dict]:
+    try:
+        entry = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _fold(rollup: Dict, entry: Dict):
+    """Fold one history entry into the rollup counters."""
+    confirm = is_confirm(entry)
+    helped = is_success(entry)
+    if helped:
+        rollup["helped"] += 1
+    elif not confirm:
+        rollup["hurt"] += 1
+    exp_id = entry.get("experience_id")
+    if not exp_id:
+        return
+    new_weight = entry.get("new_weight")
+    stats = rollup["experiences"].get(exp_id)
+    if stats is None:
+        first_weight = entry.get("old_weight")
+        start = new_weight if first_weight is None else first_weight
+        stats = rollup["experiences"][exp_id] = {
+            "updates": 0,
+            "helped": 0,
+            "confirmed": 0,
+            "first_change": entry.get("timestamp"),
+            "first_weight": first_weight,
+            "min_weight": start,
+            "max_weight": start,
+        }
+    stats["updates"] += 1
+    stats["helped"] += helped
+    if confirm:
+        # Rollups written before confirmations were recorded lack the counter
+        stats["confirmed"] = stats.get("confirmed", 0) + 1
+    stats["last_change"] = entry.get("timestamp")
+    stats["last_weight"] = new_weight
+    if new_weight is not None:
+        stats["min_weight"] = new_weight if stats["min_weight"] is None else min(stats["min_weight"], new_weight)
+        stats["max_weight"] = new_weight if stats["max_weight"] is None else max(stats["max_weight"], new_weight)
+
+
+def _file_stamp(fd: int) -> list:
+    st = os.fstat(fd)
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _empty_rollup() -> Dict:
+    return {"version": WeightHistory.VERSION, "next_segment": 1, "segments": [],
+            "folded": None, "helped": 0, "hurt": 0, "experiences": {}}
+
+
+class WeightHistory:
+    """Active segment + compressed cold segments + rollup (see module docstring)."""
+
+    VERSION = 1
+
+    def __init__(self, active_path: Path, segment_dir: Path, rollup_path: Path,
+                 segment_bytes: int, max_age: timedelta):
+        self.active_path = active_path
+        # Where the active segment is moved while it is being rotated
+        self.rotating_path = active_path.with_name(active_path.stem + ".rotating.jsonl")
+        self.segment_dir = segment_dir
+        self.rollup_path = rollup_path
+        self.segment_bytes = segment_bytes
+        self.max_age = max_age
+
+    # --- reading -----------------------------------------------------------
+
+    def load_rollup(self) -> Dict:
+        try:
+            with open(self.rollup_path, 'r') as f:
+                rollup = json.load(f)
+        except (OSError, ValueError):
+            return _empty_rollup()
+        if not isinstance(rollup, dict) or rollup.get("version") != self.VERSION:
+            return _empty_rollup()
+        return rollup
+
+    def _unfolded_entries(self, rollup: Dict) -> Iterator[Dict]:
+        """Entries not yet folded into `rollup`: a segment mid-rotation, then the active one."""
+        for path in (self.rotating_path, self.active_path):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                # A rotation interrupted after folding leaves its segment behind
+                if path == self.rotating_path and rollup.get("folded") == _file_stamp(f.fileno()):
+                    continue
+                for line in f:
+                    entry = _parse(line)
+                    if entry is not None:
+                        yield entry
+
+    def totals(self) -> Tuple[int, int]:
+        """(helped, hurt) verdict counts over the whole history."""
+        rollup = self.load_rollup()
+        helped, hurt = rollup["helped"], rollup["hurt"]
+        for entry in self._unfolded_entries(rollup):
+            if is_success(entry):
+                helped += 1
+            elif not is_confirm(entry):
+                hurt += 1
+        return helped, hurt
+
+    def experience(self, exp_id: str) -> Optional[Dict]:
+        """Rollup of one experience's weight changes, or None if it never changed."""
+        rollup = self.load_rollup()
+        view = {"helped": 0, "hurt": 0, "experiences": {}}
+        stats = rollup["experiences"].get(exp_id)
+        if stats is not None:
+            view["experiences"][exp_id] = dict(stats)
+        for entry in self._unfolded_entries(rollup):
+            if entry.get("experience_id") == exp_id:
+                _fold(view, entry)
+        return view["experiences"].get(exp_id)
+
+    def iter_entries(self, exp_id: Optional[str] = None) -> Iterator[Dict]:
+        """Stream raw history entries, oldest first (cold segments, then active)."""
+        rollup = self.load_rollup()
+        if rollup["segments"]:
+            import gzip
+        for name in rollup["segments"]:
+            try:
+                f = gzip.open(self.segment_dir / name, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    for line in f:
+                        entry = _parse(line)
+                        if entry is not None and (exp_id is None or entry.get("experience_id") == exp_id):
+                            yield entry
+                except (OSError, EOFError):
+                    # Truncated/corrupt segment: its rollup still counts it
+                    continue
+        for entry in self._unfolded_entries(rollup):
+            if exp_id is None or entry.get("experience_id") == exp_id:
+                yield entry
+
+    # --- rotation (callers hold the writer lock) ----------------------------
+
+    def needs_rotation(self) -> bool:
+        if self.rotating_path.exists():
+            # Finish a rotation that was interrupted
+            return True
+        try:
+            size = self.active_path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size >= self.segment_bytes:
+            return True
+        if not size:
+            return False
+        with open(self.active_path, 'rb') as f:
+            first = _parse(f.readline())
+        try:
+            started = datetime.fromisoformat(first["timestamp"])
+        except (TypeError, KeyError, ValueError):
+            return False
+        return datetime.now() - started >= self.max_age
+
+    def maybe_rotate(self) -> bool:
+        if self.needs_rotation():
+            self.rotate()
+            return True
+        return False
+
+    def rotate(self):
+        """
+        Fold the active segment into the rollup and move it to a compressed cold segment.
+
+        The segment is first renamed aside, so appends go to a fresh active
+        file; the rollup records which file it folded, so a crash at any
+        step neither loses nor double-counts entries.
+        """
+        if not self.rotating_path.exists():
+            try:
+                os.replace(self.active_path, self.rotating_path)
+            except FileNotFoundError:
+                return
+        rollup = self.load_rollup()
+        with open(self.rotating_path, 'rb') as f:
+            stamp = _file_stamp(f.fileno())
+            lines = None if rollup.get("folded") == stamp else f.readlines()
+
+        if lines is not None:
+            import gzip
+            name = SEGMENT_PATTERN.format(rollup["next_segment"])
+            self.segment_dir.mkdir(parents=True, exist_ok=True)
+            with atomic_write(self.segment_dir / name, 'wb') as out:
+                with gzip.GzipFile(fileobj=out, mode='wb', mtime=0) as gz:
+                    for line in lines:
+                        if _parse(line) is not None:
+                            gz.write(line if line.endswith(b"\n") else line + b"\n")
+            for line in lines:
+                entry = _parse(line)
+                if entry is not None:
+                    _fold(rollup, entry)
+            rollup["segments"].append(name)
+            rollup["next_segment"] += 1
+            rollup["folded"] = stamp
+            with atomic_write(self.rollup_path) as out:
+                json.dump(rollup, out, separators=(",", ":"))
+
+        self.rotating_path.unlink()
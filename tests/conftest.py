@@ -0,0 +1,57 @@
+"""
+Shared fixtures for the Live-Evo checks.
+
+Every test gets its own store (LIVE_EVO_HOME in a temporary directory).
+`em` is experience_manager re-imported against that store, for checks that
+run in this process; `run_python` runs a snippet in a fresh interpreter
+against a store, for checks that need several processes or several hosts.
+
+    python -m pytest tests
+"""
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "plugins" / "live-evo" / "skills" / "live-evo" / "scripts"
+
+# Settings a test store must not inherit from the environment running the tests
+_STORE_SETTINGS = ("LIVE_EVO_BACKEND", "LIVE_EVO_METRICS", "LIVE_EVO_TIERS", "LIVE_EVO_RESULT_CACHE")
+
+for path in (str(SCRIPTS_DIR), str(REPO_ROOT)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def store_env(home: Path, **overrides) -> dict:
+    """Environment for a process working on the store in `home`."""
+    env = dict(os.environ, LIVE_EVO_HOME=str(home), LIVE_EVO_FSYNC="0",
+               PYTHONPATH=os.pathsep.join((str(SCRIPTS_DIR), str(REPO_ROOT))))
+    for name in _STORE_SETTINGS:
+        env.pop(name, None)
+    env.update(overrides)
+    return env
+
+
+def run_python(code: str, home: Path, *args: str, **env) -> str:
+    """Run `code` (with `args` as sys.argv[1:]) in a fresh interpreter against the store in `home`; returns its stdout."""
+    proc = subprocess.run([sys.executable, "-c", code, *args], env=store_env(home, **env),
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode:
+        raise AssertionError(f"snippet failed:\n{proc.stderr}")
+    return proc.stdout
+
+
+@pytest.fixture
+def em(tmp_path, monkeypatch):
+    """experience_manager bound to a fresh store in tmp_path (daemon not used)."""
+    monkeypatch.setenv("LIVE_EVO_HOME", str(tmp_path))
+    monkeypatch.setenv("LIVE_EVO_FSYNC", "0")
+    for name in _STORE_SETTINGS:
+        monkeypatch.delenv(name, raising=False)
+    import experience_manager
+    return importlib.reload(experience_manager)
@@ -0,0 +1,41 @@
+"""
+add_experience.py stores by default; refusing a near-duplicate is opt-in
+and fails the command, so a caller never mistakes it for a stored lesson.
+A merge confirms the stored experience without recording a verdict.
+"""
+import subprocess
+import sys
+
+from conftest import SCRIPTS_DIR, store_env
+
+LESSON = ["--question", "Fix flaky retries in the deploy job", "--failure-reason", "Retried blindly",
+          "--improvement", "Back off and cap retries"]
+
+
+def add(home, *options):
+    return subprocess.run([sys.executable, str(SCRIPTS_DIR / "add_experience.py"), *LESSON, *options],
+                          env=store_env(home), capture_output=True, text=True)
+
+
+def test_store_is_the_default(tmp_path):
+    assert add(tmp_path).returncode == 0
+    again = add(tmp_path)
+    assert again.returncode == 0 and "added successfully" in again.stdout
+
+
+def test_reject_exits_non_zero(tmp_path):
+    add(tmp_path)
+    rejected = add(tmp_path, "--on-duplicate", "reject")
+    assert rejected.returncode == 1
+    assert "NOT stored" in rejected.stderr
+
+
+def test_merge_is_a_confirmation_not_a_verdict(em):
+    exp = em.add_experience("flaky retries", "retried blindly", "cap retries")
+    merged = em.add_experience("flaky retries", "retried blindly", "cap retries", on_duplicate="merge")
+    assert merged["id"] == exp["id"] and merged["use_count"] == 1
+    assert merged["success_count"] == exp["success_count"]
+    [entry] = em.iter_weight_history(exp["id"])
+    assert entry["kind"] == "confirm" and entry["new_weight"] == merged["weight"]
+    assert em.get_weight_history().totals() == (0, 0)
+    assert em.get_experience_history(exp["id"])["confirmed"] == 1
@@ -0,0 +1,63 @@
+"""
+Parallel sessions must not lose writes: several processes adding
+experiences and updating the weights of one shared experience at the same
+time end with every add stored and every update counted (see locking.py).
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import run_python, store_env
+
+PROCESSES = 8
+OPERATIONS = 20
+
+SETUP = """
+import json
+import experience_manager as em
+exp = em.add_experience("shared lesson about flaky retries", "retried blindly", "back off and cap retries")
+print(json.dumps({"id": exp["id"], "total": em.count_experiences()}))
+"""
+
+WORKER = """
+import sys
+import experience_manager as em
+worker, shared = int(sys.argv[1]), sys.argv[2]
+for i in range(int(sys.argv[3])):
+    em.add_experience(f"worker {worker} question {i}", f"failure {i}", f"lesson {i}", on_duplicate="store")
+    em.update_weights([shared], helped=i % 2 == 0)
+"""
+
+CHECK = """
+import json, sys
+import experience_manager as em
+exp = em.get_experiences([sys.argv[1]])[0]
+history = list(em.iter_weight_history(sys.argv[1]))
+print(json.dumps({"total": em.count_experiences(), "use_count": exp["use_count"],
+                  "success_count": exp["success_count"], "history": len(history),
+                  "questions": len({e["question"] for e in em.load_experiences()})}))
+"""
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_parallel_adds_and_updates_are_not_lost(tmp_path, backend):
+    # Concurrent writers under group commit, so fsync stays on
+    env = {"LIVE_EVO_BACKEND": backend, "LIVE_EVO_FSYNC": "1", "LIVE_EVO_TIERS": "0"}
+    start = json.loads(run_python(SETUP, tmp_path, **env))
+
+    workers = [subprocess.Popen([sys.executable, "-c", WORKER, str(n), start["id"], str(OPERATIONS)],
+                                env=store_env(tmp_path, **env), stderr=subprocess.PIPE, text=True)
+               for n in range(PROCESSES)]
+    for proc in workers:
+        _, err = proc.communicate(timeout=300)
+        assert proc.returncode == 0, err
+
+    result = json.loads(run_python(CHECK, tmp_path, start["id"], **env))
+    writes = PROCESSES * OPERATIONS
+    assert result["total"] == start["total"] + writes
+    assert result["questions"] == result["total"]
+    assert result["use_count"] == writes
+    assert result["success_count"] == PROCESSES * ((OPERATIONS + 1) // 2)
+    assert result["history"] == writes
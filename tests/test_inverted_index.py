@@ -0,0 +1,92 @@
+"""
+The term index is kept up to date incrementally: each save appends the
+changes to a delta log instead of rewriting the postings, and the log is
+folded into new base files only once it has grown. Whatever the mix of
+appends, re-learned records, tombstones, compactions and torn log lines,
+loading the index must give exactly what the DB file calls for.
+"""
+import json
+import random
+from collections import Counter
+
+import pytest
+
+import inverted_index
+from benchmarks.corpus import CorpusGenerator
+from inverted_index import TOMBSTONE_KEY, InvertedIndex, searchable_text, tokenize
+
+ROWS = 200
+
+
+def snapshot(index: InvertedIndex):
+    return index.docs, index.total_tokens, index.postings, index.db_size
+
+
+def expected(db):
+    """The index a DB file calls for, derived without InvertedIndex: its last line per live id."""
+    live, offset = {}, 0
+    with open(db, 'rb') as f:
+        for raw in f:
+            exp = json.loads(raw)
+            live.pop(exp["id"], None)
+            if not exp.get(TOMBSTONE_KEY):
+                live[exp["id"]] = (exp, offset, len(raw))
+            offset += len(raw)
+    docs, postings = {}, {}
+    for exp_id, (exp, start, length) in live.items():
+        counts = Counter(tokenize(searchable_text(exp)))
+        docs[exp_id] = [start, length, exp["weight"], exp["category"], len(counts), sum(counts.values())]
+        for term, tf in counts.items():
+            postings.setdefault(term, {})[exp_id] = tf
+    return docs, sum(doc[-1] for doc in docs.values()), postings, offset
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_delta_log_matches_the_db(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(inverted_index, "DELTA_COMPACT_MIN_BYTES", 4096)
+    rng = random.Random(seed)
+    corpus = CorpusGenerator(vocab_size=300, seed=seed)
+    db, path = tmp_path / "db.jsonl", tmp_path / "index.json"
+    corpus.write(db, ROWS)
+    InvertedIndex.build(db).save(path)
+    generations = set()
+
+    for step in range(120):
+        with open(db, 'a') as f:
+            for _ in range(rng.randint(1, 3)):
+                i = rng.randrange(ROWS + step)
+                if rng.random() < 0.2:
+                    line = {"id": CorpusGenerator.experience_id(i), TOMBSTONE_KEY: True}
+                else:
+                    line = corpus.experience(i if rng.random() < 0.5 else ROWS + step)
+                f.write(json.dumps(line) + "\n")
+        if rng.random() < 0.05:
+            with open(InvertedIndex.delta_path(path), 'a') as f:
+                f.write('{"generation": 1, "db_si')
+
+        index = InvertedIndex.load(path)
+        assert index.catch_up(db)
+        index.save(path)
+        generations.add(index.generation)
+        assert snapshot(InvertedIndex.load(path)) == expected(db), step
+
+    # The log was folded into the base files now and then, not on every save
+    assert 1 < len(generations) < 60
+
+
+def test_one_add_appends_a_line(tmp_path):
+    db, path = tmp_path / "db.jsonl", tmp_path / "index.json"
+    corpus = CorpusGenerator(vocab_size=300, seed=7)
+    corpus.write(db, ROWS)
+    InvertedIndex.build(db).save(path)
+    base = path.stat().st_mtime_ns, sorted(p.name for p in tmp_path.iterdir())
+
+    with open(db, 'a') as f:
+        f.write(json.dumps(corpus.experience(ROWS)) + "\n")
+    index = InvertedIndex.load(path)
+    assert index.catch_up(db)
+    index.save(path)
+
+    delta = InvertedIndex.delta_path(path)
+    assert (path.stat().st_mtime_ns, sorted(p.name for p in tmp_path.iterdir() if p != delta)) == base
+    assert delta.stat().st_size < 2048
@@ -0,0 +1,65 @@
+"""
+migrate.py --force rebuilds the SQLite database from the active backend:
+writes made since the first migration survive it, even ones racing it, and
+a JSONL file older than the database is never re-imported over it.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS_DIR, store_env
+
+WRITER = """
+import sys
+import experience_manager as em
+for i in range(15):
+    em.add_experience(f"writer {sys.argv[1]} lesson {i}", "failure", "improvement", on_duplicate="store")
+"""
+
+
+def migrate(home, *options, **env):
+    return subprocess.run([sys.executable, str(SCRIPTS_DIR / "migrate.py"), *options],
+                          env=store_env(home, **env), capture_output=True, text=True)
+
+
+def test_force_keeps_writes_made_since_migration(em):
+    em.add_experience("before the migration", "failure", "improvement")
+    em.migrate_to_sqlite()
+    added = em.add_experience("after the migration", "failure", "improvement")
+    before = em.count_experiences()
+
+    forced = migrate(em.EXPERIENCE_DIR, "--force")
+    assert forced.returncode == 0, forced.stderr
+    assert "Rebuilt" in forced.stdout
+    assert em.count_experiences() == before
+    assert em.get_experiences([added["id"]])[0]["question"] == "after the migration"
+
+
+def test_force_under_concurrent_writers(tmp_path):
+    assert migrate(tmp_path).returncode == 0
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER, str(n)], env=store_env(tmp_path))
+               for n in range(4)]
+    for _ in range(3):
+        forced = migrate(tmp_path, "--force")
+        assert forced.returncode == 0, forced.stderr
+    assert all(w.wait(timeout=300) == 0 for w in writers)
+
+    count = subprocess.run([sys.executable, "-c", "import experience_manager as em; print(sum(1 for e in "
+                            "em.iter_experiences() if e['question'].startswith('writer')))"],
+                           env=store_env(tmp_path), capture_output=True, text=True)
+    assert int(count.stdout) == 4 * 15
+
+
+def test_stale_jsonl_is_not_reimported(em, monkeypatch):
+    em.add_experience("in the JSONL file", "failure", "improvement")
+    em.migrate_to_sqlite()
+    em.add_experience("only in SQLite", "failure", "improvement")
+    os.utime(em.DB_PATH, (0, 0))
+
+    monkeypatch.setenv("LIVE_EVO_BACKEND", "jsonl")
+    with pytest.raises(RuntimeError, match="older than"):
+        em.migrate_to_sqlite()
+    refused = migrate(em.EXPERIENCE_DIR, "--force", LIVE_EVO_BACKEND="jsonl")
+    assert refused.returncode == 1 and "Not migrated" in refused.stderr
@@ -0,0 +1,27 @@
+"""
+A retrieval answer is cached under the store generation it was computed
+at, and only if the store did not change while it was being computed.
+"""
+
+
+def test_answer_computed_across_a_write_is_not_cached(em, monkeypatch):
+    em.add_experience("flaky retries in the deploy job", "retried blindly", "cap retries")
+    search = em.find_relevant_experiences
+
+    def search_during_write(*args, **kwargs):
+        found = search(*args, **kwargs)
+        em.add_experience("slow deploys after the upgrade", "skipped the cache", "warm the cache")
+        # Another session answers at the new generation meanwhile
+        monkeypatch.setattr(em, "find_relevant_experiences", search)
+        em.retrieve_experiences("deploy upgrade")
+        return found
+
+    monkeypatch.setattr(em, "find_relevant_experiences", search_during_write)
+    em.retrieve_experiences("flaky retries")
+
+    cache = em.get_result_cache()
+    assert cache.stats()["entries"] == 1
+    assert cache.get(em.get_backend().stamp(), ["deploy upgrade", 5, 0.1, None, em.DEFAULT_SCORER])
+    # The stale answer was not stored, so this one is computed afresh
+    fresh = em.retrieve_experiences("flaky retries")
+    assert fresh["total"] == em.count_experiences()
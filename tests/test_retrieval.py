@@ -0,0 +1,87 @@
+"""
+The indexed Jaccard search (candidates from the term index, bounded top-k)
+must rank exactly like the original full scan: every record scored with
+simple_similarity * weight, kept at or above the threshold, stably sorted.
+Randomized over corpora, weight updates, categories, top_k and thresholds.
+"""
+import random
+
+import pytest
+
+from benchmarks.corpus import DEFAULT_CATEGORY_MIX, CorpusGenerator
+
+ROWS = 1500
+QUERIES = 60
+
+
+def baseline_similarity(query: str, text: str) -> float:
+    """simple_similarity as it was before the index: Jaccard plus the phrase boost."""
+    query_words = set(query.lower().split())
+    text_words = set(text.lower().split())
+    if not query_words or not text_words:
+        return 0.0
+    jaccard = len(query_words & text_words) / len(query_words | text_words)
+    phrase_boost = 0.3 if query.lower() in text.lower() or text.lower() in query.lower() else 0.0
+    return min(1.0, jaccard + phrase_boost)
+
+
+def baseline_search(experiences, query, top_k, threshold, category):
+    """find_relevant_experiences as it was before the index: score everything, sort, cut."""
+    if category:
+        experiences = [e for e in experiences if e.get("category") == category]
+    results = []
+    for exp in experiences:
+        text = " ".join([exp.get("question", ""), exp.get("failure_reason", ""),
+                         exp.get("improvement", ""), exp.get("missed_information", "")])
+        score = baseline_similarity(query, text) * exp.get("weight", 1.0)
+        if score >= threshold:
+            results.append((exp["id"], score))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return results[:top_k]
+
+
+def random_query(corpus: CorpusGenerator, experiences, rng: random.Random) -> str:
+    """A random query, sometimes a phrase of a stored record so the phrase boost applies."""
+    kind = rng.random()
+    if kind < 0.5:
+        return corpus.query(rng, n_words=rng.randint(1, 8))
+    exp = rng.choice(experiences)
+    if kind < 0.8:
+        words = exp["question"].split()
+        start = rng.randrange(len(words))
+        return " ".join(words[start:start + rng.randint(1, 4)])
+    # The whole record text and then some: the text is contained in the query
+    text = " ".join([exp["question"], exp["failure_reason"], exp["improvement"],
+                     exp.get("missed_information", "")])
+    return text + " " + corpus.query(rng, n_words=2)
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_indexed_search_matches_full_scan(em, seed, backend, monkeypatch):
+    monkeypatch.setattr(em, "TIERING", False)
+    rng = random.Random(seed)
+    corpus = CorpusGenerator(vocab_size=rng.choice([300, 2000]), seed=seed)
+    corpus.write(em.DB_PATH, ROWS)
+    if backend == "sqlite":
+        em.migrate_to_sqlite()
+    assert em.get_backend().name == backend
+
+    # Pending weight deltas must be ranked with, like rewritten records
+    ids = [CorpusGenerator.experience_id(i) for i in range(ROWS)]
+    for _ in range(40):
+        em.update_weights(rng.sample(ids, rng.randint(1, 5)), helped=rng.random() < 0.5)
+    experiences = em.load_experiences()
+
+    for _ in range(QUERIES):
+        query = random_query(corpus, experiences, rng)
+        top_k = rng.choice([1, 3, 5, 20])
+        threshold = rng.choice([0.01, 0.05, 0.1, 0.3])
+        category = rng.choice([None, None, *DEFAULT_CATEGORY_MIX])
+
+        expected = baseline_search(experiences, query, top_k, threshold, category)
+        found = em.find_relevant_experiences(query, top_k=top_k, threshold=threshold,
+                                             category=category, scorer="jaccard")
+        context = (query, top_k, threshold, category)
+        assert [exp["id"] for exp, _ in found] == [i for i, _ in expected], context
+        assert [score for _, score in found] == pytest.approx([s for _, s in expected]), context
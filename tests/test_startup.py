@@ -0,0 +1,21 @@
+"""
+The cold-start budget (benchmarks/startup.py): every `live-evo` command
+starts within the budget of a bare interpreter and imports nothing that
+should load on demand. LIVE_EVO_STARTUP_BUDGET_MS overrides the budget on
+slow machines.
+"""
+import os
+import subprocess
+import sys
+
+from conftest import REPO_ROOT
+
+from benchmarks.startup import DEFAULT_BUDGET_MS
+
+
+def test_commands_start_within_budget():
+    budget = os.environ.get("LIVE_EVO_STARTUP_BUDGET_MS", str(DEFAULT_BUDGET_MS))
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--budget-ms", budget,
+                           "--iterations", "5"], cwd=REPO_ROOT, capture_output=True, text=True,
+                          timeout=600)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
@@ -0,0 +1,115 @@
+"""
+Hosts that have imported the same delta bundles agree on every record,
+weight and count, whatever order the bundles arrived in (see delta_sync.py).
+Three hosts, each with its own store, trade bundles over two rounds: the
+second carries verdicts on records another host created, so a host that
+sees it before the first round waits on pending verdicts, and a merge
+confirmation (a re-learned lesson) that must replay like one. Each host then
+imports every bundle, one at a time, in its own random order.
+"""
+import json
+import random
+
+import pytest
+
+from conftest import run_python
+
+HOSTS = ("a", "b", "c")
+
+ADD = """
+import json, sys
+import experience_manager as em
+host = sys.argv[1]
+ids = [em.add_experience(f"{host} question {i} about retries and timeouts", f"{host} failure {i}",
+                         f"{host} lesson {i}", on_duplicate="store")["id"] for i in range(4)]
+print(json.dumps(ids))
+"""
+
+VOTE = """
+import sys
+import experience_manager as em
+for vote in sys.argv[1:]:
+    exp_id, helped = vote.split(":")
+    em.update_weights([exp_id], helped=helped == "1")
+"""
+
+MERGE = """
+import sys
+import experience_manager as em
+host, i = sys.argv[1], int(sys.argv[2])
+exp = em.add_experience(f"{host} question {i} about retries and timeouts", f"{host} failure {i}",
+                        f"{host} lesson {i}", on_duplicate="merge")
+assert exp["duplicate"]["action"] == "merged", exp
+"""
+
+EXPORT = """
+import sys
+from pathlib import Path
+import delta_sync
+delta_sync.export_changes("mesh", Path(sys.argv[1]))
+"""
+
+IMPORT = """
+import sys
+from pathlib import Path
+import delta_sync
+for path in sys.argv[1:]:
+    delta_sync.import_bundles([Path(path)])
+"""
+
+DUMP = """
+import json
+import experience_manager as em
+print(json.dumps(sorted([exp["id"], exp["question"], exp["weight"], exp["use_count"], exp["success_count"]]
+                        for exp in em.load_experiences())))
+"""
+
+
+def votes(rng: random.Random, ids, n: int):
+    return [f"{rng.choice(ids)}:{rng.randint(0, 1)}" for _ in range(n)]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_import_order_does_not_matter(tmp_path, seed):
+    rng = random.Random(seed)
+    homes = {host: tmp_path / host for host in HOSTS}
+    bundles = {host: [] for host in HOSTS}
+
+    def export(host: str, round_no: int):
+        path = tmp_path / f"{host}.{round_no}.bundle.gz"
+        run_python(EXPORT, homes[host], str(path))
+        bundles[host].append(str(path))
+
+    # Round 1: every host records experiences and judges its own
+    created = {}
+    for host in HOSTS:
+        created[host] = json.loads(run_python(ADD, homes[host], host))
+        run_python(VOTE, homes[host], *votes(rng, created[host], 5))
+        export(host, 1)
+
+    # Round 2: b and c learn of one other host and judge its records
+    run_python(IMPORT, homes["b"], bundles["a"][0])
+    run_python(IMPORT, homes["c"], bundles["b"][0])
+    run_python(VOTE, homes["a"], *votes(rng, created["a"], 3))
+    run_python(MERGE, homes["a"], "a", str(rng.randrange(4)))
+    run_python(VOTE, homes["b"], *votes(rng, created["a"] + created["b"], 6))
+    run_python(VOTE, homes["c"], *votes(rng, created["b"] + created["c"], 6))
+    for host in HOSTS:
+        export(host, 2)
+
+    every = [path for host in HOSTS for path in bundles[host]]
+    states = {}
+    for host in HOSTS:
+        order = rng.sample(every, len(every))
+        run_python(IMPORT, homes[host], *order)
+        states[host] = json.loads(run_python(DUMP, homes[host]))
+
+    # Every host's records arrived, and every verdict and the confirmation counted once
+    shared = [exp for exp in states["a"] if exp[0] in {i for ids in created.values() for i in ids}]
+    assert len(shared) == 4 * len(HOSTS)
+    assert sum(exp[3] for exp in shared) == len(HOSTS) * 5 + 3 + 6 + 6 + 1
+    assert states["a"] == states["b"] == states["c"]
+
+    # A new host that only ever imports ends up the same too
+    run_python(IMPORT, tmp_path / "d", *reversed(every))
+    assert json.loads(run_python(DUMP, tmp_path / "d")) == states["a"]
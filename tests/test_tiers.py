@@ -0,0 +1,48 @@
+"""
+The hot/cold tiers: the hot store is bounded only when a capacity is set,
+archived records still count and still rank, and searching never moves
+records between the tiers.
+"""
+from benchmarks.corpus import CorpusGenerator
+from record_filter import RecordFilter
+
+ROWS = 150
+
+
+def archive_past_capacity(em, capacity: int = 100):
+    CorpusGenerator(vocab_size=500, seed=7).write(em.DB_PATH, ROWS)
+    em.set_tier_policy(capacity=capacity)
+    em.add_experience("one more lesson", "forgot something", "remember it", on_duplicate="store")
+    return em.tier_sizes()
+
+
+def test_hot_tier_is_unbounded_by_default(em):
+    CorpusGenerator(vocab_size=500, seed=7).write(em.DB_PATH, ROWS)
+    em.add_experience("one more lesson", "forgot something", "remember it", on_duplicate="store")
+    assert em.tier_sizes() == {"hot": ROWS + 1, "cold": 0, "capacity": None}
+
+
+def test_capacity_evicts_to_low_water_and_statistics_count_both_tiers(em):
+    sizes = archive_past_capacity(em)
+    assert sizes["hot"] == 90
+    assert sizes["cold"] == ROWS + 1 - 90
+    assert em.get_statistics()["total_experiences"] == ROWS + 1
+
+
+def test_archived_records_rank_without_being_promoted(em):
+    sizes = archive_past_capacity(em)
+    archived = next(em.get_archive().iter_records(RecordFilter()))
+
+    found = em.find_relevant_experiences(archived["question"], top_k=5, threshold=0.1)
+    assert found[0][0]["id"] == archived["id"]
+    assert all(score >= 0.1 for _, score in found)
+    assert em.tier_sizes() == sizes
+    assert em.get_experiences([archived["id"]]) == [archived]
+    assert em.tier_sizes() == sizes
+
+
+def test_cold_matches_obey_the_threshold(em):
+    archive_past_capacity(em)
+    for exp in em.get_archive().iter_records(RecordFilter()):
+        for _, score in em._search_cold(exp["question"], 5, 0.4, None):
+            assert score >= 0.4